@@ -0,0 +1,60 @@
+"""
+State changes on a Service Request shared by the HTML views and the JSON API.
+"""
+from django.http import Http404
+from django.utils import timezone
+
+from . import master_data
+from .models import SRComment, SRStatus
+
+
+class SRActionError(Exception):
+    """
+    The action is not allowed for this SR; the message is shown to the user.
+    """
+
+
+def add_comment(sr, user, comment_text):
+    """
+    Add a comment to ``sr``. Automatically moves SR from OPEN → WIP.
+    """
+    closed_status = master_data.get_status(SRStatus.STATUS_CLOSED)
+    current_status = master_data.get_status_by_id(sr.status_id)
+
+    # Block commenting on CLOSED SR
+    if closed_status and sr.status_id == closed_status.id:
+        raise SRActionError("This Service Request is already closed.")
+
+    comment_text = (comment_text or "").strip()
+    if not comment_text:
+        raise SRActionError("Comment cannot be empty.")
+
+    comment = SRComment.objects.create(
+        service_request=sr,
+        user=user,
+        comment=comment_text,
+    )
+
+    # Auto status change: open → wip
+    if current_status and current_status.code == SRStatus.STATUS_OPEN:
+        wip_status = master_data.get_status(SRStatus.STATUS_WIP)
+        if wip_status:
+            sr.status = wip_status
+            sr.save(update_fields=["status", "updated_at"])
+
+    return comment
+
+
+def close_service_request(sr, user):
+    closed_status = master_data.get_status(SRStatus.STATUS_CLOSED)
+    if closed_status is None:
+        raise Http404("Closed status not configured")
+
+    if sr.status_id == closed_status.id:
+        raise SRActionError("This Service Request is already closed.")
+
+    sr.status = closed_status
+    sr.closed_by = user
+    sr.closed_at = timezone.now()
+    sr.save(update_fields=["status", "closed_by", "closed_at", "updated_at"])
+    return sr
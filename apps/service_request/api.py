@@ -0,0 +1,474 @@
+"""
+JSON API over Service Requests and their comments.
+
+Detail responses carry ETag / Last-Modified derived from the SR's
+``updated_at`` (a new comment also moves it, see signals.py). List
+responses derive them from the dashboard counters and the ``sr_list``
+watermark (``counters.list_version``), which move on every SR write, so
+checking a list poll never touches the SR table. A poller that sends
+If-None-Match / If-Modified-Since gets a 304 after small reads instead of
+the full payload.
+
+The detail of an SR moved to the cold archive is read back from it and
+carries ``"archived": true``; comment and close return 404 for it.
+
+Callers authenticate with the session (browser; CSRF still applies) or
+with an ``Authorization: Token <key>`` header (integrations; no CSRF
+token needed), see apps.users.tokens.
+"""
+import asyncio
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from . import archive, assignment, counters, master_data, work_queue
+from .actions import SRActionError, add_comment, close_service_request
+from .filters import VALID_SORTS, filter_service_requests
+from .models import ServiceRequest, SRStatus
+from .pagination import akeyset_paginate, keyset_paginate
+from .validation import clean_sr_data
+from apps.users.decorators import auser
+from apps.users.tokens import has_token, token_user
+
+
+API_PAGE_SIZE = 25
+API_MAX_PAGE_SIZE = 100
+
+
+def _unauthorized():
+    return JsonResponse({"error": "Authentication required"}, status=401)
+
+
+def _csrf_rejected(request):
+    # The API views are csrf_exempt so token callers need no CSRF token;
+    # session callers still get the middleware's check
+    check = CsrfViewMiddleware(lambda request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def _use_token_user(request, user):
+    request.user = request._cached_user = user
+
+
+def api_login_required(view):
+    """
+    Like login_required, but answers 401 JSON instead of redirecting to the
+    login page, and also accepts an API token instead of the session.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if has_token(request):
+                user = await sync_to_async(token_user)(request)
+                if user is None:
+                    return _unauthorized()
+                _use_token_user(request, user)
+            else:
+                user = await auser(request)
+                if not user.is_authenticated:
+                    return _unauthorized()
+                rejected = _csrf_rejected(request)
+                if rejected is not None:
+                    return rejected
+            return await view(request, *args, **kwargs)
+        async_wrapper.csrf_exempt = True
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if has_token(request):
+            user = token_user(request)
+            if user is None:
+                return _unauthorized()
+            _use_token_user(request, user)
+        else:
+            if not request.user.is_authenticated:
+                return _unauthorized()
+            rejected = _csrf_rejected(request)
+            if rejected is not None:
+                return rejected
+        return view(request, *args, **kwargs)
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def _request_data(request):
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _datetime(value):
+    return value.isoformat() if value else None
+
+
+def _username(user):
+    return user.username if user else None
+
+
+def _make_etag(*parts):
+    return '"%s"' % hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _conditional(request, etag, last_modified):
+    """
+    304 response if the client's copy is current, else None.
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        _with_validators(response, etag, last_modified)
+    return response
+
+
+def _with_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+# ---- Serialization ----
+
+def sr_to_dict(sr):
+    nature = master_data.get_nature_by_id(sr.sr_nature_id)
+    sr_type = master_data.get_type_by_id(sr.sr_type_id)
+    status = master_data.get_status_by_id(sr.status_id)
+    return {
+        "id": sr.id,
+        "sr_number": sr.sr_number,
+        "category": sr.category,
+        "account_number": sr.account_number,
+        "sr_nature": nature.code if nature else None,
+        "sr_type": sr_type.code if sr_type else None,
+        "status": status.code if status else None,
+        "subject": sr.subject,
+        "email": sr.email,
+        "phone": sr.phone,
+        "created_by": _username(sr.created_by),
+        "assigned_to": _username(sr.assigned_to),
+        "created_at": _datetime(sr.created_at),
+        "updated_at": _datetime(sr.updated_at),
+        "closed_at": _datetime(sr.closed_at),
+        "due_at": _datetime(sr.due_at),
+        "breached_at": _datetime(sr.breached_at),
+    }
+
+
+def sr_detail_dict(sr, comments, archived=False):
+    data = sr_to_dict(sr)
+    data.update({
+        "description": sr.description,
+        "address": sr.address,
+        "closed_by": _username(sr.closed_by),
+        "comments": [comment_to_dict(c) for c in comments],
+        "archived": archived,
+    })
+    return data
+
+
+def comment_to_dict(comment):
+    return {
+        "id": comment.id,
+        "user": _username(comment.user),
+        "comment": comment.comment,
+        "is_internal": comment.is_internal,
+        "created_at": _datetime(comment.created_at),
+    }
+
+
+def _visible_comments(sr, user):
+    comments = sr.comments.select_related("user").order_by("created_at")
+    if not user.is_staff:
+        comments = comments.filter(is_internal=False)
+    return comments
+
+
+def _detail_queryset():
+    return ServiceRequest.objects.select_related("created_by", "assigned_to", "closed_by")
+
+
+def _detail_etag(request, sr_id, updated_at):
+    return _make_etag(sr_id, updated_at.isoformat(), request.user.is_staff)
+
+
+def _detail_response(request, sr_id, status=200):
+    sr = _detail_queryset().get(pk=sr_id)
+    response = JsonResponse(
+        sr_detail_dict(sr, _visible_comments(sr, request.user)), status=status
+    )
+    return _with_validators(response, _detail_etag(request, sr.pk, sr.updated_at), sr.updated_at)
+
+
+def _archived_detail_response(request, sr_id):
+    """
+    Detail of an SR moved to the cold archive (see archive.py), or 404.
+    Archived records never change, so they validate like a live SR.
+    """
+    archived = archive.load(sr_id=sr_id)
+    if archived is None:
+        raise Http404("No ServiceRequest matches the given query.")
+    sr, comments = archived
+    etag = _make_etag(sr.pk, sr.updated_at.isoformat(), request.user.is_staff, "archived")
+    not_modified = _conditional(request, etag, sr.updated_at)
+    if not_modified is not None:
+        return not_modified
+
+    if not request.user.is_staff:
+        comments = [comment for comment in comments if not comment.is_internal]
+    response = JsonResponse(sr_detail_dict(sr, comments, archived=True))
+    return _with_validators(response, etag, sr.updated_at)
+
+
+def _list_params(request):
+    """
+    Filtered queryset, sort and page size for a list request, or an error response.
+    """
+    srs, filters, warnings = filter_service_requests(
+        ServiceRequest.objects.all(), request.GET
+    )
+    if warnings:
+        return JsonResponse({"errors": warnings}, status=400)
+
+    sort_by = filters["sort"]
+    if sort_by not in VALID_SORTS:
+        sort_by = "-created_at"
+
+    try:
+        per_page = min(int(request.GET.get("per_page", API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+    except ValueError:
+        per_page = API_PAGE_SIZE
+    return srs, sort_by, max(per_page, 1)
+
+
+def _list_etag(request, version, per_page):
+    # Any SR write changes the version, so it validates every filter at once
+    values, watermark = version
+    return _make_etag(
+        request.GET.urlencode(), sorted(values.items()), _datetime(watermark), per_page
+    )
+
+
+def _list_rows(srs):
+    return srs.select_related("created_by", "assigned_to").defer("description", "address")
+
+
+def _list_response(page, etag, last_modified):
+    response = JsonResponse({
+        "results": [sr_to_dict(sr) for sr in page],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    })
+    return _with_validators(response, etag, last_modified)
+
+
+# ---- Views ----
+
+@api_login_required
+@require_http_methods(["GET", "POST"])
+def api_sr_list(request):
+    if request.method == "POST":
+        return _create_sr(request)
+
+    params = _list_params(request)
+    if isinstance(params, JsonResponse):
+        return params
+    srs, sort_by, per_page = params
+
+    # No SR changed since the client's copy: two small-table reads instead
+    # of building the page. Read before the page, so a write landing in
+    # between only costs the client one extra 200
+    version = counters.list_version()
+    etag = _list_etag(request, version, per_page)
+    not_modified = _conditional(request, etag, version[1])
+    if not_modified is not None:
+        return not_modified
+
+    page = keyset_paginate(
+        _list_rows(srs), sort_by, request.GET.get("cursor"), per_page
+    )
+    return _list_response(page, etag, version[1])
+
+
+@api_login_required
+async def aapi_sr_list(request):
+    """
+    api_sr_list for ASGI workers: reads go through the async ORM.
+    """
+    if request.method == "POST":
+        return await sync_to_async(_create_sr)(request)
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET", "POST"])
+
+    # Search backend detection may introspect the DB, so build the queryset in a thread
+    params = await sync_to_async(_list_params)(request)
+    if isinstance(params, JsonResponse):
+        return params
+    srs, sort_by, per_page = params
+
+    version = await counters.alist_version()
+    etag = _list_etag(request, version, per_page)
+    not_modified = _conditional(request, etag, version[1])
+    if not_modified is not None:
+        return not_modified
+
+    page = await akeyset_paginate(
+        _list_rows(srs), sort_by, request.GET.get("cursor"), per_page
+    )
+    await master_data.aload()
+    return _list_response(page, etag, version[1])
+
+
+def _create_sr(request):
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({"errors": {"body": "Invalid JSON object"}}, status=400)
+
+    cleaned, errors = clean_sr_data(data)
+    if errors:
+        return JsonResponse({"errors": errors}, status=400)
+
+    open_status = master_data.get_status(SRStatus.STATUS_OPEN)
+    if open_status is None:
+        return JsonResponse({"error": "SR master data not found"}, status=503)
+
+    with transaction.atomic():
+        sr = ServiceRequest.objects.create(
+            category=cleaned["category"],
+            account_number=cleaned["account_number"],
+            sr_nature=cleaned["sr_nature"],
+            sr_type=cleaned["sr_type"],
+            subject=cleaned["subject"],
+            description=cleaned["description"],
+            email=cleaned["email"],
+            phone=cleaned["phone"],
+            address=cleaned["address"],
+            created_by=request.user,
+            assigned_to_id=assignment.assignee_for(request.user, cleaned["sr_type"].id),
+            status=open_status,
+        )
+
+    return _detail_response(request, sr.id, status=201)
+
+
+@api_login_required
+@require_GET
+def api_sr_detail(request, sr_id):
+    # Only updated_at is read before deciding whether to answer 304
+    updated_at = ServiceRequest.objects.filter(id=sr_id).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        # Old closed SRs are served from the cold archive
+        return _archived_detail_response(request, sr_id)
+    not_modified = _conditional(request, _detail_etag(request, sr_id, updated_at), updated_at)
+    if not_modified is not None:
+        return not_modified
+
+    return _detail_response(request, sr_id)
+
+
+@api_login_required
+async def aapi_sr_detail(request, sr_id):
+    """
+    api_sr_detail for ASGI workers.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+
+    try:
+        updated_at = await ServiceRequest.objects.values_list(
+            "updated_at", flat=True
+        ).aget(id=sr_id)
+    except ServiceRequest.DoesNotExist:
+        return await sync_to_async(_archived_detail_response)(request, sr_id)
+
+    etag = _detail_etag(request, sr_id, updated_at)
+    not_modified = _conditional(request, etag, updated_at)
+    if not_modified is not None:
+        return not_modified
+
+    sr = await _detail_queryset().aget(pk=sr_id)
+    comments = [c async for c in _visible_comments(sr, request.user)]
+    await master_data.aload()
+    response = JsonResponse(sr_detail_dict(sr, comments))
+    return _with_validators(response, _detail_etag(request, sr.pk, sr.updated_at), sr.updated_at)
+
+
+@api_login_required
+@require_POST
+def api_sr_comment(request, sr_id):
+    sr = get_object_or_404(ServiceRequest, id=sr_id)
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({"errors": {"body": "Invalid JSON object"}}, status=400)
+    if not str(data.get("comment") or "").strip():
+        return JsonResponse({"errors": {"comment": "Comment cannot be empty."}}, status=400)
+
+    try:
+        with transaction.atomic():
+            comment = add_comment(sr, request.user, data.get("comment"))
+    except SRActionError as e:
+        return JsonResponse({"error": str(e)}, status=409)
+
+    return JsonResponse(comment_to_dict(comment), status=201)
+
+
+@api_login_required
+@require_POST
+def api_sr_close(request, sr_id):
+    if not request.user.is_staff:
+        return JsonResponse(
+            {"error": "You don't have permission to close service requests."}, status=403
+        )
+
+    sr = get_object_or_404(ServiceRequest, id=sr_id)
+    try:
+        with transaction.atomic():
+            close_service_request(sr, request.user)
+    except SRActionError as e:
+        return JsonResponse({"error": str(e)}, status=409)
+
+    return _detail_response(request, sr.id)
+
+
+@api_login_required
+@require_POST
+def api_sr_claim(request):
+    """
+    Assign the next unassigned open SR to the caller; 204 when none is left.
+    """
+    if not request.user.is_staff:
+        return JsonResponse(
+            {"error": "You don't have permission to claim service requests."}, status=403
+        )
+
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({"errors": {"body": "Invalid JSON object"}}, status=400)
+    order = data.get("order") or work_queue.DEFAULT_ORDER
+    if order not in work_queue.QUEUE_ORDERS:
+        return JsonResponse(
+            {"errors": {"order": f"Must be one of {', '.join(work_queue.QUEUE_ORDERS)}"}}, status=400
+        )
+
+    sr = work_queue.claim_next(request.user, order)
+    if sr is None:
+        return HttpResponse(status=204)
+    return _detail_response(request, sr.id)
@@ -0,0 +1,196 @@
+"""
+Cold archive for old closed SRs.
+
+``archive_srs`` moves SRs closed before the retention window out of the
+live tables: each SR and its comments become one zlib-compressed record
+(Django's JSON serialization of the rows) appended to a segment file under
+``SR_ARCHIVE_DIR``. Segments are append-only and a new one is started once
+the current one passes ``SR_ARCHIVE_SEGMENT_BYTES``. Each record is framed
+by its 4-byte length, so a segment can be read back without the index.
+
+SRArchiveIndex maps sr_id / sr_number to (segment, offset, length), so
+reading an archived SR is one index lookup and one seek. Each chunk locks
+the ``sr_archive`` watermark row, writes and fsyncs its records, then adds
+the index rows and deletes the live rows in the same transaction: a failed
+chunk leaves at most unreferenced records in a segment, never a lost SR.
+"""
+import os
+import struct
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.db import transaction
+
+from . import counters, master_data, search
+from .models import ServiceRequest, SRArchiveIndex, SRComment, SRStatus, SRWatermark
+
+
+LOCK_NAME = "sr_archive"
+HEADER = struct.Struct(">I")
+COMPRESSION_LEVEL = 6
+
+
+def archive_dir():
+    return Path(getattr(settings, "SR_ARCHIVE_DIR", Path(settings.BASE_DIR) / "archive"))
+
+
+def segment_path(segment):
+    return archive_dir() / f"segment-{segment:06d}.srz"
+
+
+def _open_segment():
+    # The newest segment, or the next one when it is full
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    numbers = [int(path.stem.split("-")[1]) for path in directory.glob("segment-*.srz")]
+    segment = max(numbers, default=1)
+    path = segment_path(segment)
+    if path.exists() and path.stat().st_size >= settings.SR_ARCHIVE_SEGMENT_BYTES:
+        segment += 1
+    return segment
+
+
+# ---- Records ----
+
+def encode(sr, comments):
+    data = serializers.serialize("json", [sr, *comments])
+    return zlib.compress(data.encode(), COMPRESSION_LEVEL)
+
+
+def decode(blob):
+    """
+    (unsaved ServiceRequest, [unsaved SRComment]) from a record.
+    """
+    objects = [item.object for item in serializers.deserialize("json", zlib.decompress(blob))]
+    return objects[0], objects[1:]
+
+
+def append_records(blobs):
+    """
+    Append ``blobs`` to the current segment and fsync it.
+    Returns (segment, [(offset, length)]).
+    """
+    segment = _open_segment()
+    positions = []
+    with open(segment_path(segment), "ab") as f:
+        offset = f.tell()
+        for blob in blobs:
+            f.write(HEADER.pack(len(blob)))
+            f.write(blob)
+            positions.append((offset, len(blob)))
+            offset += HEADER.size + len(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    return segment, positions
+
+
+def read_record(entry):
+    with open(segment_path(entry.segment), "rb") as f:
+        f.seek(entry.offset)
+        (length,) = HEADER.unpack(f.read(HEADER.size))
+        return decode(f.read(length))
+
+
+# ---- Archiving ----
+
+def _code(master):
+    return master.code if master else ""
+
+
+def candidates(before, using="default"):
+    """
+    Closed SRs whose closing is older than ``before``, oldest first.
+    """
+    closed = master_data.get_status(SRStatus.STATUS_CLOSED)
+    if closed is None:
+        return ServiceRequest.objects.using(using).none()
+    return ServiceRequest.objects.using(using).filter(
+        status_id=closed.id, closed_at__lt=before
+    ).order_by("closed_at", "id")
+
+
+def archive_chunk(before, chunk_size=500, using="default"):
+    """
+    Archive up to ``chunk_size`` candidates in one transaction.
+    Returns the number archived (0 when none are left).
+    """
+    SRWatermark.objects.using(using).get_or_create(name=LOCK_NAME)
+    with transaction.atomic(using=using):
+        # One archiver at a time appends to the segments
+        SRWatermark.objects.using(using).select_for_update().get(name=LOCK_NAME)
+        srs = list(candidates(before, using).select_for_update()[:chunk_size])
+        if not srs:
+            return 0
+
+        comments = defaultdict(list)
+        for comment in (
+            SRComment.objects.using(using)
+            .filter(service_request_id__in=[sr.id for sr in srs])
+            .order_by("created_at", "id")
+        ):
+            comments[comment.service_request_id].append(comment)
+
+        segment, positions = append_records([encode(sr, comments[sr.id]) for sr in srs])
+        SRArchiveIndex.objects.using(using).bulk_create([
+            SRArchiveIndex(
+                sr_id=sr.id, sr_number=sr.sr_number, segment=segment,
+                offset=offset, length=length, closed_at=sr.closed_at,
+                category=sr.category, created_at=sr.created_at,
+                nature_code=_code(master_data.get_nature_by_id(sr.sr_nature_id)),
+                type_code=_code(master_data.get_type_by_id(sr.sr_type_id)),
+            )
+            for sr, (offset, length) in zip(srs, positions)
+        ])
+        # Raw deletes, without the delete signals: archived SRs stay in the
+        # dashboard counters (see counters.compute_counters) and, being
+        # closed, hold no agent load. Only the search rows have to go, and
+        # the archived counter goes up for the SR list's live counts
+        ids = [sr.id for sr in srs]
+        SRComment.objects.using(using).filter(service_request_id__in=ids)._raw_delete(using)
+        ServiceRequest.objects.using(using).filter(id__in=ids)._raw_delete(using)
+        search.remove_service_requests(ids, using=using)
+        counters.apply_deltas({counters.ARCHIVED_KEY: len(ids)}, using=using)
+        counters.mark_list_changed(using=using)
+    return len(srs)
+
+
+def archive(before, chunk_size=500, limit=None, using="default"):
+    """
+    Archive every candidate (at most ``limit``) chunk by chunk.
+    Returns the number archived.
+    """
+    archived = 0
+    while limit is None or archived < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - archived)
+        done = archive_chunk(before, size, using)
+        if not done:
+            break
+        archived += done
+    return archived
+
+
+# ---- Lookups ----
+
+def load(sr_id=None, sr_number=None, using="default"):
+    """
+    (ServiceRequest, comments) of an archived SR by id or number, or None.
+    The objects are unsaved; the SR's users and the comment authors are
+    fetched in one query.
+    """
+    lookup = {"sr_id": sr_id} if sr_id is not None else {"sr_number": sr_number}
+    entry = SRArchiveIndex.objects.using(using).filter(**lookup).first()
+    if entry is None:
+        return None
+    sr, comments = read_record(entry)
+    user_fields = ("created_by", "assigned_to", "closed_by")
+    user_ids = {getattr(sr, f"{field}_id") for field in user_fields} | {c.user_id for c in comments}
+    users = User.objects.using(using).in_bulk(user_ids - {None})
+    for field in user_fields:
+        ServiceRequest._meta.get_field(field).set_cached_value(sr, users.get(getattr(sr, f"{field}_id")))
+    for comment in comments:
+        comment.user = users.get(comment.user_id)
+    return sr, comments
@@ -0,0 +1,255 @@
+"""
+Automatic assignment of new SRs to the least-loaded agent.
+
+Each agent's open + WIP SR count lives in ``sr_agent_load`` and is adjusted
+by the SR signals in the same transaction as the SR write, so picking an
+agent reads a small table instead of counting SRs per agent. An agent's load
+for an SR type is ``open_count / weight``, the weight coming from
+AgentSkill (1 when the agent has no row for the type, 0 = never assigned
+that type). Ties go to the agent assigned least recently.
+
+``pick_agent`` locks the chosen load row with SKIP LOCKED (on PostgreSQL),
+so concurrent creations spread over agents instead of queueing on one.
+``assign_bulk`` does the same choice in memory for many SRs at once (bulk
+rebalancing), and ``reconcile`` rebuilds the load table from the SRs.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import counters, master_data
+from .models import AgentLoad, AgentSkill, ServiceRequest, SRStatus
+from .sla import pending_statuses
+
+
+DEFAULT_WEIGHT = 1.0
+
+PENDING_STATUS_CODES = (SRStatus.STATUS_OPEN, SRStatus.STATUS_WIP)
+
+
+def _is_pending(status_id):
+    status = master_data.get_status_by_id(status_id)
+    return status is not None and status.code in PENDING_STATUS_CODES
+
+
+# ---- Load index ----
+
+def deltas_for_save(instance, created):
+    """
+    Load changes ({user_id: +/-n}) caused by saving ``instance``.
+    """
+    deltas = Counter()
+    new_agent = instance.assigned_to_id if _is_pending(instance.status_id) else None
+
+    if created:
+        old_agent = None
+    else:
+        old = getattr(instance, "_loaded_values", None)
+        if old is None:
+            # Unknown previous state; rebalance_agents --reconcile catches it up
+            return deltas
+        old_agent = old["assigned_to_id"] if _is_pending(old["status_id"]) else None
+
+    if old_agent != new_agent:
+        if old_agent:
+            deltas[old_agent] -= 1
+        if new_agent:
+            deltas[new_agent] += 1
+    return deltas
+
+
+def deltas_for_delete(instance):
+    old = getattr(instance, "_loaded_values", None) or instance._tracked_values()
+    if old["assigned_to_id"] and _is_pending(old["status_id"]):
+        return Counter({old["assigned_to_id"]: -1})
+    return Counter()
+
+
+def apply_deltas(deltas, using="default"):
+    """
+    Add ``deltas`` to the agents' loads, in user id order so concurrent
+    writers lock rows in the same sequence. Users without a load row
+    (not agents) are skipped.
+    """
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        for user_id in sorted(deltas):
+            if deltas[user_id]:
+                AgentLoad.objects.using(using).filter(user_id=user_id).update(
+                    open_count=F("open_count") + deltas[user_id], updated_at=now
+                )
+
+
+def ensure_agent(user, was_agent=False, using="default"):
+    """
+    Give active staff a load row that accepts new SRs, and reactivate the
+    row when ``user`` has just become active staff again (``was_agent`` is
+    their state before the save); stop assigning to anyone else. Agents
+    taken out of rotation by ``reassign_from`` stay out when saved.
+    """
+    if user.is_staff and user.is_active:
+        _, created = AgentLoad.objects.using(using).get_or_create(user=user)
+        if not created and not was_agent:
+            AgentLoad.objects.using(using).filter(user=user).update(accepting=True)
+    else:
+        AgentLoad.objects.using(using).filter(user=user).update(accepting=False)
+
+
+def reconcile(using="default"):
+    """
+    Recompute every agent's load from the SR table, creating load rows for
+    active staff that have none. Returns {user_id: (old, new)} for drifted rows.
+    """
+    with transaction.atomic(using=using):
+        staff_ids = User.objects.using(using).filter(is_staff=True, is_active=True).values_list("id", flat=True)
+        existing = dict(
+            AgentLoad.objects.using(using).select_for_update().values_list("user_id", "open_count")
+        )
+        AgentLoad.objects.using(using).bulk_create(
+            [AgentLoad(user_id=user_id) for user_id in staff_ids if user_id not in existing]
+        )
+        counts = dict(
+            ServiceRequest.objects.using(using).order_by()
+            .filter(status_id__in=pending_statuses(), assigned_to__isnull=False)
+            .values_list("assigned_to_id").annotate(n=Count("id"))
+        )
+
+        drift = {}
+        for user_id in AgentLoad.objects.using(using).values_list("user_id", flat=True):
+            old, new = existing.get(user_id), counts.get(user_id, 0)
+            if old != new:
+                drift[user_id] = (old, new)
+                AgentLoad.objects.using(using).filter(user_id=user_id).update(open_count=new)
+    return drift
+
+
+# ---- Picking agents ----
+
+def _skill_weight(sr_type_id):
+    return Coalesce(
+        Subquery(
+            AgentSkill.objects.filter(user_id=OuterRef("user_id"), sr_type_id=sr_type_id)
+            .values("weight")[:1]
+        ),
+        Value(DEFAULT_WEIGHT),
+    )
+
+
+def candidates(sr_type_id, using="default"):
+    """
+    Agents that may take an SR of this type, least loaded first.
+    """
+    return (
+        AgentLoad.objects.using(using)
+        .filter(accepting=True, user__is_active=True)
+        .annotate(weight=_skill_weight(sr_type_id))
+        .filter(weight__gt=0)
+        .annotate(score=ExpressionWrapper(F("open_count") * 1.0 / F("weight"), output_field=FloatField()))
+        .order_by("score", "updated_at", "user_id")
+    )
+
+
+def pick_agent(sr_type_id, using="default"):
+    """
+    The least-loaded agent's user id for a new SR of this type, or None.
+    Call inside the transaction that saves the SR.
+    """
+    agent = (
+        candidates(sr_type_id, using)
+        .select_for_update(skip_locked=True, of=("self",))
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    return agent
+
+
+def assignee_for(creator, sr_type_id, using="default"):
+    """
+    Who a new SR is assigned to: an agent creating it keeps it, anything
+    else goes to the least-loaded agent (unless SR_AUTO_ASSIGN is off).
+    """
+    if creator is not None and creator.is_staff:
+        return creator.id
+    if not getattr(settings, "SR_AUTO_ASSIGN", True):
+        return None
+    return pick_agent(sr_type_id, using)
+
+
+def assign_bulk(srs, exclude=(), using="default"):
+    """
+    Set ``assigned_to_id`` on each of ``srs`` (anything with ``sr_type_id``)
+    to the least-loaded agent, counting the assignments made so far.
+    Loads are read once; the caller saves the SRs and the load deltas.
+    Returns {user_id: SRs assigned}.
+    """
+    agents = list(
+        AgentLoad.objects.using(using)
+        .filter(accepting=True, user__is_active=True)
+        .exclude(user_id__in=exclude)
+        .order_by("updated_at", "user_id")
+        .values_list("user_id", "open_count")
+    )
+    loads = dict(agents)
+    tie_break = {user_id: n for n, (user_id, _) in enumerate(agents)}
+    weights = {
+        (user_id, sr_type_id): weight
+        for user_id, sr_type_id, weight in
+        AgentSkill.objects.using(using).values_list("user_id", "sr_type_id", "weight")
+    }
+
+    eligible = {}
+    assigned = Counter()
+    for sr in srs:
+        if sr.sr_type_id not in eligible:
+            eligible[sr.sr_type_id] = [
+                (user_id, weight) for user_id in loads
+                for weight in [weights.get((user_id, sr.sr_type_id), DEFAULT_WEIGHT)]
+                if weight > 0
+            ]
+        options = eligible[sr.sr_type_id]
+        if not options:
+            sr.assigned_to_id = None
+            continue
+        user_id, _ = min(options, key=lambda o: (loads[o[0]] / o[1], tie_break[o[0]]))
+        sr.assigned_to_id = user_id
+        loads[user_id] += 1
+        assigned[user_id] += 1
+    return assigned
+
+
+def reassign_from(user_ids, using="default"):
+    """
+    Stop auto-assigning to ``user_ids`` and spread their open / WIP SRs over
+    the remaining agents. Returns {new user_id: SRs moved}.
+    """
+    with transaction.atomic(using=using):
+        AgentLoad.objects.using(using).filter(user_id__in=user_ids).update(accepting=False)
+        srs = list(
+            ServiceRequest.objects.using(using)
+            .filter(assigned_to_id__in=user_ids, status_id__in=pending_statuses())
+            .select_for_update()
+            .only("id", "sr_type_id", "assigned_to_id")
+        )
+        previous = Counter(sr.assigned_to_id for sr in srs)
+        assigned = assign_bulk(srs, exclude=user_ids, using=using)
+
+        by_agent = {}
+        for sr in srs:
+            by_agent.setdefault(sr.assigned_to_id, []).append(sr.id)
+        now = timezone.now()
+        for user_id, ids in by_agent.items():
+            for start in range(0, len(ids), 1000):
+                ServiceRequest.objects.using(using).filter(id__in=ids[start:start + 1000]).update(
+                    assigned_to_id=user_id, updated_at=now
+                )
+
+        deltas = Counter(assigned)
+        deltas.subtract(previous)
+        apply_deltas(deltas, using=using)
+        counters.mark_list_changed(using=using)
+    return assigned
@@ -0,0 +1,147 @@
+"""
+Helpers for the in-process HTTP benchmarks (management commands bench_*).
+
+Requests go through Django's test clients, so the full middleware and view
+stack runs without a network server: ``run_threaded`` and ``run_requests``
+drive the WSGI handler from a thread pool, ``run_async`` drives the ASGI handler from
+asyncio tasks on one event loop.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.contrib.auth.models import User
+from django.contrib.messages import constants as message_constants, get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import close_old_connections, connections
+from django.test import AsyncClient, Client
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    Latency percentiles (ms) and throughput for one run.
+    """
+    samples = sorted(latencies)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+    }
+
+
+def session_cookies(username):
+    """
+    Session cookies of a logged-in ``username``, shared by all bench clients.
+    """
+    client = Client()
+    client.force_login(User.objects.get(username=username))
+    return client.cookies
+
+
+def _is_error(response):
+    return response.status_code >= 400
+
+
+def expect(status=200, location=None, success_message=False):
+    """
+    Response check for ``run_requests``: the request only counts as a
+    success with this status, redirect target and (for the form posts, which
+    redirect or re-render on failure too) a success message queued.
+    """
+    def check(response):
+        if response.status_code != status:
+            return False
+        if location is not None and response.get("Location") != location:
+            return False
+        if success_message:
+            levels = [message.level for message in get_messages(response.wsgi_request)]
+            return message_constants.SUCCESS in levels
+        return True
+    return check
+
+
+def run_threaded(paths, total, concurrency, cookies=None):
+    """
+    ``total`` GETs spread over ``paths`` from ``concurrency`` threads.
+    Returns (latencies, errors, elapsed).
+    """
+    urls = islice(cycle(paths), total)
+    return run_requests([("get", url, None) for url in urls], concurrency, cookies)
+
+
+def run_requests(requests, concurrency, cookies=None):
+    """
+    Send ``requests``, a list of (method, url, data[, check]) tuples, from
+    ``concurrency`` threads. A request is an error when ``check(response)``
+    is false, or without a check, when it answers 4xx/5xx.
+    Returns (latencies, errors, elapsed).
+    """
+    shares = [requests[i::concurrency] for i in range(concurrency)]
+
+    def worker(share):
+        client = Client()
+        if cookies:
+            client.cookies.update(cookies)
+        latencies, errors = [], 0
+        for method, url, data, *check in share:
+            # A browser follows the redirect and shows the flash messages;
+            # drop them so a check only sees this request's messages
+            client.cookies.pop(CookieStorage.cookie_name, None)
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            latencies.append(time.perf_counter() - started)
+            errors += not check[0](response) if check else _is_error(response)
+            # The test client skips the end-of-request connection cleanup
+            # that a real WSGI server does
+            close_old_connections()
+        connections.close_all()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, shares))
+    elapsed = time.perf_counter() - started
+
+    return (
+        [latency for latencies, _ in results for latency in latencies],
+        sum(errors for _, errors in results),
+        elapsed,
+    )
+
+
+async def run_async(paths, total, concurrency, cookies=None):
+    """
+    ``total`` GETs spread over ``paths`` from ``concurrency`` asyncio tasks.
+    Returns (latencies, errors, elapsed).
+    """
+    urls = list(islice(cycle(paths), total))
+    shares = [urls[i::concurrency] for i in range(concurrency)]
+    latencies, errors = [], 0
+
+    async def worker(share):
+        nonlocal errors
+        client = AsyncClient()
+        if cookies:
+            client.cookies.update(cookies)
+        for url in share:
+            started = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - started)
+            errors += _is_error(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(share) for share in shares))
+    return latencies, errors, time.perf_counter() - started
@@ -0,0 +1,51 @@
+"""
+Bulk creation of Service Requests.
+
+``bulk_create`` skips ``ServiceRequest.save()`` and the post_save signals, so
+this does their work for a whole batch at once: SR numbers are allocated in
+one block, and counters, daily rollups and the search index get one update
+per batch instead of one per row.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import assignment, counters, rollups, search
+from .sla import apply_sla
+from .models import ServiceRequest
+from .sr_numbers import allocate_sr_numbers
+
+
+def bulk_create_service_requests(objs, using="default", batch_size=500):
+    """
+    Insert unsaved ServiceRequest instances in one transaction.
+    Returns the created objects with primary keys set.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+
+    with transaction.atomic(using=using):
+        numbers = iter(allocate_sr_numbers(sum(1 for obj in objs if not obj.sr_number), using=using))
+        for obj in objs:
+            if not obj.sr_number:
+                obj.sr_number = next(numbers)
+            if obj.due_at is None:
+                apply_sla(obj)
+
+        created = ServiceRequest.objects.using(using).bulk_create(objs, batch_size=batch_size)
+
+        counter_deltas, rollup_deltas, load_deltas = Counter(), Counter(), Counter()
+        for obj in created:
+            counter_deltas.update(counters.deltas_for_save(obj, True))
+            rollup_deltas.update(rollups.deltas_for_save(obj, True))
+            load_deltas.update(assignment.deltas_for_save(obj, True))
+            obj._loaded_values = obj._tracked_values()
+        counters.apply_deltas(counter_deltas, using=using)
+        rollups.apply_deltas(rollup_deltas, using=using)
+        assignment.apply_deltas(load_deltas, using=using)
+
+        search.index_service_requests([obj.pk for obj in created], using=using)
+        counters.mark_list_changed(using=using)
+
+    return created
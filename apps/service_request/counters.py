@@ -0,0 +1,220 @@
+"""
+Dashboard counters maintained alongside ServiceRequest writes.
+
+Instead of COUNT(*) over the SR table on every dashboard load, each create,
+status/category change and delete adjusts a handful of rows in
+``sr_counter`` inside the same transaction as the SR write.
+"""
+from collections import Counter
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import master_data
+from .models import ServiceRequest, SRArchiveIndex, SRCounter, SRStatus, SRWatermark
+
+
+TOTAL_KEY = "total"
+
+# Of which archived (closed, moved out of the live table by archive.py); the
+# SR list subtracts these to count live SRs only
+ARCHIVED_KEY = "archived"
+
+# Watermark moved to the time of the latest committed SR write of any kind
+LIST_WATERMARK = "sr_list"
+
+
+def status_key(code):
+    return f"status:{code}"
+
+
+def category_key(category):
+    return f"category:{category}"
+
+
+def status_code(status_id):
+    status = master_data.get_status_by_id(status_id)
+    return status.code if status else None
+
+
+def current_status_code(instance):
+    if ServiceRequest.status.is_cached(instance) and instance.status is not None:
+        return instance.status.code
+    return status_code(instance.status_id)
+
+
+def deltas_for_save(instance, created):
+    """
+    Counter changes caused by saving ``instance``.
+    """
+    deltas = Counter()
+
+    if created:
+        deltas[TOTAL_KEY] += 1
+        deltas[status_key(current_status_code(instance))] += 1
+        deltas[category_key(instance.category)] += 1
+        return deltas
+
+    old = getattr(instance, "_loaded_values", None)
+    if old is None:
+        # Unknown previous state; reconcile_sr_counters will catch it up
+        return deltas
+
+    if old["status_id"] != instance.status_id:
+        deltas[status_key(status_code(old["status_id"]))] -= 1
+        deltas[status_key(current_status_code(instance))] += 1
+
+    if old["category"] != instance.category:
+        deltas[category_key(old["category"])] -= 1
+        deltas[category_key(instance.category)] += 1
+
+    return deltas
+
+
+def deltas_for_delete(instance):
+    old = getattr(instance, "_loaded_values", None) or instance._tracked_values()
+    return Counter({
+        TOTAL_KEY: -1,
+        status_key(status_code(old["status_id"])): -1,
+        category_key(old["category"]): -1,
+    })
+
+
+def apply_deltas(deltas, using="default"):
+    """
+    Add ``deltas`` ({key: +/-n}) to the counter rows.
+
+    Keys are updated in sorted order so concurrent writers always lock the
+    rows in the same sequence.
+    """
+    with transaction.atomic(using=using):
+        for key in sorted(deltas):
+            delta = deltas[key]
+            if not delta:
+                continue
+            counters = SRCounter.objects.using(using).filter(key=key)
+            if not counters.update(value=F("value") + delta):
+                SRCounter.objects.using(using).get_or_create(key=key)
+                counters.update(value=F("value") + delta)
+
+    if any(deltas.values()):
+        # Once committed, so the refresh reads the new values
+        from .dashboard_cache import invalidate
+        transaction.on_commit(invalidate, using=using)
+
+
+def read_counters(using="default"):
+    """
+    All counters as a {key: value} dict (a single small-table read).
+    """
+    return dict(SRCounter.objects.using(using).values_list("key", "value"))
+
+
+async def aread_counters(using="default"):
+    """
+    read_counters() for async views.
+    """
+    return {
+        key: value
+        async for key, value in SRCounter.objects.using(using).values_list("key", "value")
+    }
+
+
+def compute_counters(using="default"):
+    """
+    Counter values recomputed from the SR table itself, plus the archived
+    SRs (all closed) from the archive index.
+    """
+    srs = ServiceRequest.objects.using(using).order_by()
+    values = Counter({TOTAL_KEY: srs.count()})
+
+    for code in SRStatus.objects.using(using).values_list("code", flat=True):
+        values[status_key(code)] = 0
+    for row in srs.values("status__code").annotate(n=Count("id")):
+        values[status_key(row["status__code"])] = row["n"]
+    for row in srs.values("category").annotate(n=Count("id")):
+        values[category_key(row["category"])] = row["n"]
+
+    archived = SRArchiveIndex.objects.using(using).order_by()
+    values[ARCHIVED_KEY] = 0
+    for row in archived.values("category").annotate(n=Count("id")):
+        values[TOTAL_KEY] += row["n"]
+        values[ARCHIVED_KEY] += row["n"]
+        values[status_key(SRStatus.STATUS_CLOSED)] += row["n"]
+        values[category_key(row["category"])] += row["n"]
+
+    return values
+
+
+def reconcile(using="default"):
+    """
+    Overwrite the counter table with freshly computed values.
+
+    Returns {key: (old, new)} for every counter that had drifted.
+    """
+    with transaction.atomic(using=using):
+        # Lock existing rows so concurrent increments queue up behind us
+        current = dict(
+            SRCounter.objects.using(using)
+            .select_for_update()
+            .values_list("key", "value")
+        )
+        values = compute_counters(using)
+
+        drift = {}
+        for key in set(current) | set(values):
+            new = values.get(key, 0)
+            old = current.get(key)
+            if old == new:
+                continue
+            if old is not None or new:
+                # A missing row for a count of 0 is not drift
+                drift[key] = (old, new)
+            SRCounter.objects.using(using).update_or_create(
+                key=key, defaults={"value": new}
+            )
+    if drift:
+        from .dashboard_cache import invalidate
+        invalidate()
+    return drift
+
+
+# ---- List version ----
+
+def _move_list_watermark(using):
+    now = timezone.now()
+    if not SRWatermark.objects.using(using).filter(name=LIST_WATERMARK).update(position=now):
+        SRWatermark.objects.using(using).get_or_create(name=LIST_WATERMARK, defaults={"position": now})
+
+
+def mark_list_changed(using="default"):
+    """
+    Record that SRs changed, once the current transaction commits.
+
+    Called for every SR write (the signals, and the bulk paths that bypass
+    them). Done after commit so SR writes never queue on the watermark row;
+    a reader that sees the new rows before the watermark moves only misses
+    a 304 once.
+    """
+    transaction.on_commit(partial(_move_list_watermark, using), using=using)
+
+
+def _list_watermark(using):
+    return SRWatermark.objects.using(using).filter(name=LIST_WATERMARK).values_list("position", flat=True)
+
+
+def list_version(using="default"):
+    """
+    (counters, watermark position): changes whenever any SR is created,
+    changed, commented on or deleted, read without touching the SR table.
+    """
+    return read_counters(using), _list_watermark(using).first()
+
+
+async def alist_version(using="default"):
+    """
+    list_version() for async views.
+    """
+    return await aread_counters(using), await _list_watermark(using).afirst()
@@ -0,0 +1,138 @@
+"""
+Dashboard data (counters and creation trend) cached with single-flight
+refresh.
+
+Each trend range is cached as one entry that is fresh for
+``DASHBOARD_CACHE_TTL`` seconds and then kept as a stale copy. When it goes
+stale, the first request to take the refresh lock (``cache.add``) recomputes
+it while every other request keeps serving the stale copy, so a burst of
+dashboard loads costs one recompute instead of one per request. Only a cold
+cache makes requests wait, briefly, for the refresher.
+
+SR creations, status / category changes and deletions mark every entry
+stale by bumping a generation number (see ``counters.apply_deltas``), so
+the dashboard catches up on the next load rather than after the TTL.
+With a process-local cache the coalescing is per worker; a shared cache
+backend makes it host or cluster wide.
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .counters import aread_counters, read_counters
+from .rollups import atrend, trend
+
+
+GENERATION_KEY = "dashboard:generation"
+
+# How long a request without any cached copy waits for the refresher
+COLD_WAIT = 2.0
+POLL_INTERVAL = 0.05
+
+
+def _entry_key(days):
+    return f"dashboard:data:{days}"
+
+
+def _lock_key(days):
+    return f"dashboard:lock:{days}"
+
+
+def _lock_timeout():
+    # Lets another request take over if the refresher died mid-way
+    return getattr(settings, "DASHBOARD_CACHE_LOCK_TIMEOUT", 10)
+
+
+def _entry(data, generation):
+    return {
+        "data": data,
+        "generation": generation,
+        "fresh_until": time.time() + getattr(settings, "DASHBOARD_CACHE_TTL", 30),
+    }
+
+
+def _is_fresh(entry, generation):
+    return entry["generation"] == generation and time.time() < entry["fresh_until"]
+
+
+def invalidate():
+    """
+    Mark every cached dashboard stale; the next load refreshes it.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def dashboard_data(days):
+    """
+    {"counters": read_counters(), "trend": trend(days)}, from the cache
+    unless this request is the one refreshing it.
+    """
+    generation = _generation()
+    entry = cache.get(_entry_key(days))
+    if entry is not None and _is_fresh(entry, generation):
+        return entry["data"]
+
+    if cache.add(_lock_key(days), 1, _lock_timeout()):
+        try:
+            data = {"counters": read_counters(), "trend": trend(days)}
+            # Kept past its TTL as the stale copy served during refreshes
+            cache.set(_entry_key(days), _entry(data, generation), None)
+            return data
+        finally:
+            cache.delete(_lock_key(days))
+
+    if entry is not None:
+        return entry["data"]
+
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(_entry_key(days))
+        if entry is not None:
+            return entry["data"]
+    return {"counters": read_counters(), "trend": trend(days)}
+
+
+async def adashboard_data(days):
+    """
+    dashboard_data() for async views.
+    """
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, 1, None)
+        generation = await cache.aget(GENERATION_KEY, 1)
+    entry = await cache.aget(_entry_key(days))
+    if entry is not None and _is_fresh(entry, generation):
+        return entry["data"]
+
+    if await cache.aadd(_lock_key(days), 1, _lock_timeout()):
+        try:
+            data = {"counters": await aread_counters(), "trend": await atrend(days)}
+            await cache.aset(_entry_key(days), _entry(data, generation), None)
+            return data
+        finally:
+            await cache.adelete(_lock_key(days))
+
+    if entry is not None:
+        return entry["data"]
+
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        entry = await cache.aget(_entry_key(days))
+        if entry is not None:
+            return entry["data"]
+    return {"counters": await aread_counters(), "trend": await atrend(days)}
@@ -0,0 +1,91 @@
+"""
+Filters for Service Request lists, shared by list_sr and the export view so
+an export always contains exactly the rows the list shows.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from . import master_data
+from .search import search_service_requests
+
+
+VALID_SORTS = [
+    'sr_number', '-sr_number',
+    'created_at', '-created_at',
+    'status', '-status',
+]
+
+
+def _day_start(day):
+    # Midnight of ``day`` in the current time zone, as an aware datetime
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_service_requests(queryset, params):
+    """
+    Apply the list filters in ``params`` (request.GET) to ``queryset``.
+
+    Returns ``(queryset, filters, warnings)``: ``filters`` holds the cleaned
+    values (search, category, status, date_from, date_to, sort) and
+    ``warnings`` any messages for the user about ignored values.
+    """
+    warnings = []
+
+    search_query = params.get('search', '').strip()
+    if search_query:
+        # Ranked full-text match, see search.py
+        queryset = search_service_requests(queryset, search_query)
+
+    category = params.get('category', '').strip()
+    if category:
+        queryset = queryset.filter(category=category)
+
+    # Status codes are stored lowercase ("open", "wip", "closed")
+    status = params.get('status', '').strip()
+    if status:
+        # Filter on the FK column (from the cached master data) rather than
+        # joining the status table
+        status_obj = master_data.get_status(status.lower())
+        if status_obj is not None:
+            queryset = queryset.filter(status_id=status_obj.id)
+        else:
+            queryset = queryset.filter(status__code=status.lower())
+
+    date_from = params.get('date_from', '').strip()
+    date_to = params.get('date_to', '').strip()
+
+    # Half-open range on the raw column (created_at >= from, < day after to),
+    # so the created_at indexes apply; __date would wrap it in a function
+    if date_from:
+        try:
+            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
+            queryset = queryset.filter(created_at__gte=_day_start(date_from_obj.date()))
+        except ValueError:
+            warnings.append('Invalid start date format')
+
+    if date_to:
+        try:
+            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
+            queryset = queryset.filter(
+                created_at__lt=_day_start(date_to_obj.date() + timedelta(days=1))
+            )
+        except ValueError:
+            warnings.append('Invalid end date format')
+
+    # Searches default to relevance order (set by search_service_requests)
+    sort_by = params.get('sort', '').strip()
+    if not sort_by:
+        sort_by = 'relevance' if search_query else '-created_at'
+    if sort_by in VALID_SORTS:
+        queryset = queryset.order_by(sort_by)
+
+    filters = {
+        'search': search_query,
+        'category': category,
+        'status': status,
+        'date_from': date_from,
+        'date_to': date_to,
+        'sort': sort_by,
+    }
+    return queryset, filters, warnings
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.service_request import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move SRs closed more than --days ago, with their comments, from the "
+        "live tables into the compressed archive segments (SR_ARCHIVE_DIR)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=None,
+            help="Archive SRs closed more than this many days ago (default SR_ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="SRs per transaction")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many SRs")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only count the SRs that would be archived",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.SR_ARCHIVE_AFTER_DAYS
+        before = timezone.now() - timedelta(days=days)
+
+        if options["dry_run"]:
+            count = archive.candidates(before).count()
+            self.stdout.write(self.style.WARNING(f"SRs closed before {before:%Y-%m-%d} to archive: {count}"))
+            return
+
+        archived = archive.archive(before, chunk_size=options["chunk_size"], limit=options["limit"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archive done for SRs closed before {timezone.localtime(before):%Y-%m-%d}. "
+                f"SRs archived: {archived} (in {archive.archive_dir()})"
+            )
+        )
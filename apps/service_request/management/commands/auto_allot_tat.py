@@ -26,9 +26,10 @@ class Command(BaseCommand):
 
                 tat_value = random.choice(tat_pool)
 
+                # SRTATDays keys on the codes (see master_data.get_tat)
                 obj, created = SRTATDays.objects.get_or_create(
-                    sr_nature=nature,
-                    sr_type=sr_type,
+                    sr_nature=nature.code,
+                    sr_type=sr_type.code,
                     defaults={
                         'tat_days': tat_value,
                         'is_active': True
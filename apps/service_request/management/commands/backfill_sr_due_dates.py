@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, DateTimeField, F, When
+from django.utils import timezone
+from apps.service_request import counters, master_data
+from apps.service_request.models import ServiceRequest
+
+
+class Command(BaseCommand):
+    help = "Set tat and due_at on existing SRs that were created without them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # One CASE over every nature / type pair that has an active TAT
+        tat_cases, due_cases = [], []
+        for nature in master_data.active_natures():
+            for sr_type in master_data.active_types():
+                tat = master_data.get_tat(nature, sr_type)
+                if tat is None:
+                    continue
+                pair = {"sr_nature_id": nature.id, "sr_type_id": sr_type.id}
+                tat_cases.append(When(**pair, then=tat.id))
+                due_cases.append(When(**pair, then=F("created_at") + timedelta(days=tat.tat_days)))
+
+        if not tat_cases:
+            self.stdout.write(self.style.ERROR("No active TAT rows, run auto_allot_tat first"))
+            return
+
+        chunk_size = options["chunk_size"]
+        last_id = 0
+        updated = 0
+
+        while True:
+            ids = list(
+                ServiceRequest.objects
+                .filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                updated += ServiceRequest.objects.filter(
+                    id__gte=ids[0], id__lte=ids[-1], due_at__isnull=True,
+                ).update(
+                    tat_id=Case(*tat_cases, default=F("tat_id"), output_field=BigIntegerField()),
+                    due_at=Case(*due_cases, default=F("due_at"), output_field=DateTimeField()),
+                    # Moves the cache key of the SR's rendered fragments
+                    updated_at=timezone.now(),
+                )
+                counters.mark_list_changed()
+
+            last_id = ids[-1]
+            self.stdout.write(f"Updated {updated} SRs (up to id {last_id})")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Due dates backfilled. SRs updated: {updated}. "
+                f"Run scan_sla_breaches --full to mark those already overdue"
+            )
+        )
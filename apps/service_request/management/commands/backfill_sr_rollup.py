@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.service_request import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-day SR rollup used by the dashboard trend charts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Only rebuild the last N days (default: all history)",
+        )
+
+    def handle(self, *args, **options):
+        start_day = None
+        if options["days"]:
+            start_day = timezone.localdate() - timedelta(days=options["days"] - 1)
+
+        rows = rollups.backfill(start_day)
+
+        since = start_day.isoformat() if start_day else "the beginning"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SR rollup rebuilt from {since}. Rows written: {rows}"
+            )
+        )
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.service_request import bench
+
+
+DEFAULT_PATHS = ["/list_sr/", "/dashboard/", "/api/srs/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync views under the WSGI handler (thread pool) with the "
+        "async views under the ASGI handler (one event loop) at the same concurrency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User the requests log in as")
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--path", action="append", dest="paths",
+            help=f"URL to request (repeatable, default {' '.join(DEFAULT_PATHS)})",
+        )
+        parser.add_argument(
+            "--mode", choices=["both", "wsgi", "asgi"], default="both",
+            help="'both' runs each mode in its own process and compares them",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(username=options["username"]).exists():
+            raise CommandError(f"User not found: {options['username']}")
+        paths = options["paths"] or DEFAULT_PATHS
+
+        if options["mode"] == "both":
+            results = {mode: self._run_child(mode, options) for mode in ("wsgi", "asgi")}
+        else:
+            results = {options["mode"]: self._run(options["mode"], paths, options)}
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}, "
+            f"paths: {' '.join(paths)}"
+        )
+        self.stdout.write(f"{'mode':<6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<6}{result['rps']:>9}{result['p50_ms']:>10}"
+                f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['errors']:>8}"
+            )
+
+        if any(result["errors"] for result in results.values()):
+            self.stdout.write(self.style.WARNING("Some requests failed (status >= 400)"))
+        self.stdout.write(self.style.SUCCESS("Benchmark done"))
+
+    def _run(self, mode, paths, options):
+        if settings.ASYNC_VIEWS != (mode == "asgi"):
+            raise CommandError(
+                f"Run --mode {mode} with ASYNC_VIEWS={'True' if mode == 'asgi' else 'False'}"
+            )
+
+        cookies = bench.session_cookies(options["username"])
+        if mode == "asgi":
+            latencies, errors, elapsed = asyncio.run(bench.run_async(
+                paths, options["requests"], options["concurrency"], cookies
+            ))
+        else:
+            latencies, errors, elapsed = bench.run_threaded(
+                paths, options["requests"], options["concurrency"], cookies
+            )
+        return bench.summarize(latencies, elapsed, errors)
+
+    def _run_child(self, mode, options):
+        # URL routing picks sync or async views at import time, so each mode
+        # runs in a fresh process with ASYNC_VIEWS set accordingly
+        command = [
+            sys.executable, sys.argv[0], "bench_asgi", "--json", "--mode", mode,
+            "--username", options["username"],
+            "--concurrency", str(options["concurrency"]),
+            "--requests", str(options["requests"]),
+        ]
+        for path in options["paths"] or []:
+            command += ["--path", path]
+
+        env = dict(os.environ, ASYNC_VIEWS="True" if mode == "asgi" else "False")
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f"{mode} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])[mode]
@@ -0,0 +1,69 @@
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from apps.service_request import assignment, master_data
+from apps.service_request.models import AgentLoad, AgentSkill
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure auto-assignment throughput: one pick per new SR (the create "
+        "path) and in-memory bulk assignment (rebalancing). Runs against "
+        "temporary agents in a transaction that is rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agents", type=int, default=200)
+        parser.add_argument("--assignments", type=int, default=5000)
+        parser.add_argument(
+            "--skills", action="store_true",
+            help="Give each agent a random-looking weight for every SR type",
+        )
+
+    def handle(self, *args, **options):
+        types = [t.id for t in master_data.active_types()]
+        if not types:
+            raise CommandError("Load master data first (load_sr_master)")
+        n = options["assignments"]
+
+        with transaction.atomic():
+            # Only the temporary agents take work during the run
+            AgentLoad.objects.update(accepting=False)
+            users = User.objects.bulk_create([
+                User(username=f"bench_assign_{i:05d}", is_staff=True)
+                for i in range(options["agents"])
+            ])
+            user_ids = list(
+                User.objects.filter(username__startswith="bench_assign_").values_list("id", flat=True)
+            )
+            AgentLoad.objects.bulk_create([AgentLoad(user_id=user_id) for user_id in user_ids])
+            if options["skills"]:
+                AgentSkill.objects.bulk_create([
+                    AgentSkill(user_id=user_id, sr_type_id=type_id, weight=0.5 + (user_id * type_id) % 4 / 2)
+                    for user_id in user_ids for type_id in types
+                ])
+
+            started = time.perf_counter()
+            for i in range(n):
+                with transaction.atomic():
+                    agent = assignment.pick_agent(types[i % len(types)])
+                    # What the post_save signal does for the new SR
+                    assignment.apply_deltas({agent: 1})
+            single = time.perf_counter() - started
+
+            srs = [SimpleNamespace(sr_type_id=types[i % len(types)], assigned_to_id=None) for i in range(n)]
+            started = time.perf_counter()
+            assignment.assign_bulk(srs)
+            bulk = time.perf_counter() - started
+
+            loads = list(AgentLoad.objects.filter(user_id__in=user_ids).values_list("open_count", flat=True))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{len(users)} agents, {n} assignments")
+        self.stdout.write(f"per SR (create path): {n / single:.0f} assignments/s")
+        self.stdout.write(f"bulk (rebalance):     {n / bulk:.0f} assignments/s")
+        self.stdout.write(f"load spread after per-SR run: min {min(loads)}, max {max(loads)}")
+        self.stdout.write(self.style.SUCCESS("Benchmark done (all changes rolled back)"))
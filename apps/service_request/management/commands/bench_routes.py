@@ -0,0 +1,190 @@
+import json
+import random
+import subprocess
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.urls import reverse
+from apps.service_request import bench, master_data
+from apps.service_request.models import ServiceRequest, SRStatus
+
+
+ROUTES = [
+    "login", "dashboard", "list_sr", "view_sr",
+    "create_sr_submit", "add_sr_comment", "close_sr",
+]
+
+# Query strings list_sr is benchmarked with, used in turn
+LIST_FILTERS = [
+    {},
+    {"status": SRStatus.STATUS_OPEN},
+    {"status": SRStatus.STATUS_WIP, "sort": "created_at"},
+    {"category": "parented"},
+    {"search": "card"},
+    {"sort": "sr_number", "page": "3"},
+]
+
+
+def _sample_ids(queryset, n, rng):
+    """
+    Up to ``n`` random ids from ``queryset``, picked in runs of consecutive
+    ids after random starting points (no ORDER BY RANDOM() over the table).
+    """
+    bounds = queryset.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return []
+    ids = set()
+    for _ in range(max(10, n // 10)):
+        start = rng.randint(bounds["lo"], bounds["hi"])
+        ids.update(
+            queryset.filter(id__gte=start).order_by("id").values_list("id", flat=True)[:50]
+        )
+        if len(ids) >= n:
+            break
+    ids = sorted(ids)
+    rng.shuffle(ids)
+    return ids[:n]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the portal's routes (login, dashboard, list, view, create, "
+        "comment, close) with concurrent in-process clients and report latency "
+        "percentiles and requests/s per route as JSON. The write routes change "
+        "data: run against a seeded scratch database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="Staff user the requests log in as")
+        parser.add_argument("--password", help="Password of --username, needed for the login route")
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+        parser.add_argument(
+            "--route", action="append", dest="routes", choices=ROUTES,
+            help="Route to benchmark (repeatable, default all)",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix")
+        parser.add_argument("--output", help="Also write the JSON result to this file")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"User not found: {options['username']}")
+        if not user.is_staff:
+            raise CommandError("The benchmark user must be staff (close_sr is staff only)")
+
+        routes = options["routes"] or ROUTES
+        if "login" in routes and not options["password"]:
+            raise CommandError("--password is required for the login route")
+
+        rng = random.Random(options["seed"])
+        cookies = bench.session_cookies(user.username)
+        result = {
+            "revision": _git_revision(),
+            "timestamp": int(time.time()),
+            "concurrency": options["concurrency"],
+            "requests_per_route": options["requests"],
+            "service_requests": ServiceRequest.objects.count(),
+            "routes": {},
+        }
+
+        for route in routes:
+            requests = getattr(self, f"_requests_{route}")(options["requests"], rng, options)
+            if not requests:
+                self.stderr.write(self.style.WARNING(f"{route}: no SRs to run against, skipped"))
+                continue
+            latencies, errors, elapsed = bench.run_requests(
+                requests, options["concurrency"], None if route == "login" else cookies
+            )
+            result["routes"][route] = bench.summarize(latencies, elapsed, errors)
+            self.stderr.write(
+                f"{route:<18}{result['routes'][route]['rps']:>9} rps"
+                f"{result['routes'][route]['p95_ms']:>10} ms p95"
+            )
+
+        output = json.dumps(result, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        self.stdout.write(output)
+
+    # ---- Request mixes, one per route: lists of (method, url, data, check) ----
+    # A failed login or a re-rendered form is not a 4xx, so every route
+    # states the response that counts as success
+
+    def _requests_login(self, n, rng, options):
+        data = {"username": options["username"], "password": options["password"]}
+        return [("post", reverse("login"), data, bench.expect(302, reverse("dashboard")))] * n
+
+    def _requests_dashboard(self, n, rng, options):
+        ranges = ["7", "30", "90"]
+        return [
+            ("get", reverse("dashboard"), {"range": ranges[i % len(ranges)]}, bench.expect(200))
+            for i in range(n)
+        ]
+
+    def _requests_list_sr(self, n, rng, options):
+        url = reverse("list_sr")
+        return [("get", url, LIST_FILTERS[i % len(LIST_FILTERS)], bench.expect(200)) for i in range(n)]
+
+    def _requests_view_sr(self, n, rng, options):
+        ids = _sample_ids(ServiceRequest.objects.all(), n, rng)
+        return [
+            ("get", reverse("view_sr", args=[ids[i % len(ids)]]), None, bench.expect(200))
+            for i in range(n)
+        ] if ids else []
+
+    def _requests_create_sr_submit(self, n, rng, options):
+        natures = master_data.active_natures()
+        types = master_data.active_types()
+        if not natures or not types:
+            return []
+        url = reverse("create_sr_submit")
+        return [
+            ("post", url, {
+                "category": "unparented",
+                "sr_nature": rng.choice(natures).id,
+                "sr_type": rng.choice(types).id,
+                "subject": f"Benchmark request {i}",
+                "description": "Created by the bench_routes benchmark to measure SR creation.",
+                "email": "bench@example.com",
+                "phone": "+919999999999",
+                "address": "",
+            }, bench.expect(302, success_message=True))
+            for i in range(n)
+        ]
+
+    def _post_to_sr(self, route, sr_id, data):
+        # Comment and close redirect back to the SR on failure too
+        target = reverse("view_sr", args=[sr_id])
+        return ("post", reverse(route, args=[sr_id]), data, bench.expect(302, target, success_message=True))
+
+    def _requests_add_sr_comment(self, n, rng, options):
+        open_srs = ServiceRequest.objects.exclude(status__code=SRStatus.STATUS_CLOSED)
+        ids = _sample_ids(open_srs, n, rng)
+        return [
+            self._post_to_sr("add_sr_comment", ids[i % len(ids)], {"comment": f"Benchmark comment {i}"})
+            for i in range(n)
+        ] if ids else []
+
+    def _requests_close_sr(self, n, rng, options):
+        # One SR per request; closing an already closed SR is a cheaper path
+        # and counts as an error
+        open_srs = ServiceRequest.objects.exclude(status__code=SRStatus.STATUS_CLOSED)
+        ids = _sample_ids(open_srs, n, rng)
+        if len(ids) < n:
+            self.stderr.write(self.style.WARNING(
+                f"close_sr: only {len(ids)} open SRs for {n} requests, some are closed twice"
+            ))
+        return [self._post_to_sr("close_sr", ids[i % len(ids)], None) for i in range(n)] if ids else []
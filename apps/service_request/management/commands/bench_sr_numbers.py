@@ -0,0 +1,87 @@
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from apps.service_request.models import ServiceRequest, SRNature, SRType, SRStatus
+
+
+def _create_srs(count):
+    """
+    Create ``count`` SRs on this thread/process and return their numbers.
+    """
+    nature = SRNature.objects.filter(is_active=True).first()
+    sr_type = SRType.objects.filter(is_active=True).first()
+    status = SRStatus.objects.get(code=SRStatus.STATUS_OPEN)
+
+    numbers = []
+    try:
+        for i in range(count):
+            sr = ServiceRequest.objects.create(
+                category="unparented",
+                sr_nature=nature,
+                sr_type=sr_type,
+                subject=f"Benchmark SR {i}",
+                description="Created by bench_sr_numbers to test SR number allocation.",
+                email="bench@example.com",
+                phone="+919999999999",
+                status=status,
+            )
+            numbers.append(sr.sr_number)
+    finally:
+        connections.close_all()
+    return numbers
+
+
+class Command(BaseCommand):
+    help = "Create SRs from many threads/processes and check SR numbers never collide"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--per-worker", type=int, default=200)
+        parser.add_argument(
+            "--mode", choices=["threads", "processes"], default="threads"
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the created SRs afterwards"
+        )
+
+    def handle(self, *args, **options):
+        if not (SRNature.objects.exists() and SRType.objects.exists()
+                and SRStatus.objects.filter(code=SRStatus.STATUS_OPEN).exists()):
+            raise CommandError("Load master data first (load_sr_master, load_sr_status)")
+
+        workers = options["workers"]
+        per_worker = options["per_worker"]
+
+        # Forked processes must not share the parent's DB connection
+        connections.close_all()
+        started = time.perf_counter()
+        if options["mode"] == "processes":
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                results = pool.map(_create_srs, [per_worker] * workers)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_create_srs, [per_worker] * workers))
+        elapsed = time.perf_counter() - started
+
+        numbers = [number for result in results for number in result]
+        duplicates = [n for n, seen in Counter(numbers).items() if seen > 1]
+        in_db = ServiceRequest.objects.filter(sr_number__in=numbers).count()
+
+        self.stdout.write(
+            f"Created {len(numbers)} SRs with {workers} {options['mode']} "
+            f"in {elapsed:.2f}s ({len(numbers) / elapsed:.0f} SRs/s)"
+        )
+        self.stdout.write(f"Distinct SR numbers: {len(set(numbers))}, rows in DB: {in_db}")
+
+        if not options["keep"]:
+            for i in range(0, len(numbers), 1000):
+                ServiceRequest.objects.filter(sr_number__in=numbers[i:i + 1000]).delete()
+
+        if duplicates or in_db != len(numbers):
+            raise CommandError(f"SR number collisions detected: {duplicates[:10]}")
+
+        self.stdout.write(self.style.SUCCESS("No SR number collisions"))
@@ -0,0 +1,263 @@
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+from apps.service_request import master_data
+from apps.service_request.bulk import bulk_create_service_requests
+from apps.service_request.models import ServiceRequest, SRStatus
+from apps.service_request.validation import clean_sr_data
+
+
+# ---- Input ----
+
+def _read_rows(path, fmt):
+    """
+    Yield (row_number, row) pairs, row numbers starting at 1.
+    A JSONL line that does not parse is yielded as ``None``.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        if fmt == "csv":
+            yield from enumerate(csv.DictReader(fh), start=1)
+            return
+
+        row_number = 0
+        for line in fh:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row_number, row if isinstance(row, dict) else None
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---- Import (runs in the worker processes) ----
+
+def _build(row, created_by_id, open_status):
+    cleaned, errors = clean_sr_data(row)
+    if errors:
+        return None, errors
+    return ServiceRequest(
+        category=cleaned["category"],
+        account_number=cleaned["account_number"],
+        sr_nature=cleaned["sr_nature"],
+        sr_type=cleaned["sr_type"],
+        subject=cleaned["subject"],
+        description=cleaned["description"],
+        email=cleaned["email"],
+        phone=cleaned["phone"],
+        address=cleaned["address"],
+        created_by_id=created_by_id,
+        status=open_status,
+    ), None
+
+
+def _import_chunk(chunk, created_by_id, batch_size):
+    """
+    Validate and insert one chunk in one transaction.
+    Returns (first_row, last_row, created, rejects).
+    """
+    open_status = master_data.get_status(SRStatus.STATUS_OPEN)
+    rejects = []
+    pending = []
+
+    for row_number, row in chunk:
+        if row is None:
+            rejects.append((row_number, {"row": "Invalid JSON object"}, None))
+            continue
+        obj, errors = _build(row, created_by_id, open_status)
+        if errors:
+            rejects.append((row_number, errors, row))
+        else:
+            pending.append((row_number, row, obj))
+
+    created = 0
+    try:
+        created = len(bulk_create_service_requests(
+            [obj for _, _, obj in pending], batch_size=batch_size
+        ))
+    except DatabaseError:
+        # Find the offending rows one at a time, keep the rest
+        for row_number, row, obj in pending:
+            obj.pk = obj.sr_number = None
+            obj._state.adding = True
+            try:
+                bulk_create_service_requests([obj])
+                created += 1
+            except DatabaseError as e:
+                rejects.append((row_number, {"database": str(e)}, row))
+
+    return chunk[0][0], chunk[-1][0], created, rejects
+
+
+# ---- Checkpoint ----
+
+def _read_checkpoint(path, source):
+    try:
+        with open(path) as fh:
+            state = json.load(fh)
+    except FileNotFoundError:
+        return 0
+    if state.get("source") != os.path.abspath(source):
+        raise CommandError(f"Checkpoint {path} belongs to {state.get('source')}")
+    return state["row"]
+
+
+def _write_checkpoint(path, source, row):
+    # Write then rename, so a crash never leaves a half-written checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump({"source": os.path.abspath(source), "row": row}, fh)
+    os.replace(tmp_path, path)
+
+
+class Command(BaseCommand):
+    help = "Bulk import Service Requests from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--created-by", help="Username recorded as creator")
+        parser.add_argument(
+            "--rejects", help="JSONL file for rows that fail validation"
+        )
+        parser.add_argument(
+            "--checkpoint", help="File recording the last fully imported row"
+        )
+        parser.add_argument(
+            "--resume", action="store_true",
+            help="Skip rows already imported according to --checkpoint"
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        fmt = options["format"] or (
+            "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+        )
+
+        if master_data.get_status(SRStatus.STATUS_OPEN) is None:
+            raise CommandError("Load master data first (load_sr_master, load_sr_status)")
+
+        created_by_id = None
+        if options["created_by"]:
+            try:
+                created_by_id = User.objects.get(username=options["created_by"]).id
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {options['created_by']}")
+
+        checkpoint = options["checkpoint"]
+        if options["resume"] and not checkpoint:
+            raise CommandError("--resume needs --checkpoint")
+        start_after = _read_checkpoint(checkpoint, path) if options["resume"] else 0
+
+        rows = (
+            (row_number, row) for row_number, row in _read_rows(path, fmt)
+            if row_number > start_after
+        )
+        chunks = _chunks(rows, options["chunk_size"])
+
+        rejects_file = None
+        if options["rejects"]:
+            rejects_file = open(options["rejects"], "a" if options["resume"] else "w")
+
+        self.totals = {"created": 0, "rejected": 0}
+        self.done = {}
+        self.high_water = start_after
+        self.started = time.perf_counter()
+
+        try:
+            if options["workers"] > 1:
+                self._import_parallel(chunks, created_by_id, options, rejects_file)
+            else:
+                for chunk in chunks:
+                    self._record(
+                        _import_chunk(chunk, created_by_id, options["batch_size"]),
+                        checkpoint, path, rejects_file,
+                    )
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+        elapsed = time.perf_counter() - self.started
+        processed = self.totals["created"] + self.totals["rejected"]
+        self.stdout.write(
+            f"Processed {processed} rows in {elapsed:.2f}s "
+            f"({processed / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        if self.totals["rejected"]:
+            self.stdout.write(
+                self.style.WARNING(f"Rejected rows: {self.totals['rejected']}")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"SR import done. SRs created: {self.totals['created']}")
+        )
+
+    def _import_parallel(self, chunks, created_by_id, options, rejects_file):
+        workers = options["workers"]
+        # Children inherit the master data snapshot instead of each loading it
+        master_data.warm()
+        # Forked processes must not share the parent's DB connection
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            in_flight = set()
+            for chunk in chunks:
+                # Bound the chunks held in memory for a very large file
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._record(future.result(), options["checkpoint"], options["path"], rejects_file)
+                in_flight.add(executor.submit(
+                    _import_chunk, chunk, created_by_id, options["batch_size"]
+                ))
+            for future in in_flight:
+                self._record(future.result(), options["checkpoint"], options["path"], rejects_file)
+
+    def _record(self, result, checkpoint, path, rejects_file):
+        first_row, last_row, created, rejects = result
+        self.totals["created"] += created
+        self.totals["rejected"] += len(rejects)
+
+        if rejects_file:
+            for row_number, errors, row in rejects:
+                rejects_file.write(json.dumps({"row_number": row_number, "errors": errors, "row": row}) + "\n")
+            rejects_file.flush()
+
+        # Chunks finish out of order with several workers; the checkpoint
+        # only moves past rows whose earlier chunks are all done
+        self.done[first_row] = last_row
+        while self.high_water + 1 in self.done:
+            self.high_water = self.done.pop(self.high_water + 1)
+        if checkpoint:
+            _write_checkpoint(checkpoint, path, self.high_water)
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"Rows up to {self.high_water} done, created {self.totals['created']}, "
+            f"rejected {self.totals['rejected']} "
+            f"({self.totals['created'] / elapsed if elapsed else 0:.0f} SRs/s)"
+        )
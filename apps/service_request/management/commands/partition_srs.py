@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.service_request import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the coming months' partitions of the SR table (PostgreSQL with "
+        "SR_PARTITIONING on; run daily from cron), or convert the table first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead", type=int, default=None,
+            help="Months after the current one to create (default SR_PARTITION_MONTHS_AHEAD)",
+        )
+        parser.add_argument(
+            "--convert", action="store_true",
+            help="Partition the existing table (locks it while the rows are copied)",
+        )
+        parser.add_argument("--list", action="store_true", help="Print the partitions afterwards")
+
+    def handle(self, *args, **options):
+        if not partitioning.enabled(connection):
+            self.stdout.write(self.style.WARNING(
+                "SR partitioning is off (needs PostgreSQL and SR_PARTITIONING=True), nothing to do"
+            ))
+            return
+
+        if not partitioning.is_partitioned():
+            if not options["convert"]:
+                raise CommandError("The SR table is not partitioned yet, run with --convert first")
+            moved = partitioning.convert(months_ahead=options["months_ahead"])
+            self.stdout.write(self.style.SUCCESS(f"SR table partitioned. Rows moved: {moved}"))
+
+        created = partitioning.ensure_partitions(months_ahead=options["months_ahead"])
+        for name in created:
+            self.stdout.write(f"Created {name}")
+
+        if options["list"]:
+            for name, bound in partitioning.partitions():
+                self.stdout.write(f"{name}: {bound}")
+        self.stdout.write(self.style.SUCCESS(f"SR partitions up to date. Partitions created: {len(created)}"))
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.service_request import assignment
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the open / WIP SRs of agents who stopped taking work to the "
+        "least-loaded remaining agents, and optionally rebuild the agent loads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--agent", action="append", dest="agents", default=[],
+            help="Username to stop assigning to and take SRs from (repeatable)",
+        )
+        parser.add_argument(
+            "--inactive", action="store_true",
+            help="Also take SRs from every agent whose account is inactive",
+        )
+        parser.add_argument(
+            "--reconcile", action="store_true",
+            help="Recompute every agent's load from the SR table first",
+        )
+
+    def handle(self, *args, **options):
+        if options["reconcile"]:
+            drift = assignment.reconcile()
+            for user_id, (old, new) in sorted(drift.items()):
+                self.stdout.write(self.style.WARNING(f"Agent {user_id}: {old} -> {new}"))
+            self.stdout.write(f"Agent loads reconciled. Loads corrected: {len(drift)}")
+
+        user_ids = set()
+        for username in options["agents"]:
+            try:
+                user_ids.add(User.objects.get(username=username).id)
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {username}")
+        if options["inactive"]:
+            user_ids.update(
+                User.objects.filter(is_active=False, agent_load__isnull=False).values_list("id", flat=True)
+            )
+        if not user_ids:
+            if not options["reconcile"]:
+                self.stdout.write(self.style.WARNING("Nothing to do, pass --agent, --inactive or --reconcile"))
+            return
+
+        moved = assignment.reassign_from(sorted(user_ids))
+        for user_id, n in sorted(moved.items()):
+            self.stdout.write(f"Agent {user_id}: +{n} SRs")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebalance done. SRs moved: {sum(moved.values())} to {len(moved)} agents"
+            )
+        )
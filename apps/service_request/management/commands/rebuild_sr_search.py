@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.service_request.models import ServiceRequest
+from apps.service_request import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for all Service Requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if search.search_backend() is None:
+            self.stdout.write(
+                self.style.ERROR("No search table on this database, run migrate first")
+            )
+            return
+
+        chunk_size = options["chunk_size"]
+        last_id = 0
+        indexed = 0
+
+        while True:
+            ids = list(
+                ServiceRequest.objects
+                .filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                search.index_service_requests(ids)
+
+            last_id = ids[-1]
+            indexed += len(ids)
+            self.stdout.write(f"Indexed {indexed} SRs (up to id {last_id})")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Search index rebuilt. Total SRs indexed: {indexed}")
+        )
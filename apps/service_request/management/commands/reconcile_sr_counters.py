@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.service_request import counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard SR counters from the ServiceRequest table"
+
+    def handle(self, *args, **options):
+        drift = counters.reconcile()
+
+        for key, (old, new) in sorted(drift.items()):
+            self.stdout.write(
+                self.style.WARNING(f"{key}: {old} -> {new}")
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SR counters reconciled. Counters corrected: {len(drift)}"
+            )
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.service_request import sla
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark open / WIP SRs whose SLA deadline passed since the previous scan "
+        "and add an internal escalation comment (run every few minutes)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--no-escalate", action="store_true",
+            help="Only set breached_at, without the escalation comment",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Check every deadline up to now, not just those since the last scan",
+        )
+
+    def handle(self, *args, **options):
+        since, until, marked = sla.scan_breaches(
+            chunk_size=options["chunk_size"],
+            escalate=not options["no_escalate"],
+            full=options["full"],
+        )
+
+        window = f"{timezone.localtime(since):%Y-%m-%d %H:%M:%S}" if since else "the beginning"
+        if marked:
+            self.stdout.write(self.style.WARNING(f"SRs past their SLA: {marked}"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"SLA scan done for deadlines from {window} "
+                f"to {timezone.localtime(until):%Y-%m-%d %H:%M:%S}. SRs marked: {marked}"
+            )
+        )
@@ -0,0 +1,368 @@
+import multiprocessing
+import random
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from apps.service_request import assignment, counters, master_data, rollups, search
+from apps.service_request.models import ServiceRequest, SRComment, SRStatus
+from apps.service_request.sla import apply_sla
+from apps.service_request.sr_numbers import format_sr_number, reserve_block
+from apps.users.models import UserProfile
+
+
+AGENT_PREFIX = "seed_agent_"
+
+SUBJECTS = {
+    "card_issue": ["Debit card blocked", "Card not delivered", "Card declined at merchant", "PIN reset request"],
+    "netbanking_issue": ["Cannot log in to netbanking", "OTP not received", "Beneficiary not added", "Netbanking locked"],
+    "branch_service": ["Long wait at branch", "Passbook update", "Cheque book request", "Branch staff complaint"],
+    "loan_related": ["EMI debited twice", "Loan statement request", "Foreclosure charges", "Interest rate query"],
+    "account_opening": ["Account opening delayed", "KYC documents pending", "Welcome kit not received"],
+    "transaction_dispute": ["Amount debited but not credited", "Unauthorised transaction", "UPI payment failed"],
+}
+GENERIC_SUBJECTS = ["General enquiry", "Statement request", "Address change", "Mobile number update"]
+DETAILS = [
+    "Customer called the branch twice about this.",
+    "The issue started after the last statement cycle.",
+    "Customer has shared a screenshot by email.",
+    "Please resolve on priority, senior citizen account.",
+    "Reference number was given by the call centre.",
+    "No response to the earlier email from the customer.",
+]
+COMMENTS = [
+    "Called the customer, awaiting documents.",
+    "Escalated to the card operations team.",
+    "Customer confirmed the details over phone.",
+    "Reversal initiated, pending confirmation.",
+    "Checked the logs, issue reproduced.",
+    "Waiting for response from the back office.",
+    "Resolved and informed the customer.",
+]
+
+
+def _parse_mix(allowed):
+    """
+    argparse type for weights like ``open=30,wip=20,closed=50``.
+    """
+    def parse(value):
+        weights = {}
+        for part in value.split(","):
+            key, _, weight = part.partition("=")
+            key = key.strip()
+            if key not in allowed:
+                raise ValueError(f"unknown key {key!r}, expected one of {', '.join(allowed)}")
+            weights[key] = float(weight)
+        if not any(weights.values()):
+            raise ValueError("weights must not all be zero")
+        return weights
+    parse.__name__ = "weights"
+    return parse
+
+
+@contextmanager
+def _explicit_timestamps():
+    """
+    Let bulk_create keep the generated created_at/updated_at instead of
+    stamping the current time (auto_now / auto_now_add).
+    """
+    fields = [
+        model._meta.get_field(name)
+        for model in (ServiceRequest, SRComment)
+        for name in ("created_at", "updated_at")
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+# ---- Generation (runs in the worker processes) ----
+
+def _day_weights(options, today):
+    """
+    (days, cumulative weights) for the per-day volume: quieter weekends and
+    a linear growth towards today.
+    """
+    days = [today - timedelta(days=n) for n in range(options["days"] - 1, -1, -1)]
+    cumulative, total = [], 0.0
+    for i, day in enumerate(days):
+        weight = 1 + options["growth"] * i / max(1, len(days) - 1)
+        if day.weekday() >= 5:
+            weight *= options["weekend_factor"]
+        total += weight
+        cumulative.append(total)
+    return days, cumulative
+
+
+def _build_chunk(rng, size, spec):
+    """
+    Unsaved SRs for one chunk, sorted by creation time, each with the list
+    of its comments' (created_at, user_id, text).
+    """
+    tz = timezone.get_current_timezone()
+    now = spec["now"]
+    days = rng.choices(spec["days"], cum_weights=spec["day_weights"], k=size)
+    statuses = rng.choices(list(spec["status_mix"]), weights=list(spec["status_mix"].values()), k=size)
+    categories = rng.choices(list(spec["category_mix"]), weights=list(spec["category_mix"].values()), k=size)
+
+    rows = []
+    for day, status_code, category in zip(days, statuses, categories):
+        created_at = timezone.make_aware(
+            datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400)), tz
+        )
+        if created_at > now:
+            created_at = now - timedelta(seconds=rng.randrange(3600))
+        nature_id, nature_code = rng.choice(spec["natures"])
+        type_id, type_code = rng.choice(spec["types"])
+        agent_id = rng.choice(spec["agents"])
+
+        closed_at = None
+        if status_code == SRStatus.STATUS_CLOSED:
+            closed_at = min(now, created_at + timedelta(hours=rng.expovariate(1 / 48)))
+
+        # Open SRs have no comments: the first comment moves an SR to WIP
+        comment_count = 0
+        if status_code != SRStatus.STATUS_OPEN:
+            comment_count = max(1, round(rng.expovariate(1 / spec["comments_per_sr"]))) if spec["comments_per_sr"] else 0
+        end = closed_at or now
+        comments = sorted(
+            created_at + (end - created_at) * rng.random() for _ in range(comment_count)
+        )
+
+        subject = rng.choice(SUBJECTS.get(type_code, GENERIC_SUBJECTS))
+        sr = ServiceRequest(
+            category=category,
+            account_number=f"{rng.randrange(10 ** 11, 10 ** 12)}" if category == "parented" else None,
+            sr_nature_id=nature_id,
+            sr_type_id=type_id,
+            subject=subject,
+            description=f"{subject}. {rng.choice(DETAILS)} {rng.choice(DETAILS)}",
+            email=f"customer{rng.randrange(10 ** 7)}@example.com",
+            phone=f"+91{rng.randrange(6 * 10 ** 9, 10 ** 10)}",
+            created_by_id=rng.choice(spec["agents"]),
+            assigned_to_id=agent_id,
+            status_id=spec["statuses"][status_code],
+            created_at=created_at,
+            updated_at=max([created_at, closed_at or created_at] + comments),
+            closed_at=closed_at,
+            closed_by_id=agent_id if closed_at else None,
+        )
+        apply_sla(sr)
+        rows.append((sr, [(at, agent_id, rng.choice(COMMENTS)) for at in comments]))
+
+    rows.sort(key=lambda row: row[0].created_at)
+    return rows
+
+
+def _assign_numbers(srs):
+    # One short transaction per day, outside the chunk's transaction, so
+    # parallel workers never hold a day's sequence row for a whole chunk
+    per_day = Counter(timezone.localdate(sr.created_at) for sr in srs)
+    next_value = {}
+    for day in sorted(per_day):
+        next_value[day] = reserve_block(day, per_day[day])[0]
+    for sr in srs:
+        day = timezone.localdate(sr.created_at)
+        sr.sr_number = format_sr_number(day, next_value[day])
+        next_value[day] += 1
+
+
+def _seed_chunk(index, size, spec):
+    """
+    Generate and insert one chunk. Returns (SRs created, comments created).
+    """
+    rng = random.Random(f"{spec['seed']}:{index}")
+    rows = _build_chunk(rng, size, spec)
+    srs = [sr for sr, _ in rows]
+    _assign_numbers(srs)
+
+    for sr, sr_comments in rows:
+        sr.comment_count = len(sr_comments)
+
+    with transaction.atomic():
+        ServiceRequest.objects.bulk_create(srs, batch_size=spec["batch_size"])
+        comments = [
+            SRComment(
+                service_request_id=sr.pk, user_id=user_id, comment=text,
+                created_at=at, updated_at=at,
+            )
+            for sr, sr_comments in rows
+            for at, user_id, text in sr_comments
+        ]
+        SRComment.objects.bulk_create(comments, batch_size=spec["batch_size"])
+        if spec["search"]:
+            search.index_service_requests([sr.pk for sr in srs])
+
+    return len(srs), len(comments)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic Service Requests, comments and agents at scale with "
+        "chunked bulk_create, then rebuild the counters and daily rollup"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--srs", type=int, default=10000, help="Number of SRs to create")
+        parser.add_argument("--agents", type=int, default=50, help=f"Staff users ({AGENT_PREFIX}N) to spread SRs over")
+        parser.add_argument(
+            "--agent-password",
+            help="Password for newly created agents (default: unusable, they cannot log in)",
+        )
+        parser.add_argument("--days", type=int, default=90, help="Spread creation dates over the last N days")
+        parser.add_argument(
+            "--weekend-factor", type=float, default=0.4,
+            help="Weekend volume relative to a weekday",
+        )
+        parser.add_argument(
+            "--growth", type=float, default=0.5,
+            help="Extra daily volume reached by today, 0.5 = 50%% more than N days ago",
+        )
+        parser.add_argument(
+            "--status-mix", type=_parse_mix([c for c, _ in SRStatus.STATUS_CHOICES]),
+            default={"open": 20, "wip": 25, "closed": 55},
+            help="Weights per status code, e.g. open=20,wip=25,closed=55",
+        )
+        parser.add_argument(
+            "--category-mix", type=_parse_mix(["parented", "unparented"]),
+            default={"parented": 60, "unparented": 40},
+            help="Weights per category, e.g. parented=60,unparented=40",
+        )
+        parser.add_argument(
+            "--comments-per-sr", type=float, default=3.0,
+            help="Mean comments per WIP/closed SR (open SRs get none)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, same seed = same data")
+        parser.add_argument(
+            "--no-search", action="store_true",
+            help="Skip search indexing (run rebuild_sr_search afterwards)",
+        )
+
+    def handle(self, *args, **options):
+        master_data.warm()
+        statuses = {code: master_data.get_status(code) for code, _ in SRStatus.STATUS_CHOICES}
+        natures, types = master_data.active_natures(), master_data.active_types()
+        if None in statuses.values() or not natures or not types:
+            raise CommandError("Load master data first (load_sr_master, load_sr_status)")
+
+        if options["agents"] < 1:
+            raise CommandError("--agents must be at least 1")
+
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stdout.write(self.style.WARNING("SQLite allows one writer at a time, using 1 worker"))
+            workers = 1
+
+        now = timezone.now()
+        days, day_weights = _day_weights(options, timezone.localdate(now))
+        spec = {
+            "seed": options["seed"],
+            "now": now,
+            "days": days,
+            "day_weights": day_weights,
+            "status_mix": options["status_mix"],
+            "category_mix": options["category_mix"],
+            "comments_per_sr": options["comments_per_sr"],
+            "statuses": {code: status.id for code, status in statuses.items()},
+            "natures": [(n.id, n.code) for n in natures],
+            "types": [(t.id, t.code) for t in types],
+            "agents": self._ensure_agents(options["agents"], options["agent_password"]),
+            "batch_size": options["batch_size"],
+            "search": not options["no_search"],
+        }
+
+        total, chunk_size = options["srs"], options["chunk_size"]
+        chunks = [
+            (index, min(chunk_size, total - start))
+            for index, start in enumerate(range(0, total, chunk_size))
+        ]
+
+        self.totals = Counter()
+        self.started = time.perf_counter()
+        with _explicit_timestamps():
+            if workers > 1:
+                self._seed_parallel(chunks, spec, workers)
+            else:
+                for index, size in chunks:
+                    self._record(_seed_chunk(index, size, spec))
+
+        self.stdout.write("Rebuilding counters, daily rollup and agent loads...")
+        counters.reconcile()
+        counters.mark_list_changed()
+        rollups.backfill()
+        assignment.reconcile()
+
+        elapsed = time.perf_counter() - self.started
+        if options["no_search"]:
+            self.stdout.write(self.style.WARNING("Search index skipped, run rebuild_sr_search"))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeding done in {elapsed:.1f}s. SRs created: {self.totals['srs']}, "
+                f"comments created: {self.totals['comments']}"
+            )
+        )
+
+    def _ensure_agents(self, count, password):
+        existing = dict(
+            User.objects.filter(username__startswith=AGENT_PREFIX).values_list("username", "id")
+        )
+        # One hash for all new agents; hashing per user would dominate
+        password_hash = make_password(password)
+        new_users = [
+            User(username=f"{AGENT_PREFIX}{n:04d}", is_staff=True, password=password_hash)
+            for n in range(1, count + 1)
+            if f"{AGENT_PREFIX}{n:04d}" not in existing
+        ]
+        if new_users:
+            with transaction.atomic():
+                User.objects.bulk_create(new_users)
+                created = User.objects.filter(username__in=[u.username for u in new_users])
+                UserProfile.objects.bulk_create(
+                    [UserProfile(user_id=user_id, phone="9000000000") for user_id in created.values_list("id", flat=True)]
+                )
+            self.stdout.write(f"Created {len(new_users)} agents")
+        return list(
+            User.objects.filter(username__startswith=AGENT_PREFIX)
+            .order_by("id").values_list("id", flat=True)[:count]
+        )
+
+    def _seed_parallel(self, chunks, spec, workers):
+        # Forked processes must not share the parent's DB connection
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            in_flight = set()
+            for index, size in chunks:
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._record(future.result())
+                in_flight.add(executor.submit(_seed_chunk, index, size, spec))
+            for future in in_flight:
+                self._record(future.result())
+
+    def _record(self, result):
+        srs, comments = result
+        self.totals["srs"] += srs
+        self.totals["comments"] += comments
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"Created {self.totals['srs']} SRs, {self.totals['comments']} comments "
+            f"({self.totals['srs'] / elapsed if elapsed else 0:.0f} SRs/s)"
+        )
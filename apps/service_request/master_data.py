@@ -0,0 +1,192 @@
+"""
+Process-local cache of the small SR master tables (SRNature, SRType,
+SRStatus, SRTATDays).
+
+Each worker keeps one snapshot of all four tables. A version number in the
+Django cache is bumped whenever a master row is saved or deleted (see
+signals.py); a worker whose snapshot carries an older version reloads it on
+next use. Snapshots are also reloaded after SR_MASTER_CACHE_MAX_AGE
+seconds, which bounds staleness when the default cache is not shared
+between processes or rows are changed with ``QuerySet.update()``.
+
+The same changes move the ``sr_master_data`` SRWatermark row, which each
+snapshot reads before its tables. ``version()`` returns that row as seen by
+the snapshot, so a rendered fragment is keyed on the master data it was
+rendered from, even in a cache shared by workers whose snapshots differ.
+
+The cached model instances are shared between requests and must be treated
+as read-only.
+"""
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import SRNature, SRStatus, SRTATDays, SRType, SRWatermark
+
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "sr_master_data:version"
+
+WATERMARK_NAME = "sr_master_data"
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class _Snapshot:
+
+    def __init__(self, cache_version):
+        self.cache_version = cache_version
+        self.loaded_at = time.monotonic()
+        # Read before the tables: a change committing meanwhile is then
+        # keyed as older than the data, never the other way round
+        self.version = _stored_version()
+        self.natures = {n.id: n for n in SRNature.objects.all()}
+        self.types = {t.id: t for t in SRType.objects.all()}
+        self.statuses = {s.id: s for s in SRStatus.objects.all()}
+        self.statuses_by_code = {s.code: s for s in self.statuses.values()}
+        self.tats = {(t.sr_nature, t.sr_type): t for t in SRTATDays.objects.all()}
+
+
+def _stored_version():
+    changed = _watermark().values_list("position", flat=True).first()
+    return changed.isoformat() if changed else ""
+
+
+def _watermark():
+    return SRWatermark.objects.filter(name=WATERMARK_NAME)
+
+
+def _cache_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def _current():
+    global _snapshot
+    version = _cache_version()
+    max_age = getattr(settings, "SR_MASTER_CACHE_MAX_AGE", 300)
+
+    snapshot = _snapshot
+    if (snapshot is None or snapshot.cache_version != version
+            or time.monotonic() - snapshot.loaded_at > max_age):
+        with _lock:
+            snapshot = _snapshot
+            if (snapshot is None or snapshot.cache_version != version
+                    or time.monotonic() - snapshot.loaded_at > max_age):
+                snapshot = _snapshot = _Snapshot(version)
+    return snapshot
+
+
+def version():
+    """
+    The version of the master data this worker's snapshot holds, for cache
+    keys that must change whenever the master data does. Async code calls
+    aload() first.
+    """
+    return _current().version
+
+
+def invalidate():
+    """
+    Record a master data change, drop this worker's snapshot and tell the
+    other workers to drop theirs.
+    """
+    global _snapshot
+    now = timezone.now()
+    if not _watermark().update(position=now):
+        SRWatermark.objects.get_or_create(name=WATERMARK_NAME, defaults={"position": now})
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+    _snapshot = None
+
+
+def warm():
+    """
+    Load the snapshot ahead of the first request (called at worker start).
+    """
+    try:
+        _current()
+    except DatabaseError:
+        logger.warning("SR master data cache not warmed, database unavailable")
+
+
+async def aload():
+    """
+    Make sure the snapshot is loaded before async code reads it (loading
+    queries the database, which async code must not do directly).
+    """
+    await sync_to_async(_current)()
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _active(obj):
+    return obj if obj is not None and obj.is_active else None
+
+
+def active_natures():
+    return [n for n in _current().natures.values() if n.is_active]
+
+
+def active_types():
+    return [t for t in _current().types.values() if t.is_active]
+
+
+def get_nature(nature_id):
+    return _active(_current().natures.get(_to_id(nature_id)))
+
+
+def get_type(type_id):
+    return _active(_current().types.get(_to_id(type_id)))
+
+
+def get_nature_by_code(code):
+    return _active(next((n for n in _current().natures.values() if n.code == code), None))
+
+
+def get_type_by_code(code):
+    return _active(next((t for t in _current().types.values() if t.code == code), None))
+
+
+def get_status(code):
+    return _active(_current().statuses_by_code.get(code))
+
+
+def get_status_by_id(status_id):
+    return _current().statuses.get(_to_id(status_id))
+
+
+def get_nature_by_id(nature_id):
+    return _current().natures.get(_to_id(nature_id))
+
+
+def get_type_by_id(type_id):
+    return _current().types.get(_to_id(type_id))
+
+
+def get_tat(nature, sr_type):
+    """
+    Active SRTATDays row for an SRNature / SRType pair, or None.
+    """
+    tats = _current().tats
+    # Rows are keyed by code; older rows written by auto_allot_tat hold names
+    tat = tats.get((nature.code, sr_type.code)) or tats.get((nature.name, sr_type.name))
+    return _active(tat)
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_search_tables(apps, schema_editor):
+    from apps.service_request.search import create_search_tables
+    create_search_tables(schema_editor)
+
+
+def drop_search_tables(apps, schema_editor):
+    from apps.service_request.search import drop_search_tables
+    drop_search_tables(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:56
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    ServiceRequest = apps.get_model('service_request', 'ServiceRequest')
+    SRCounter = apps.get_model('service_request', 'SRCounter')
+    db = schema_editor.connection.alias
+
+    srs = ServiceRequest.objects.using(db).order_by()
+    values = {'total': srs.count()}
+    for row in srs.values('status__code').annotate(n=Count('id')):
+        values[f"status:{row['status__code']}"] = row['n']
+    for row in srs.values('category').annotate(n=Count('id')):
+        values[f"category:{row['category']}"] = row['n']
+
+    SRCounter.objects.using(db).bulk_create(
+        [SRCounter(key=key, value=value) for key, value in values.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0002_sr_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'SR Counter',
+                'verbose_name_plural': 'SR Counters',
+                'db_table': 'sr_counter',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:58
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def seed_daily_stats(apps, schema_editor):
+    ServiceRequest = apps.get_model('service_request', 'ServiceRequest')
+    SRDailyStat = apps.get_model('service_request', 'SRDailyStat')
+    db = schema_editor.connection.alias
+    tz = timezone.get_current_timezone()
+
+    srs = ServiceRequest.objects.using(db).order_by()
+    created = srs.annotate(day=TruncDate('created_at', tzinfo=tz))
+    values = {}
+    for row in created.values('day').annotate(n=Count('id')):
+        values[(row['day'], 'created', '')] = row['n']
+    for metric, field in (
+        ('status', 'status__code'),
+        ('nature', 'sr_nature__code'),
+        ('type', 'sr_type__code'),
+    ):
+        for row in created.values('day', field).annotate(n=Count('id')):
+            values[(row['day'], metric, row[field] or '')] = row['n']
+
+    closed = srs.filter(status__code='closed', closed_at__isnull=False).annotate(
+        day=TruncDate('closed_at', tzinfo=tz)
+    )
+    for row in closed.values('day').annotate(n=Count('id')):
+        values[(row['day'], 'closed', '')] = row['n']
+
+    SRDailyStat.objects.using(db).bulk_create(
+        [
+            SRDailyStat(day=day, metric=metric, dimension=dimension, count=n)
+            for (day, metric, dimension), n in values.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0003_sr_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(choices=[('created', 'Created'), ('closed', 'Closed'), ('status', 'By Status'), ('nature', 'By Nature'), ('type', 'By Type')], max_length=20)),
+                ('dimension', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'SR Daily Stat',
+                'verbose_name_plural': 'SR Daily Stats',
+                'db_table': 'sr_daily_stat',
+                'unique_together': {('metric', 'dimension', 'day')},
+            },
+        ),
+        migrations.RunPython(seed_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.11 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0004_sr_daily_stat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'sr_number_sequence',
+            },
+        ),
+    ]
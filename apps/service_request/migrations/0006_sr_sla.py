@@ -0,0 +1,39 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0005_sr_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'sr_watermark',
+            },
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='breached_at',
+            field=models.DateTimeField(blank=True, db_column='breached_at', help_text='Set by the SLA breach scan when the SR went past due_at unresolved.', null=True),
+        ),
+        migrations.AddField(
+            model_name='servicerequest',
+            name='due_at',
+            field=models.DateTimeField(blank=True, db_column='due_at', help_text='Resolution deadline: creation time plus the TAT for the nature / type.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'due_at'], name='sr_status_due_idx'),
+        ),
+    ]
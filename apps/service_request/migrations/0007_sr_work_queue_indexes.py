@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0006_sr_sla'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(condition=models.Q(('assigned_to__isnull', True)), fields=['status', 'due_at', 'created_at'], name='sr_queue_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(condition=models.Q(('assigned_to__isnull', True)), fields=['status', 'created_at'], name='sr_queue_age_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def seed_agent_loads(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    ServiceRequest = apps.get_model('service_request', 'ServiceRequest')
+    AgentLoad = apps.get_model('service_request', 'AgentLoad')
+    db = schema_editor.connection.alias
+
+    counts = dict(
+        ServiceRequest.objects.using(db).order_by()
+        .filter(status__code__in=['open', 'wip'], assigned_to__isnull=False)
+        .values_list('assigned_to_id').annotate(n=Count('id'))
+    )
+    AgentLoad.objects.using(db).bulk_create([
+        AgentLoad(user_id=user_id, open_count=counts.get(user_id, 0))
+        for user_id in User.objects.using(db).filter(is_staff=True, is_active=True).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('service_request', '0007_sr_work_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentLoad',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='agent_load', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_count', models.IntegerField(default=0)),
+                ('accepting', models.BooleanField(default=True, help_text='Whether new SRs may be auto-assigned to this agent.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'sr_agent_load',
+                'indexes': [models.Index(fields=['accepting', 'open_count'], name='sr_agent_load_pick_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AgentSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.FloatField(default=1.0)),
+                ('sr_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_skills', to='service_request.srtype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agent_skills', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'sr_agent_skill',
+                'unique_together': {('user', 'sr_type')},
+            },
+        ),
+        migrations.RunPython(seed_agent_loads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_counts(apps, schema_editor):
+    ServiceRequest = apps.get_model('service_request', 'ServiceRequest')
+    SRComment = apps.get_model('service_request', 'SRComment')
+    db = schema_editor.connection.alias
+
+    counts = (
+        SRComment.objects.using(db).order_by()
+        .filter(service_request_id=OuterRef('pk'))
+        .values('service_request_id').annotate(n=Count('id')).values('n')
+    )
+    ServiceRequest.objects.using(db).update(comment_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0008_sr_agent_load'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='comment_count',
+            field=models.PositiveIntegerField(db_column='comment_count', default=0),
+        ),
+        migrations.AddIndex(
+            model_name='srcomment',
+            index=models.Index(fields=['service_request', '-created_at', '-id'], name='sr_comment_timeline_idx'),
+        ),
+        migrations.RunPython(backfill_comment_counts, migrations.RunPython.noop),
+    ]
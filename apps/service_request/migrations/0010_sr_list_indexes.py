@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0009_sr_comment_timeline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'created_at'], name='sr_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['category', 'created_at'], name='sr_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['assigned_to', 'status'], name='sr_assignee_status_idx'),
+        ),
+    ]
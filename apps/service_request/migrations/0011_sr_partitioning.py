@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def partition_service_requests(apps, schema_editor):
+    from apps.service_request.partitioning import convert, enabled
+    if enabled(schema_editor.connection):
+        convert(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0010_sr_list_indexes'),
+    ]
+
+    operations = [
+        # No-op unless SR_PARTITIONING is on and the database is PostgreSQL;
+        # later conversions go through `manage.py partition_srs --convert`
+        migrations.RunPython(partition_service_requests, migrations.RunPython.noop),
+    ]
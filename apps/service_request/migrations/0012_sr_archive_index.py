@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0011_sr_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SRArchiveIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sr_id', models.BigIntegerField(unique=True)),
+                ('sr_number', models.CharField(max_length=50, unique=True)),
+                ('segment', models.PositiveIntegerField()),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField()),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'SR Archive Entry',
+                'verbose_name_plural': 'SR Archive Index',
+                'db_table': 'sr_archive_index',
+            },
+        ),
+    ]
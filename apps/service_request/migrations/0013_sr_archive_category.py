@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:05
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_categories(apps, schema_editor):
+    # Entries archived before the category was indexed are read back from
+    # their records. Their SRs were also taken off the dashboard counters
+    # at archiving, which now keep counting archived SRs: add them back
+    from apps.service_request.archive import read_record
+
+    SRArchiveIndex = apps.get_model('service_request', 'SRArchiveIndex')
+    SRCounter = apps.get_model('service_request', 'SRCounter')
+    db = schema_editor.connection.alias
+
+    archived = Counter()
+    for entry in SRArchiveIndex.objects.using(db).filter(category='').iterator():
+        sr, _ = read_record(entry)
+        SRArchiveIndex.objects.using(db).filter(pk=entry.pk).update(category=sr.category)
+        archived['total'] += 1
+        archived['status:closed'] += 1
+        archived[f'category:{sr.category}'] += 1
+
+    for key, n in archived.items():
+        if not SRCounter.objects.using(db).filter(key=key).update(value=F('value') + n):
+            SRCounter.objects.using(db).create(key=key, value=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0012_sr_archive_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srarchiveindex',
+            name='category',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RunPython(backfill_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+def backfill_dimensions(apps, schema_editor):
+    # The trend rollup's dimensions of entries archived before they were
+    # indexed, read back from their records
+    from apps.service_request.archive import read_record
+
+    SRArchiveIndex = apps.get_model('service_request', 'SRArchiveIndex')
+    SRNature = apps.get_model('service_request', 'SRNature')
+    SRType = apps.get_model('service_request', 'SRType')
+    db = schema_editor.connection.alias
+
+    natures = dict(SRNature.objects.using(db).values_list('id', 'code'))
+    types = dict(SRType.objects.using(db).values_list('id', 'code'))
+    for entry in SRArchiveIndex.objects.using(db).filter(created_at__isnull=True).iterator():
+        sr, _ = read_record(entry)
+        SRArchiveIndex.objects.using(db).filter(pk=entry.pk).update(
+            created_at=sr.created_at,
+            nature_code=natures.get(sr.sr_nature_id, ''),
+            type_code=types.get(sr.sr_type_id, ''),
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0013_sr_archive_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srarchiveindex',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='srarchiveindex',
+            name='nature_code',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='srarchiveindex',
+            name='type_code',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.RunPython(backfill_dimensions, migrations.RunPython.noop),
+    ]
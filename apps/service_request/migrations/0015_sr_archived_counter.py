@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-18 16:45
+
+from django.db import migrations
+
+
+def seed_archived_counter(apps, schema_editor):
+    # SRs archived before the counter existed
+    SRArchiveIndex = apps.get_model('service_request', 'SRArchiveIndex')
+    SRCounter = apps.get_model('service_request', 'SRCounter')
+    db = schema_editor.connection.alias
+
+    SRCounter.objects.using(db).update_or_create(
+        key='archived', defaults={'value': SRArchiveIndex.objects.using(db).count()}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_request', '0014_sr_archive_rollup_dimensions'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_archived_counter, migrations.RunPython.noop),
+    ]
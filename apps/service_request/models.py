@@ -1,7 +1,6 @@
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from django.utils import timezone
 from django.core.validators import RegexValidator
 
 
@@ -175,32 +174,109 @@ class ServiceRequest(models.Model):
         db_column="closed_at"
     )
 
-    # --- Custom Methods ---
-    def _generate_unique_sr_number(self):
-        now = timezone.now()
-        date_part = now.strftime("%Y%m%d")
-        time_part = now.strftime("%H%M%S")
-        counter = int(now.microsecond / 100)
+    # --- SLA (see sla.py) ---
+    due_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Resolution deadline: creation time plus the TAT for the nature / type.",
+        db_column="due_at"
+    )
 
-        for _ in range(100):
-            sr_number = f"SR-{date_part}-{time_part}-{counter:04d}"
-            if not ServiceRequest.objects.filter(sr_number=sr_number).exists():
-                return sr_number
-            counter = (counter + 1) % 10000
+    breached_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set by the SLA breach scan when the SR went past due_at unresolved.",
+        db_column="breached_at"
+    )
 
-        import random
-        return f"SR-{date_part}-{time_part}-{random.randint(1000, 9999)}"
+    # Kept by the SRComment signals, so the timeline knows the total without a COUNT
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        db_column="comment_count"
+    )
+
+    # --- Custom Methods ---
+    def _generate_unique_sr_number(self, using=None):
+        # Numbers come from a per-day counter handed out in blocks, so this
+        # is normally a local increment with no DB round trip
+        from .sr_numbers import next_sr_number
+        return next_sr_number(using=using or "default")
+
+    # Fields whose old values the signals need when an SR changes
+    TRACKED_FIELDS = ("status_id", "category", "assigned_to_id", "closed_at")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._tracked_values()
+        return instance
+
+    def _tracked_values(self):
+        return {name: self.__dict__.get(name) for name in self.TRACKED_FIELDS}
+
+    def _lock_tracked_values(self, using=None, update_fields=None):
+        # The deltas the signals apply are computed from _loaded_values, which
+        # may be stale by now: re-read them with the row locked, so concurrent
+        # writes to the same SR take turns and each starts from the state the
+        # previous one committed
+        if self._state.adding or self.pk is None:
+            return
+        if update_fields is not None:
+            tracked = {name.removesuffix("_id") for name in self.TRACKED_FIELDS}
+            if not tracked & {name.removesuffix("_id") for name in update_fields}:
+                return
+        row = (
+            type(self)._base_manager.using(using or self._state.db)
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values(*self.TRACKED_FIELDS)
+            .first()
+        )
+        if row is not None:
+            self._loaded_values = row
 
     def save(self, *args, **kwargs):
         if not self.sr_number:
-            self.sr_number = self._generate_unique_sr_number()
-        super().save(*args, **kwargs)
+            self.sr_number = self._generate_unique_sr_number(kwargs.get("using"))
+        if self._state.adding and self.due_at is None:
+            from .sla import apply_sla
+            apply_sla(self)
+        # Signal handlers (counters, search) run inside the same transaction
+        with transaction.atomic(using=kwargs.get("using")):
+            self._lock_tracked_values(kwargs.get("using"), kwargs.get("update_fields"))
+            super().save(*args, **kwargs)
+        self._loaded_values = self._tracked_values()
+
+    def delete(self, using=None, keep_parents=False):
+        with transaction.atomic(using=using):
+            self._lock_tracked_values(using)
+            return super().delete(using=using, keep_parents=keep_parents)
 
     def __str__(self):
         return f"{self.sr_number} - {self.subject[:50]}"
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Breach scan: pending statuses, deadline range
+            models.Index(fields=["status", "due_at"], name="sr_status_due_idx"),
+            # List filters (filters.py), newest first within a status / category
+            models.Index(fields=["status", "created_at"], name="sr_status_created_idx"),
+            models.Index(fields=["category", "created_at"], name="sr_category_created_idx"),
+            # An agent's open / WIP SRs (work queue, agent loads)
+            models.Index(fields=["assigned_to", "status"], name="sr_assignee_status_idx"),
+            # Work queue (work_queue.py): unassigned SRs only, by deadline or age
+            models.Index(
+                fields=["status", "due_at", "created_at"],
+                condition=models.Q(assigned_to__isnull=True),
+                name="sr_queue_due_idx",
+            ),
+            models.Index(
+                fields=["status", "created_at"],
+                condition=models.Q(assigned_to__isnull=True),
+                name="sr_queue_age_idx",
+            ),
+        ]
 
 
 class SRComment(models.Model):
@@ -234,6 +310,10 @@ class SRComment(models.Model):
         verbose_name = "SR Comment"
         verbose_name_plural = "SR Comments"
         ordering = ['created_at']
+        indexes = [
+            # Comment timeline (timeline.py): an SR's comments, newest first
+            models.Index(fields=["service_request", "-created_at", "-id"], name="sr_comment_timeline_idx"),
+        ]
     
     def __str__(self):
         return f"Comment on {self.service_request.sr_number} by {self.user}"
@@ -342,3 +422,220 @@ class SRType(models.Model):
     class Meta:
         db_table = "sr_type"
         ordering = ["name"]
+
+
+class SRCounter(models.Model):
+    """
+    Running SR totals shown on the dashboard ("total", "status:<code>",
+    "category:<category>"). Kept in step with ServiceRequest writes by the
+    signals in signals.py; rebuild with `manage.py reconcile_sr_counters`.
+    """
+
+    key = models.CharField(
+        max_length=50,
+        unique=True
+    )
+
+    value = models.BigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+    class Meta:
+        db_table = "sr_counter"
+        verbose_name = "SR Counter"
+        verbose_name_plural = "SR Counters"
+
+
+class SRDailyStat(models.Model):
+    """
+    Per-day SR rollup backing the dashboard trend charts.
+
+    "created" and "closed" count SRs by the local (TIME_ZONE) day they were
+    created / closed. "status", "nature" and "type" break down the SRs
+    created on a day by their current status, nature and type code.
+    Maintained by signals; rebuild with `manage.py backfill_sr_rollup`.
+    """
+
+    METRIC_CREATED = "created"
+    METRIC_CLOSED = "closed"
+    METRIC_STATUS = "status"
+    METRIC_NATURE = "nature"
+    METRIC_TYPE = "type"
+
+    METRIC_CHOICES = [
+        (METRIC_CREATED, "Created"),
+        (METRIC_CLOSED, "Closed"),
+        (METRIC_STATUS, "By Status"),
+        (METRIC_NATURE, "By Nature"),
+        (METRIC_TYPE, "By Type"),
+    ]
+
+    day = models.DateField()
+
+    metric = models.CharField(
+        max_length=20,
+        choices=METRIC_CHOICES
+    )
+
+    dimension = models.CharField(
+        max_length=50,
+        blank=True,
+        default=""
+    )
+
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.metric}:{self.dimension} = {self.count}"
+
+    class Meta:
+        db_table = "sr_daily_stat"
+        unique_together = ("metric", "dimension", "day")
+        verbose_name = "SR Daily Stat"
+        verbose_name_plural = "SR Daily Stats"
+
+
+class SRNumberSequence(models.Model):
+    """
+    Last SR number handed out per (local) day. Workers reserve blocks of
+    numbers from this row, see sr_numbers.py.
+    """
+
+    day = models.DateField(unique=True)
+
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+    class Meta:
+        db_table = "sr_number_sequence"
+
+
+class SRWatermark(models.Model):
+    """
+    How far an incremental job (e.g. the SLA breach scan) has got.
+    """
+
+    name = models.CharField(
+        max_length=50,
+        unique=True
+    )
+
+    position = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+    class Meta:
+        db_table = "sr_watermark"
+
+
+class AgentLoad(models.Model):
+    """
+    Open + WIP SRs currently assigned to each agent, kept in step with SR
+    writes by the signals (see assignment.py) so auto-assignment picks the
+    least-loaded agent without counting SRs.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="agent_load"
+    )
+
+    open_count = models.IntegerField(default=0)
+
+    accepting = models.BooleanField(
+        default=True,
+        help_text="Whether new SRs may be auto-assigned to this agent."
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} ({self.open_count} open)"
+
+    class Meta:
+        db_table = "sr_agent_load"
+        indexes = [
+            models.Index(fields=["accepting", "open_count"], name="sr_agent_load_pick_idx"),
+        ]
+
+
+class AgentSkill(models.Model):
+    """
+    How much of an SR type an agent should take: an agent's load counts as
+    open_count / weight for that type, and weight 0 excludes the type.
+    Agents without a row for a type have weight 1.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="agent_skills"
+    )
+
+    sr_type = models.ForeignKey(
+        "SRType",
+        on_delete=models.CASCADE,
+        related_name="agent_skills"
+    )
+
+    weight = models.FloatField(default=1.0)
+
+    def __str__(self):
+        return f"{self.user} | {self.sr_type} x{self.weight}"
+
+    class Meta:
+        db_table = "sr_agent_skill"
+        unique_together = ("user", "sr_type")
+
+
+class SRArchiveIndex(models.Model):
+    """
+    Where an archived SR (and its comments) lives in the cold archive: one
+    compressed record at ``offset`` in segment file ``segment`` (see
+    archive.py). The SR row itself is gone from the live table.
+    """
+
+    sr_id = models.BigIntegerField(unique=True)
+
+    sr_number = models.CharField(
+        max_length=50,
+        unique=True
+    )
+
+    segment = models.PositiveIntegerField()
+
+    offset = models.BigIntegerField()
+
+    length = models.PositiveIntegerField()
+
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    # Archived SRs still count on the dashboard (counters.compute_counters)
+    # and in the trend rollup (rollups.compute_rollup)
+    category = models.CharField(max_length=20, blank=True, default="")
+
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    nature_code = models.CharField(max_length=20, blank=True, default="")
+
+    type_code = models.CharField(max_length=30, blank=True, default="")
+
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sr_number} @ segment {self.segment}:{self.offset}"
+
+    class Meta:
+        db_table = "sr_archive_index"
+        verbose_name = "SR Archive Entry"
+        verbose_name_plural = "SR Archive Index"
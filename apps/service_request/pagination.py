@@ -0,0 +1,168 @@
+import json
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+
+CURSOR_SALT = "service_request.list_cursor"
+
+# sort option (as used in list_sr) -> model field used for the keyset
+KEYSET_FIELDS = {
+    "sr_number": "sr_number",
+    "created_at": "created_at",
+    "status": "status_id",
+}
+
+
+class KeysetPage:
+    """
+    One page of a keyset (cursor) paginated queryset.
+    """
+
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(sort_by, row, direction):
+    """
+    Build an opaque, signed token pointing just past ``row``.
+    """
+    field = KEYSET_FIELDS[sort_by.lstrip("-")]
+    value = getattr(row, field)
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return signing.dumps(
+        {"s": sort_by, "v": value, "id": row.pk, "d": direction},
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(token, sort_by):
+    """
+    Return the cursor payload, or None if the token is missing, tampered
+    with, or was issued for a different sort order.
+    """
+    if not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if payload.get("s") != sort_by or payload.get("d") not in ("next", "prev"):
+        return None
+    return payload
+
+
+def _keyset_query(queryset, sort_by, cursor, per_page):
+    """
+    The seek query for one page (one row more than ``per_page``, to tell
+    whether there is a further page) and the decoded cursor.
+    """
+    descending = sort_by.startswith("-")
+    field_name = KEYSET_FIELDS[sort_by.lstrip("-")]
+    field = queryset.model._meta.get_field(field_name)
+
+    payload = decode_cursor(cursor, sort_by)
+    backwards = payload is not None and payload["d"] == "prev"
+
+    # Walking backwards means reading the index in the opposite direction
+    seek_desc = descending != backwards
+    prefix = "-" if seek_desc else ""
+    queryset = queryset.order_by(f"{prefix}{field_name}", f"{prefix}id")
+
+    if payload is not None:
+        value = field.to_python(payload["v"])
+        lookup = "lt" if seek_desc else "gt"
+        queryset = queryset.filter(
+            Q(**{f"{field_name}__{lookup}": value})
+            | Q(**{field_name: value, f"id__{lookup}": payload["id"]})
+        )
+
+    return queryset[:per_page + 1], payload
+
+
+def _keyset_page(rows, sort_by, payload, per_page):
+    backwards = payload is not None and payload["d"] == "prev"
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage([])
+
+    next_cursor = prev_cursor = None
+    if has_more or backwards:
+        next_cursor = encode_cursor(sort_by, rows[-1], "next")
+    if payload is not None and (has_more or not backwards):
+        prev_cursor = encode_cursor(sort_by, rows[0], "prev")
+
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+def keyset_paginate(queryset, sort_by, cursor, per_page):
+    """
+    Paginate ``queryset`` by seeking on (sort field, id) instead of OFFSET,
+    so the cost of a page does not depend on how deep it is.
+    """
+    queryset, payload = _keyset_query(queryset, sort_by, cursor, per_page)
+    return _keyset_page(list(queryset), sort_by, payload, per_page)
+
+
+async def akeyset_paginate(queryset, sort_by, cursor, per_page):
+    """
+    keyset_paginate() for async views.
+    """
+    queryset, payload = _keyset_query(queryset, sort_by, cursor, per_page)
+    return _keyset_page([row async for row in queryset], sort_by, payload, per_page)
+
+
+def approximate_count(queryset):
+    """
+    Cheap row estimate for a queryset.
+
+    On Postgres this uses planner statistics (pg_class.reltuples for the
+    bare table, the EXPLAIN row estimate for a filtered queryset) instead of
+    running COUNT(*). Other backends fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+
+        sql, params = queryset.order_by().values("id").query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
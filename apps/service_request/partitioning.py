@@ -0,0 +1,320 @@
+"""
+Monthly range partitioning of the SR table on PostgreSQL.
+
+With ``SR_PARTITIONING`` on, the SR table is partitioned by ``created_at``
+into one partition per local calendar month, plus a default partition
+catching rows outside every month created so far (backdated imports).
+Queries bounded on ``created_at`` (the list's date filters) only touch the
+months in range, and vacuum / reindex / backups work month by month.
+
+``convert`` turns the existing table into a partitioned one in a single
+transaction (it locks the table while it copies, so run it in a quiet
+window); migration 0011 calls it when the setting is on.
+``ensure_partitions`` creates the coming months ahead of time, and moves
+backdated rows out of the default partition into their own months; it is
+run by ``manage.py partition_srs`` from cron.
+
+PostgreSQL only allows primary keys and unique indexes on a partitioned
+table when they include the partition key, so the primary key becomes
+``(id, created_at)`` and the ``sr_number`` index becomes
+``(sr_number, created_at)``. Neither can be the target of a foreign key or
+keep ids and numbers globally unique, so ``convert`` adds the
+non-partitioned key table ``<table>_keys (id PRIMARY KEY, sr_number
+UNIQUE)``, kept in step by triggers on the SR table:
+
+* an insert adds the key, or updates it when a ``created_at`` change moved
+  the row to another partition (a delete and an insert there);
+* an ``sr_number`` update is copied over;
+* a delete removes the key at commit, once the id is gone from every
+  partition, so a row moved between partitions keeps it.
+
+The foreign keys pointing at the SR table (comments, the search table) are
+recreated against the key table, with their ``ON DELETE`` actions, and a
+duplicate ``sr_number`` fails on its unique constraint like before. Other
+backends (SQLite) keep the plain table.
+"""
+import re
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import ServiceRequest
+
+
+TABLE = ServiceRequest._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+KEY_TABLE = f"{TABLE}_keys"
+SEQUENCE = f"{TABLE}_id_seq"
+PARTITION_KEY = "created_at"
+
+
+def enabled(connection):
+    return connection.vendor == "postgresql" and getattr(settings, "SR_PARTITIONING", False)
+
+
+def is_partitioned(using="default"):
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.oid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+# ---- Months ----
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _bound(month):
+    # Local midnight on the 1st, so a month's SRs are the ones whose SR
+    # number (and list date filter) falls in that month
+    return timezone.make_aware(datetime.combine(month, time.min)).isoformat()
+
+
+def partitions(using="default"):
+    """
+    [(partition name, bound expression)] of the SR table, by name.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [TABLE],
+        )
+        return cursor.fetchall()
+
+
+# ---- Partition management ----
+
+def _table_exists(cursor, name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    return cursor.fetchone()[0]
+
+
+def create_partition(month, using="default"):
+    """
+    Create and attach the partition for ``month``, moving its rows out of
+    the default partition. Returns False when it already exists.
+    """
+    name = partition_name(month)
+    low, high = _bound(month), _bound(add_months(month, 1))
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        if _table_exists(cursor, name):
+            return False
+        # Attaching checks the default partition holds nothing in the new
+        # range, so those rows move over first
+        cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        range_sql = f"{PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s"
+        cursor.execute(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {range_sql}", [low, high])
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE {range_sql}", [low, high])
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{low}') TO ('{high}')"
+        )
+    return True
+
+
+def _default_partition_months(using="default"):
+    # Months of the rows that landed in the default partition (backdated)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {PARTITION_KEY} AT TIME ZONE %s)::date "
+            f"FROM {DEFAULT_PARTITION}",
+            [timezone.get_current_timezone_name()],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_partitions(months_ahead=None, using="default"):
+    """
+    Make sure partitions exist from the current month to ``months_ahead``
+    months after it, and for any month with rows in the default partition.
+    Returns the names created.
+    """
+    if months_ahead is None:
+        months_ahead = getattr(settings, "SR_PARTITION_MONTHS_AHEAD", 3)
+    current = month_start(timezone.localdate())
+    months = {add_months(current, n) for n in range(months_ahead + 1)}
+    months.update(_default_partition_months(using))
+    return [partition_name(month) for month in sorted(months) if create_partition(month, using)]
+
+
+def _unique_with_key(indexdef):
+    # Unique indexes on a partitioned table must include the partition key;
+    # global uniqueness comes from KEY_TABLE
+    match = re.search(r"USING \w+ \(([^)]*)\)", indexdef)
+    columns = [column.strip() for column in match.group(1).split(",")]
+    if PARTITION_KEY in columns:
+        return indexdef
+    return indexdef[:match.end(1)] + f", {PARTITION_KEY}" + indexdef[match.end(1):]
+
+
+def _repoint(definition):
+    """
+    A foreign key definition referencing the SR table's id or sr_number,
+    rewritten to reference KEY_TABLE; None for any other target columns.
+    """
+    target = re.search(rf"REFERENCES {re.escape(TABLE)}\((id|sr_number)\)", definition)
+    if target is None:
+        return None
+    reference = f"REFERENCES {KEY_TABLE}({target.group(1)})"
+    return definition[:target.start()] + reference + definition[target.end():]
+
+
+def _referencing_keys(cursor):
+    """
+    [(table, constraint name, definition pointing at KEY_TABLE)] for the
+    foreign keys pointing at the SR table. Raises ValueError for one that
+    references columns the key table doesn't have.
+    """
+    cursor.execute(
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE confrelid = to_regclass(%s) AND conrelid <> confrelid AND contype = 'f' "
+        "ORDER BY 1, 2",
+        [TABLE],
+    )
+    references = []
+    for table, name, definition in cursor.fetchall():
+        repointed = _repoint(definition)
+        if repointed is None:
+            raise ValueError(f"Foreign key {name} on {table} can't be moved to {KEY_TABLE}: {definition}")
+        references.append((table, name, repointed))
+    return references
+
+
+def _create_key_table(cursor):
+    cursor.execute(f"CREATE TABLE {KEY_TABLE} AS SELECT id, sr_number FROM {TABLE}")
+    cursor.execute(f"ALTER TABLE {KEY_TABLE} ADD PRIMARY KEY (id), ADD UNIQUE (sr_number)")
+    cursor.execute(f"""
+        CREATE FUNCTION {KEY_TABLE}_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO {KEY_TABLE} (id, sr_number) VALUES (NEW.id, NEW.sr_number)
+            ON CONFLICT (id) DO UPDATE SET sr_number = EXCLUDED.sr_number;
+            RETURN NULL;
+        END $$
+    """)
+    cursor.execute(f"""
+        CREATE FUNCTION {KEY_TABLE}_update() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE {KEY_TABLE} SET id = NEW.id, sr_number = NEW.sr_number WHERE id = OLD.id;
+            RETURN NULL;
+        END $$
+    """)
+    cursor.execute(f"""
+        CREATE FUNCTION {KEY_TABLE}_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            DELETE FROM {KEY_TABLE} WHERE id = OLD.id
+            AND NOT EXISTS (SELECT 1 FROM {TABLE} WHERE id = OLD.id);
+            RETURN NULL;
+        END $$
+    """)
+    cursor.execute(
+        f"CREATE TRIGGER {KEY_TABLE}_insert AFTER INSERT ON {TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION {KEY_TABLE}_insert()"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER {KEY_TABLE}_update AFTER UPDATE OF id, sr_number ON {TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION {KEY_TABLE}_update()"
+    )
+    # Deferred, so a row moving partitions (delete + insert) keeps its key
+    # and the rows referencing it
+    cursor.execute(
+        f"CREATE CONSTRAINT TRIGGER {KEY_TABLE}_delete AFTER DELETE ON {TABLE} "
+        f"DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION {KEY_TABLE}_delete()"
+    )
+
+
+def convert(months_ahead=None, using="default"):
+    """
+    Replace the plain SR table with a partitioned copy holding the same
+    rows, indexes and outgoing foreign keys, plus KEY_TABLE, which the
+    incoming foreign keys then point at. Returns the number of rows moved,
+    or None when the table is already partitioned.
+    """
+    if is_partitioned(using):
+        return None
+    old_table = f"{TABLE}_unpartitioned"
+    new_sequence = f"{SEQUENCE}_new"
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        # Django's foreign keys are deferred; the old table can't be dropped
+        # while checks on rows written earlier in this transaction are pending
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            "SELECT indexdef, indexname LIKE '%%_pkey' FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s",
+            [TABLE],
+        )
+        indexes = [
+            _unique_with_key(indexdef) if indexdef.startswith("CREATE UNIQUE") else indexdef
+            for indexdef, is_pkey in cursor.fetchall() if not is_pkey
+        ]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        references = _referencing_keys(cursor)
+        for table, name, _ in references:
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+        cursor.execute(f"SELECT min({PARTITION_KEY}), max(id) FROM {TABLE}")
+        oldest, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {old_table}")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({PARTITION_KEY})"
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+        # Every month that has rows, up to the months ahead
+        current = month_start(timezone.localdate())
+        month = month_start(timezone.localtime(oldest)) if oldest else current
+        while month < current:
+            create_partition(month, using)
+            month = add_months(month, 1)
+        ensure_partitions(months_ahead, using)
+
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {old_table}")
+        moved = cursor.rowcount
+
+        # The identity column's sequence goes with the old table
+        cursor.execute(f"CREATE SEQUENCE {new_sequence}")
+        if max_id:
+            cursor.execute("SELECT setval(%s, %s)", [new_sequence, max_id])
+        cursor.execute(f"DROP TABLE {old_table}")
+        cursor.execute(f"ALTER SEQUENCE {new_sequence} RENAME TO {SEQUENCE}")
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+
+        cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, {PARTITION_KEY})")
+        for indexdef in indexes:
+            cursor.execute(indexdef)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+        _create_key_table(cursor)
+        for table, name, definition in references:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+        # Back to Django's deferred checks for the rest of the transaction
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+    return moved
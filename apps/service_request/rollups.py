@@ -0,0 +1,238 @@
+"""
+Per-day SR rollup (``sr_daily_stat``) for the dashboard trend charts.
+
+Days are local dates in settings.TIME_ZONE, so an SR created at 01:00 IST
+lands on the Indian calendar day rather than the UTC one.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import master_data
+from .counters import current_status_code, status_code
+from .models import ServiceRequest, SRArchiveIndex, SRDailyStat, SRStatus
+
+
+def _related_code(instance, field_name, lookup):
+    if getattr(ServiceRequest, field_name).is_cached(instance):
+        related = getattr(instance, field_name)
+    else:
+        related = lookup(getattr(instance, f"{field_name}_id"))
+    return related.code if related else None
+
+
+def deltas_for_save(instance, created):
+    """
+    Rollup changes caused by saving ``instance``, keyed (day, metric, dimension).
+    """
+    deltas = Counter()
+    created_day = timezone.localdate(instance.created_at)
+
+    if created:
+        deltas[(created_day, SRDailyStat.METRIC_CREATED, "")] += 1
+        deltas[(created_day, SRDailyStat.METRIC_STATUS, current_status_code(instance))] += 1
+        deltas[(created_day, SRDailyStat.METRIC_NATURE, _related_code(instance, "sr_nature", master_data.get_nature_by_id))] += 1
+        deltas[(created_day, SRDailyStat.METRIC_TYPE, _related_code(instance, "sr_type", master_data.get_type_by_id))] += 1
+        return deltas
+
+    old = getattr(instance, "_loaded_values", None)
+    if old is None or old["status_id"] == instance.status_id:
+        return deltas
+
+    old_code = status_code(old["status_id"])
+    new_code = current_status_code(instance)
+    deltas[(created_day, SRDailyStat.METRIC_STATUS, old_code)] -= 1
+    deltas[(created_day, SRDailyStat.METRIC_STATUS, new_code)] += 1
+
+    if new_code == SRStatus.STATUS_CLOSED:
+        closed_day = timezone.localdate(instance.closed_at or timezone.now())
+        deltas[(closed_day, SRDailyStat.METRIC_CLOSED, "")] += 1
+    elif old_code == SRStatus.STATUS_CLOSED and old.get("closed_at"):
+        # Reopened: take it back off the day it was closed
+        closed_day = timezone.localdate(old["closed_at"])
+        deltas[(closed_day, SRDailyStat.METRIC_CLOSED, "")] -= 1
+
+    return deltas
+
+
+def apply_deltas(deltas, using="default"):
+    with transaction.atomic(using=using):
+        for key in sorted(deltas, key=lambda k: (k[0], k[1], k[2] or "")):
+            delta = deltas[key]
+            if not delta:
+                continue
+            day, metric, dimension = key[0], key[1], key[2] or ""
+            rows = SRDailyStat.objects.using(using).filter(
+                day=day, metric=metric, dimension=dimension
+            )
+            if not rows.update(count=F("count") + delta):
+                SRDailyStat.objects.using(using).get_or_create(
+                    day=day, metric=metric, dimension=dimension
+                )
+                rows.update(count=F("count") + delta)
+
+
+def compute_rollup(start_day=None, using="default"):
+    """
+    Rollup rows recomputed for days >= ``start_day`` from the SR table, plus
+    the archived SRs (all closed) from the archive index.
+    """
+    tz = timezone.get_current_timezone()
+    srs = ServiceRequest.objects.using(using).order_by()
+    archived = SRArchiveIndex.objects.using(using).order_by()
+    if start_day is not None:
+        start = timezone.make_aware(datetime.combine(start_day, time.min), tz)
+        created = srs.filter(created_at__gte=start)
+        closed = srs.filter(closed_at__gte=start)
+        archived_created = archived.filter(created_at__gte=start)
+        archived_closed = archived.filter(closed_at__gte=start)
+    else:
+        created = srs
+        closed = srs.filter(closed_at__isnull=False)
+        archived_created = archived.filter(created_at__isnull=False)
+        archived_closed = archived.filter(closed_at__isnull=False)
+
+    created = created.annotate(day=TruncDate("created_at", tzinfo=tz))
+    values = Counter()
+
+    for row in created.values("day").annotate(n=Count("id")):
+        values[(row["day"], SRDailyStat.METRIC_CREATED, "")] = row["n"]
+    for metric, field in (
+        (SRDailyStat.METRIC_STATUS, "status__code"),
+        (SRDailyStat.METRIC_NATURE, "sr_nature__code"),
+        (SRDailyStat.METRIC_TYPE, "sr_type__code"),
+    ):
+        for row in created.values("day", field).annotate(n=Count("id")):
+            values[(row["day"], metric, row[field])] = row["n"]
+
+    closed = closed.filter(status__code=SRStatus.STATUS_CLOSED).annotate(
+        day=TruncDate("closed_at", tzinfo=tz)
+    )
+    for row in closed.values("day").annotate(n=Count("id")):
+        values[(row["day"], SRDailyStat.METRIC_CLOSED, "")] = row["n"]
+
+    archived_created = archived_created.annotate(day=TruncDate("created_at", tzinfo=tz))
+    for row in archived_created.values("day", "nature_code", "type_code").annotate(n=Count("id")):
+        day, n = row["day"], row["n"]
+        values[(day, SRDailyStat.METRIC_CREATED, "")] += n
+        values[(day, SRDailyStat.METRIC_STATUS, SRStatus.STATUS_CLOSED)] += n
+        values[(day, SRDailyStat.METRIC_NATURE, row["nature_code"])] += n
+        values[(day, SRDailyStat.METRIC_TYPE, row["type_code"])] += n
+    archived_closed = archived_closed.annotate(day=TruncDate("closed_at", tzinfo=tz))
+    for row in archived_closed.values("day").annotate(n=Count("id")):
+        values[(row["day"], SRDailyStat.METRIC_CLOSED, "")] += row["n"]
+
+    return values
+
+
+def backfill(start_day=None, using="default"):
+    """
+    Replace the rollup rows for days >= ``start_day`` (all days if None).
+    Returns the number of rows written.
+    """
+    values = compute_rollup(start_day, using)
+    with transaction.atomic(using=using):
+        existing = SRDailyStat.objects.using(using)
+        if start_day is not None:
+            existing = existing.filter(day__gte=start_day)
+        existing.delete()
+        SRDailyStat.objects.using(using).bulk_create(
+            [
+                SRDailyStat(day=day, metric=metric, dimension=dimension or "", count=n)
+                for (day, metric, dimension), n in values.items()
+                if n
+            ],
+            batch_size=1000,
+        )
+    from .dashboard_cache import invalidate
+    invalidate()
+    return len(values)
+
+
+# ---- Dashboard trend ----
+
+# range (days) -> bucket size
+TREND_RANGES = {
+    7: "day",
+    30: "day",
+    90: "week",
+    365: "month",
+}
+
+
+def _bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_label(start, bucket, days):
+    if bucket == "month":
+        return start.strftime("%b %y")
+    if bucket == "week" or days > 7:
+        return start.strftime("%d %b")
+    return start.strftime("%a")
+
+
+def _trend_range(days):
+    today = timezone.localdate()
+    return today - timedelta(days=days - 1), today
+
+
+def _trend_rows(start_day, end_day, using="default"):
+    return (
+        SRDailyStat.objects.using(using)
+        .filter(
+            metric__in=[SRDailyStat.METRIC_CREATED, SRDailyStat.METRIC_CLOSED],
+            dimension="",
+            day__gte=start_day,
+            day__lte=end_day,
+        )
+        .values_list("day", "metric", "count")
+    )
+
+
+def _bucket_trend(rows, days, start_day, end_day):
+    bucket = TREND_RANGES.get(days, "day")
+
+    buckets = {}
+    day = start_day
+    while day <= end_day:
+        key = _bucket_start(day, bucket)
+        buckets.setdefault(key, {
+            "label": _bucket_label(key, bucket, days),
+            "count": 0,
+            "closed": 0,
+        })
+        day += timedelta(days=1)
+
+    for day, metric, count in rows:
+        item = buckets[_bucket_start(day, bucket)]
+        item["count" if metric == SRDailyStat.METRIC_CREATED else "closed"] += count
+
+    return [buckets[key] for key in sorted(buckets)]
+
+
+def trend(days=7, using="default"):
+    """
+    Created / closed SR counts for the last ``days`` local days, bucketed
+    per day, week or month depending on the range.
+    """
+    start_day, end_day = _trend_range(days)
+    rows = list(_trend_rows(start_day, end_day, using))
+    return _bucket_trend(rows, days, start_day, end_day)
+
+
+async def atrend(days=7, using="default"):
+    """
+    trend() for async views.
+    """
+    start_day, end_day = _trend_range(days)
+    rows = [row async for row in _trend_rows(start_day, end_day, using)]
+    return _bucket_trend(rows, days, start_day, end_day)
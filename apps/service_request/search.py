@@ -0,0 +1,225 @@
+"""
+Full-text search over Service Requests.
+
+Postgres keeps a weighted tsvector per SR in ``sr_search`` (GIN indexed);
+SQLite keeps the same text in an FTS5 table ``sr_search_fts``. Both are
+filled by the signals in ``signals.py`` and can be rebuilt with
+``manage.py rebuild_sr_search``. Backends without either fall back to the
+old ``icontains`` scan.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import ServiceRequest, SRComment
+
+
+PG_TABLE = "sr_search"
+FTS_TABLE = "sr_search_fts"
+
+# Text search configuration for both the documents and the queries, so
+# terms are normalised the same way on either side
+PG_CONFIG = "english"
+
+# Max number of words taken from the search box
+MAX_TERMS = 8
+
+_backends = {}
+
+
+def create_search_tables(schema_editor):
+    connection = schema_editor.connection
+    sr_table = ServiceRequest._meta.db_table
+
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {PG_TABLE} ("
+            f" sr_id bigint PRIMARY KEY REFERENCES {sr_table} (id) ON DELETE CASCADE,"
+            f" document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {PG_TABLE}_document_gin ON {PG_TABLE} USING gin (document)"
+        )
+    elif connection.vendor == "sqlite" and _fts5_available(connection):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"sr_number, subject, description, comments, tokenize = 'unicode61')"
+        )
+    _backends.pop(connection.alias, None)
+
+
+def drop_search_tables(schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+    elif connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    _backends.pop(connection.alias, None)
+
+
+def _fts5_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def search_backend(using="default"):
+    """
+    "postgresql", "fts5" or None when no search table exists.
+    """
+    if using not in _backends:
+        connection = connections[using]
+        backend = None
+        tables = connection.introspection.table_names()
+        if connection.vendor == "postgresql" and PG_TABLE in tables:
+            backend = "postgresql"
+        elif connection.vendor == "sqlite" and FTS_TABLE in tables:
+            backend = "fts5"
+        _backends[using] = backend
+    return _backends[using]
+
+
+def index_service_requests(sr_ids, using="default"):
+    """
+    (Re)build the search document for the given SR ids, comments included.
+    """
+    sr_ids = list(sr_ids)
+    backend = search_backend(using)
+    if not sr_ids or backend is None:
+        return
+
+    sr_table = ServiceRequest._meta.db_table
+    comment_table = SRComment._meta.db_table
+    placeholders = ", ".join(["%s"] * len(sr_ids))
+
+    with connections[using].cursor() as cursor:
+        if backend == "postgresql":
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (sr_id, document) "
+                f"SELECT sr.id,"
+                f" setweight(to_tsvector('{PG_CONFIG}', sr.sr_number), 'A') ||"
+                f" setweight(to_tsvector('{PG_CONFIG}', sr.subject), 'A') ||"
+                f" setweight(to_tsvector('{PG_CONFIG}', sr.description), 'B') ||"
+                f" setweight(to_tsvector('{PG_CONFIG}', coalesce("
+                f"  (SELECT string_agg(c.comment, ' ') FROM {comment_table} c"
+                f"   WHERE c.service_request_id = sr.id), '')), 'C') "
+                f"FROM {sr_table} sr WHERE sr.id IN ({placeholders}) "
+                f"ON CONFLICT (sr_id) DO UPDATE SET document = EXCLUDED.document",
+                sr_ids,
+            )
+        else:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", sr_ids
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} "
+                f"(rowid, sr_number, subject, description, comments) "
+                f"SELECT sr.id, sr.sr_number, sr.subject, sr.description, coalesce("
+                f" (SELECT group_concat(c.comment, ' ') FROM {comment_table} c"
+                f"  WHERE c.service_request_id = sr.id), '') "
+                f"FROM {sr_table} sr WHERE sr.id IN ({placeholders})",
+                sr_ids,
+            )
+
+
+def index_comment(sr_id, comment, using="default"):
+    """
+    Fold a new comment into an SR's existing search document.
+    """
+    backend = search_backend(using)
+    if backend is None:
+        return
+
+    with connections[using].cursor() as cursor:
+        if backend == "postgresql":
+            cursor.execute(
+                f"UPDATE {PG_TABLE} SET document = document || "
+                f"setweight(to_tsvector('{PG_CONFIG}', %s), 'C') WHERE sr_id = %s",
+                [comment, sr_id],
+            )
+        else:
+            cursor.execute(
+                f"UPDATE {FTS_TABLE} SET comments = comments || ' ' || %s "
+                f"WHERE rowid = %s",
+                [comment, sr_id],
+            )
+
+
+def remove_service_requests(sr_ids, using="default"):
+    sr_ids = list(sr_ids)
+    backend = search_backend(using)
+    if not sr_ids or backend is None:
+        return
+
+    table, column = (PG_TABLE, "sr_id") if backend == "postgresql" else (FTS_TABLE, "rowid")
+    placeholders = ", ".join(["%s"] * len(sr_ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", sr_ids)
+
+
+def search_service_requests(queryset, query):
+    """
+    Filter ``queryset`` to SRs matching ``query`` and order them by relevance.
+
+    Every word is matched as a prefix, and SR numbers starting with the
+    query rank first (served by the sr_number index).
+    """
+    terms = re.findall(r"\w+", query.lower())[:MAX_TERMS]
+    backend = search_backend(queryset.db)
+
+    if backend is None or not terms:
+        return queryset.filter(
+            Q(sr_number__icontains=query) |
+            Q(subject__icontains=query) |
+            Q(description__icontains=query)
+        )
+
+    sr_table = ServiceRequest._meta.db_table
+    sr_column = f'"{sr_table}"."id"'
+    number_prefix = query.strip().upper()
+    # LIKE pattern for the SR number prefix; backslash is the escape
+    # character (PostgreSQL's default, explicit on SQLite)
+    number_like = re.sub(r"([\\%_])", r"\\\1", number_prefix) + "%"
+
+    if backend == "postgresql":
+        match = " & ".join(f"{term}:*" for term in terms)
+        # Candidates from the sr_number prefix index and the GIN index,
+        # so the SR table is only read for the matches
+        candidates = RawSQL(
+            f"SELECT id FROM {sr_table} WHERE sr_number LIKE %s "
+            f"UNION SELECT sr_id FROM {PG_TABLE} "
+            f"WHERE document @@ to_tsquery('{PG_CONFIG}', %s)",
+            [number_like, match],
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('{PG_CONFIG}', %s)) "
+            f"FROM {PG_TABLE} WHERE sr_id = {sr_column}",
+            [match],
+            output_field=FloatField(),
+        )
+    else:
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        candidates = RawSQL(
+            f"SELECT id FROM {sr_table} WHERE sr_number LIKE %s ESCAPE '\\' "
+            f"UNION SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [number_like, match],
+        )
+        # bm25() is lower-is-better; weights follow the column order
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 2.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {sr_column}",
+            [match],
+            output_field=FloatField(),
+        )
+
+    # The rank subqueries only run for the candidate rows
+    return queryset.filter(id__in=candidates).annotate(
+        number_match=Case(
+            When(sr_number__startswith=number_prefix, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        search_rank=rank,
+    ).order_by("-number_match", "-search_rank", "-created_at")
@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from django.contrib.auth.models import User
+
+from .models import ServiceRequest, SRComment, SRNature, SRStatus, SRTATDays, SRType
+from . import assignment, counters, master_data, rollups, search
+
+
+# Fields that make up an SR's search document
+SEARCH_FIELDS = {"sr_number", "subject", "description"}
+
+
+@receiver(post_save, sender=ServiceRequest)
+def index_service_request(sender, instance, created, update_fields=None, using="default", **kwargs):
+    if created or update_fields is None or SEARCH_FIELDS & set(update_fields):
+        search.index_service_requests([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def unindex_service_request(sender, instance, using="default", **kwargs):
+    search.remove_service_requests([instance.pk], using=using)
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_counters(sender, instance, created, using="default", **kwargs):
+    counters.apply_deltas(counters.deltas_for_save(instance, created), using=using)
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_daily_rollup(sender, instance, created, using="default", **kwargs):
+    rollups.apply_deltas(rollups.deltas_for_save(instance, created), using=using)
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def update_counters_on_delete(sender, instance, using="default", **kwargs):
+    counters.apply_deltas(counters.deltas_for_delete(instance), using=using)
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_agent_load(sender, instance, created, using="default", **kwargs):
+    assignment.apply_deltas(assignment.deltas_for_save(instance, created), using=using)
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def update_agent_load_on_delete(sender, instance, using="default", **kwargs):
+    assignment.apply_deltas(assignment.deltas_for_delete(instance), using=using)
+
+
+@receiver(post_save, sender=ServiceRequest)
+@receiver(post_delete, sender=ServiceRequest)
+@receiver(post_save, sender=SRComment)
+@receiver(post_delete, sender=SRComment)
+def mark_list_changed(sender, using="default", **kwargs):
+    # Moves the API list validator (see api._list_etag)
+    counters.mark_list_changed(using=using)
+
+
+def _is_login(update_fields):
+    # Logins only touch last_login
+    return update_fields is not None and set(update_fields) <= {"last_login"}
+
+
+@receiver(pre_save, sender=User)
+def remember_agent_state(sender, instance, update_fields=None, using="default", **kwargs):
+    if _is_login(update_fields) or instance.pk is None:
+        instance._was_agent = False
+        return
+    instance._was_agent = User.objects.using(using).filter(
+        pk=instance.pk, is_staff=True, is_active=True
+    ).exists()
+
+
+@receiver(post_save, sender=User)
+def register_agent(sender, instance, created, update_fields=None, using="default", **kwargs):
+    if _is_login(update_fields):
+        return
+    assignment.ensure_agent(instance, getattr(instance, "_was_agent", False), using=using)
+
+
+@receiver(post_save, sender=SRComment)
+def index_sr_comment(sender, instance, created, using="default", **kwargs):
+    if created:
+        search.index_comment(instance.service_request_id, instance.comment, using=using)
+
+
+@receiver(post_save, sender=SRComment)
+def touch_service_request(sender, instance, created, using="default", **kwargs):
+    # A new comment changes the SR's API representation, so move its
+    # updated_at (ETag / Last-Modified) without re-running the SR signals
+    changes = {"updated_at": timezone.now()}
+    if created:
+        changes["comment_count"] = F("comment_count") + 1
+    ServiceRequest.objects.using(using).filter(pk=instance.service_request_id).update(**changes)
+
+
+@receiver(post_delete, sender=SRComment)
+def uncount_sr_comment(sender, instance, using="default", **kwargs):
+    ServiceRequest.objects.using(using).filter(
+        pk=instance.service_request_id, comment_count__gt=0
+    ).update(comment_count=F("comment_count") - 1, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=SRNature)
+@receiver(post_save, sender=SRType)
+@receiver(post_save, sender=SRStatus)
+@receiver(post_save, sender=SRTATDays)
+@receiver(post_delete, sender=SRNature)
+@receiver(post_delete, sender=SRType)
+@receiver(post_delete, sender=SRStatus)
+@receiver(post_delete, sender=SRTATDays)
+def invalidate_master_data(sender, using="default", **kwargs):
+    # After commit, so other workers cannot reload the old rows under the new version
+    transaction.on_commit(master_data.invalidate, using=using)
@@ -0,0 +1,117 @@
+"""
+SLA deadlines for Service Requests.
+
+An SR's ``due_at`` is its creation time plus the TAT (SRTATDays) of its
+nature / type pair, looked up in the cached master data and stored on the
+row at creation, so finding overdue SRs is an index range scan on
+``(status, due_at)`` instead of a join and a date computation per row.
+
+``scan_breaches`` marks SRs that went past ``due_at`` while still open or in
+progress. It only looks at deadlines that passed since its previous run (the
+``sla_breach_scan`` watermark), so a run costs the same at any table size.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters, master_data, search
+from .models import ServiceRequest, SRComment, SRStatus, SRWatermark
+
+
+WATERMARK = "sla_breach_scan"
+
+
+def apply_sla(sr):
+    """
+    Set ``tat`` and ``due_at`` on an unsaved SR from its nature and type.
+    Leaves both unset when no active TAT is defined for the pair.
+    """
+    nature = master_data.get_nature_by_id(sr.sr_nature_id)
+    sr_type = master_data.get_type_by_id(sr.sr_type_id)
+    tat = master_data.get_tat(nature, sr_type) if nature and sr_type else None
+    if tat is None:
+        return
+    sr.tat_id = tat.id
+    sr.due_at = (sr.created_at or timezone.now()) + timedelta(days=tat.tat_days)
+
+
+def pending_statuses():
+    return [
+        status.id
+        for status in (master_data.get_status(SRStatus.STATUS_OPEN), master_data.get_status(SRStatus.STATUS_WIP))
+        if status is not None
+    ]
+
+
+def breach_candidates(since, until, using="default"):
+    """
+    Open / WIP SRs not yet marked whose deadline passed in (since, until].
+    ``since=None`` means all deadlines up to ``until``.
+    """
+    queryset = ServiceRequest.objects.using(using).filter(
+        status_id__in=pending_statuses(),
+        due_at__lte=until,
+        breached_at__isnull=True,
+    )
+    if since is not None:
+        queryset = queryset.filter(due_at__gt=since)
+    return queryset
+
+
+def mark_breaches(since, until, chunk_size=1000, escalate=True, using="default"):
+    """
+    Mark the breach candidates in chunks, each in its own transaction.
+    With ``escalate`` an internal comment is added to every breached SR.
+    Returns the number of SRs marked.
+    """
+    candidates = breach_candidates(since, until, using).order_by("due_at", "id")
+    marked = 0
+    while True:
+        with transaction.atomic(using=using):
+            # SKIP LOCKED lets two scanners split the work instead of waiting
+            rows = list(
+                candidates.select_for_update(skip_locked=True)
+                .values_list("id", "due_at")[:chunk_size]
+            )
+            if not rows:
+                return marked
+            ids = [sr_id for sr_id, _ in rows]
+            changes = {"breached_at": F("due_at"), "updated_at": timezone.now()}
+            if escalate:
+                # bulk_create below skips the comment signals: count the
+                # comments here and index them after the insert
+                changes["comment_count"] = F("comment_count") + 1
+            ServiceRequest.objects.using(using).filter(id__in=ids).update(**changes)
+            counters.mark_list_changed(using=using)
+            if escalate:
+                comments = SRComment.objects.using(using).bulk_create([
+                    SRComment(
+                        service_request_id=sr_id,
+                        comment=f"SLA breached: resolution was due {timezone.localtime(due_at):%d %b %Y %H:%M}.",
+                        is_internal=True,
+                    )
+                    for sr_id, due_at in rows
+                ])
+                for comment in comments:
+                    search.index_comment(comment.service_request_id, comment.comment, using=using)
+        marked += len(rows)
+
+
+def scan_breaches(chunk_size=1000, escalate=True, full=False, using="default"):
+    """
+    Mark SRs whose deadline passed since the last scan and move the
+    watermark. ``full`` rescans every deadline up to now (first run, or
+    after backdated imports). Returns (since, until, marked).
+    """
+    until = timezone.now()
+    watermark, _ = SRWatermark.objects.using(using).get_or_create(name=WATERMARK)
+    since = None if full else watermark.position
+
+    marked = mark_breaches(since, until, chunk_size, escalate, using)
+
+    # Only moved once the whole window is done: a failed run is retried
+    # from the same point
+    SRWatermark.objects.using(using).filter(name=WATERMARK).update(position=until)
+    return since, until, marked
@@ -0,0 +1,120 @@
+"""
+SR number allocation.
+
+Numbers look like ``SR-20251220-000042``: the local date plus a per-day
+counter kept in ``sr_number_sequence``. Each worker process reserves a
+block of SR_NUMBER_BLOCK_SIZE numbers with one UPDATE and then hands them
+out locally, so ``ServiceRequest.save()`` normally does no extra query.
+
+Blocks are disjoint by construction (they come from an atomic increment of
+the day's row), so two workers can never produce the same number. A block
+reserved inside a transaction is only kept for later use once that
+transaction commits: if it rolls back, the counter rolls back with it and
+the numbers must not be reused. Unused numbers at worker exit are simply
+skipped, so numbers are unique and increasing but not gap-free.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SRNumberSequence
+
+
+def format_sr_number(day, value):
+    return f"SR-{day:%Y%m%d}-{value:06d}"
+
+
+def reserve_block(day, size, using="default"):
+    """
+    Atomically take the next ``size`` numbers for ``day``.
+    Returns (first, last), inclusive.
+    """
+    with transaction.atomic(using=using):
+        sequence = SRNumberSequence.objects.using(using).filter(day=day)
+        if not sequence.update(last_value=F("last_value") + size):
+            try:
+                with transaction.atomic(using=using):
+                    SRNumberSequence.objects.using(using).create(day=day, last_value=size)
+                return 1, size
+            except IntegrityError:
+                # Another worker created the day's row first
+                sequence.update(last_value=F("last_value") + size)
+        last = sequence.values_list("last_value", flat=True).get()
+    return last - size + 1, last
+
+
+class SRNumberAllocator:
+    """
+    Process-local cache of the current block of SR numbers.
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._day = None
+        self._next = 1
+        self._last = 0
+
+    def reset(self):
+        """
+        Forget the current block (a forked child must not reuse the parent's).
+        """
+        self._lock = threading.Lock()
+        self._day, self._next, self._last = None, 1, 0
+
+    def _take_local(self, day, count):
+        if self._day != day:
+            self._day, self._next, self._last = day, 1, 0
+        if self._last - self._next + 1 < count:
+            return None
+        first = self._next
+        self._next += count
+        return first
+
+    def _keep(self, day, first, last):
+        with self._lock:
+            if self._day != day or self._next > self._last:
+                self._day, self._next, self._last = day, first, last
+
+    def allocate(self, count=1, using="default"):
+        """
+        Return ``count`` unique SR numbers for today.
+        """
+        day = timezone.localdate()
+
+        with self._lock:
+            first = self._take_local(day, count)
+        if first is not None:
+            return [format_sr_number(day, n) for n in range(first, first + count)]
+
+        block_size = self.block_size or getattr(settings, "SR_NUMBER_BLOCK_SIZE", 50)
+        first, last = reserve_block(day, max(count, block_size), using)
+
+        spare = (first + count, last)
+        if spare[0] <= spare[1]:
+            if connections[using].in_atomic_block:
+                transaction.on_commit(lambda: self._keep(day, *spare), using=using)
+            else:
+                self._keep(day, *spare)
+
+        return [format_sr_number(day, n) for n in range(first, first + count)]
+
+
+allocator = SRNumberAllocator()
+
+# A forked worker starts with a copy of the parent's block; handing those
+# numbers out again in the child would duplicate them
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=allocator.reset)
+
+
+def next_sr_number(using="default"):
+    return allocator.allocate(1, using=using)[0]
+
+
+def allocate_sr_numbers(count, using="default"):
+    return allocator.allocate(count, using=using)
@@ -1,3 +1,1436 @@
-from django.test import TestCase
+import json
+import re
+from contextlib import contextmanager
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.users.models import UserProfile
+
+from .models import ServiceRequest, SRNature, SRStatus, SRType
+from . import counters, master_data
+from .bulk import bulk_create_service_requests
+from .search import search_service_requests
+from .sr_numbers import SRNumberAllocator
+from .validation import clean_sr_data
+
+
+class SRTestMixin:
+    """
+    Master data and a logged-in staff agent shared by the SR tests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.open_status = SRStatus.objects.create(code=SRStatus.STATUS_OPEN, name="Open")
+        cls.wip_status = SRStatus.objects.create(code=SRStatus.STATUS_WIP, name="Work In Progress")
+        cls.closed_status = SRStatus.objects.create(code=SRStatus.STATUS_CLOSED, name="Closed")
+        cls.nature = SRNature.objects.create(code="complaint", name="Complaint")
+        cls.sr_type = SRType.objects.create(code="card_issue", name="Card Issue")
+        cls.agent = User.objects.create_user("agent", password="secret", is_staff=True)
+        UserProfile.objects.create(user=cls.agent, phone="9999999999")
+        # on_commit never fires inside TestCase, so drop stale master data by hand
+        master_data.invalidate()
+
+    def setUp(self):
+        self.client.force_login(self.agent)
+
+    def make_sr(self, **kwargs):
+        values = {
+            "category": "parented",
+            "account_number": "1234567890",
+            "sr_nature": self.nature,
+            "sr_type": self.sr_type,
+            "subject": "Card blocked",
+            "description": "My debit card was blocked without notice.",
+            "email": "customer@example.com",
+            "phone": "+919999999999",
+            "created_by": self.agent,
+            "status": self.open_status,
+        }
+        values.update(kwargs)
+        return ServiceRequest.objects.create(**values)
+
+
+class ListSRQueryCountTests(SRTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(30):
+            self.make_sr(
+                subject=f"Request {i}",
+                status=self.closed_status if i % 3 else self.open_status,
+            )
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        # user, stats aggregate (also the paginator's count), page rows and
+        # profile; the session comes from the session cache and is not re-saved
+        for page_size in (5, 25):
+            with self.subTest(page_size=page_size):
+                with override_settings(ITEMS_PER_PAGE=page_size):
+                    with self.assertNumQueries(4):
+                        response = self.client.get(reverse("list_sr"))
+                self.assertEqual(len(response.context["page_obj"]), page_size)
+
+    def test_stats_are_computed_per_status(self):
+        response = self.client.get(reverse("list_sr"))
+        self.assertEqual(
+            response.context["stats"],
+            {"total": 30, "open": 10, "wip": 0, "closed": 20},
+        )
+
+    def test_rows_show_status_badges(self):
+        response = self.client.get(reverse("list_sr"))
+        self.assertContains(response, '<span class="badge bg-primary">Open</span>')
+        self.assertContains(response, '<span class="badge bg-secondary">Closed</span>')
+
+
+class KeysetPaginationTests(SRTestMixin, TestCase):
+
+    def test_cursor_round_trip_and_tampering(self):
+        from django.core import signing
+        from .pagination import CURSOR_SALT, decode_cursor, encode_cursor
+
+        sr = self.make_sr()
+        token = encode_cursor("-created_at", sr, "next")
+        payload = decode_cursor(token, "-created_at")
+        self.assertEqual((payload["id"], payload["d"]), (sr.id, "next"))
+        self.assertEqual(payload["v"], sr.created_at.isoformat())
+
+        self.assertIsNone(decode_cursor(token[:-2] + "xx", "-created_at"))
+        self.assertIsNone(decode_cursor(token, "sr_number"))
+        forged = signing.dumps({"s": "-created_at", "v": 0, "id": 1, "d": "next"}, salt="other")
+        self.assertIsNone(decode_cursor(forged, "-created_at"))
+        self.assertIsNone(decode_cursor(
+            signing.dumps({"s": "-created_at", "v": 0, "id": 1, "d": "up"}, salt=CURSOR_SALT),
+            "-created_at",
+        ))
+
+    def test_pages_forward_and_back_through_tied_sort_values(self):
+        from django.utils import timezone
+        from .pagination import keyset_paginate
+
+        ids = [self.make_sr().id for _ in range(7)]
+        # Every row ties on created_at: the id decides the order
+        ServiceRequest.objects.update(created_at=timezone.now())
+        srs = ServiceRequest.objects.all()
+        expected = sorted(ids, reverse=True)
+
+        pages, page = [], keyset_paginate(srs, "-created_at", None, 3)
+        pages.append([sr.id for sr in page])
+        while page.has_next:
+            page = keyset_paginate(srs, "-created_at", page.next_cursor, 3)
+            pages.append([sr.id for sr in page])
+        self.assertEqual(pages, [expected[:3], expected[3:6], expected[6:]])
+        self.assertFalse(page.has_next)
+
+        page = keyset_paginate(srs, "-created_at", page.prev_cursor, 3)
+        self.assertEqual([sr.id for sr in page], expected[3:6])
+        page = keyset_paginate(srs, "-created_at", page.prev_cursor, 3)
+        self.assertEqual([sr.id for sr in page], expected[:3])
+        self.assertFalse(page.has_previous)
+
+    def test_approximate_count(self):
+        from .pagination import approximate_count
+
+        for _ in range(3):
+            self.make_sr()
+        self.make_sr(status=self.closed_status)
+        closed = ServiceRequest.objects.filter(status=self.closed_status)
+        if connection.vendor == "postgresql":
+            # Planner estimates: only their type and sign are predictable
+            self.assertGreaterEqual(approximate_count(closed), 0)
+        else:
+            # No planner statistics: an exact count
+            self.assertEqual(approximate_count(closed), 1)
+            self.assertEqual(approximate_count(ServiceRequest.objects.all()), 4)
+
+    @override_settings(SR_LIST_PAGINATION="keyset", ITEMS_PER_PAGE=2)
+    def test_keyset_list_stats_skip_the_aggregate(self):
+        for _ in range(3):
+            self.make_sr()
+        self.make_sr(status=self.closed_status)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("list_sr"))
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT(" in q["sql"]])
+        self.assertEqual(response.context["stats"], {"total": 4, "open": 3, "wip": 0, "closed": 1})
+        self.assertEqual(response.context["total_estimate"], 4)
+
+        response = self.client.get(reverse("list_sr"), {"cursor": response.context["page_obj"].next_cursor})
+        self.assertEqual(len(response.context["page_obj"]), 2)
+
+
+class SearchTests(SRTestMixin, TestCase):
+    """
+    Runs against the FTS5 table on SQLite and the tsvector table on PostgreSQL.
+    """
+
+    def search(self, query):
+        return list(
+            search_service_requests(ServiceRequest.objects.all(), query).values_list("id", flat=True)
+        )
+
+    def test_prefix_number_and_comment_matches(self):
+        from .actions import add_comment
+        from .search import search_backend
+
+        self.assertIsNotNone(search_backend())
+        card = self.make_sr()
+        loan = self.make_sr(subject="Loan statement", description="Statement for March is missing.")
+
+        self.assertEqual(self.search("bloc"), [card.id])
+        self.assertEqual(self.search("statem marc"), [loan.id])
+        self.assertEqual(self.search(loan.sr_number), [loan.id])
+        # An SR number prefix matches every SR sharing it
+        self.assertIn(card.id, self.search(card.sr_number[:-1]))
+
+        self.assertEqual(self.search("refund"), [])
+        add_comment(loan, self.agent, "Refund processed")
+        self.assertEqual(self.search("refund"), [loan.id])
+
+    def test_deleted_sr_leaves_the_index(self):
+        from .search import FTS_TABLE, PG_TABLE, search_backend
+
+        sr = self.make_sr()
+        self.assertEqual(self.search("blocked"), [sr.id])
+        sr.delete()
+
+        table = PG_TABLE if search_backend() == "postgresql" else FTS_TABLE
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(self.search("blocked"), [])
+
+
+class CounterTests(SRTestMixin, TestCase):
+
+    def assertCounters(self, **expected):
+        # Keyword names are "total", a status code or a category
+        def key(name):
+            if name == "total":
+                return counters.TOTAL_KEY
+            if name in ("parented", "unparented"):
+                return counters.category_key(name)
+            return counters.status_key(name)
+
+        values = counters.read_counters()
+        self.assertEqual({name: values.get(key(name), 0) for name in expected}, expected)
+
+    def test_counters_follow_create_change_and_delete(self):
+        sr = self.make_sr()
+        self.make_sr(category="unparented")
+        self.assertCounters(total=2, open=2, closed=0, parented=1, unparented=1)
+
+        sr.status = self.closed_status
+        sr.save()
+        self.assertCounters(total=2, open=1, closed=1)
+
+        sr.category = "unparented"
+        sr.save()
+        self.assertCounters(parented=0, unparented=2)
+
+        sr.delete()
+        self.assertCounters(total=1, open=1, closed=0, unparented=1)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_reconcile_repairs_drift(self):
+        from .models import SRCounter
+
+        self.make_sr()
+        SRCounter.objects.filter(key=counters.TOTAL_KEY).update(value=7)
+        SRCounter.objects.filter(key=counters.status_key(SRStatus.STATUS_OPEN)).delete()
+
+        drift = counters.reconcile()
+        self.assertEqual(drift[counters.TOTAL_KEY], (7, 1))
+        self.assertEqual(drift[counters.status_key(SRStatus.STATUS_OPEN)], (None, 1))
+        self.assertCounters(total=1, open=1)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_racing_transitions_start_from_the_committed_status(self):
+        from django.utils import timezone
+        from . import assignment
+        from .models import SRDailyStat
+        from .rollups import compute_rollup
+
+        sr = self.make_sr(assigned_to=self.agent)
+        # Two requests load the same open SR; the comment moves it to WIP and
+        # commits before the close, which still holds "open" in memory
+        commented, closing = ServiceRequest.objects.get(id=sr.id), ServiceRequest.objects.get(id=sr.id)
+        commented.status = self.wip_status
+        commented.save()
+
+        closing.status = self.closed_status
+        closing.closed_at = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            closing.save()
+        self.assertCounters(total=1, open=0, wip=0, closed=1)
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(assignment.reconcile(), {})
+        stored = {
+            (row.day, row.metric, row.dimension): row.count
+            for row in SRDailyStat.objects.all() if row.count
+        }
+        self.assertEqual(stored, {key: n for key, n in compute_rollup().items() if n})
+        if connection.features.has_select_for_update:
+            # The previous status is read with the SR row locked
+            self.assertTrue(any("FOR UPDATE" in query["sql"] for query in queries))
+
+
+class RollupTests(SRTestMixin, TestCase):
+
+    def closed_on(self, day):
+        from .models import SRDailyStat
+        row = SRDailyStat.objects.filter(day=day, metric=SRDailyStat.METRIC_CLOSED).first()
+        return row.count if row else 0
+
+    def test_buckets_split_on_day_week_and_month_boundaries(self):
+        from datetime import date, timedelta
+        from .models import SRDailyStat
+        from .rollups import _bucket_trend
+
+        created = SRDailyStat.METRIC_CREATED
+        # Sunday 31 May / Monday 1 June 2026
+        rows = [(date(2026, 5, 31), created, 2), (date(2026, 6, 1), created, 3)]
+
+        daily = _bucket_trend(rows, 7, date(2026, 5, 26), date(2026, 6, 1))
+        self.assertEqual([item["count"] for item in daily], [0, 0, 0, 0, 0, 2, 3])
+        self.assertEqual(daily[-1]["label"], "Mon")
+
+        weekly = _bucket_trend(rows, 90, date(2026, 6, 1) - timedelta(days=89), date(2026, 6, 1))
+        self.assertEqual([item["count"] for item in weekly[-2:]], [2, 3])
+        self.assertEqual(weekly[-1]["label"], "01 Jun")
+
+        monthly = _bucket_trend(rows, 365, date(2025, 6, 2), date(2026, 6, 1))
+        self.assertEqual([(item["label"], item["count"]) for item in monthly[-2:]], [("May 26", 2), ("Jun 26", 3)])
+        self.assertEqual(monthly[0]["label"], "Jun 25")
+
+    def test_reopen_takes_the_sr_off_its_closed_day(self):
+        from django.utils import timezone
+        from .actions import close_service_request
+        from .models import SRDailyStat
+        from .rollups import compute_rollup
+
+        sr = self.make_sr()
+        close_service_request(sr, self.agent)
+        closed_day = timezone.localdate(sr.closed_at)
+        self.assertEqual(self.closed_on(closed_day), 1)
+
+        sr = ServiceRequest.objects.get(id=sr.id)
+        sr.status = self.wip_status
+        sr.closed_at = None
+        sr.save()
+        self.assertEqual(self.closed_on(closed_day), 0)
+
+        stored = {
+            (row.day, row.metric, row.dimension): row.count
+            for row in SRDailyStat.objects.all() if row.count
+        }
+        self.assertEqual(stored, {key: n for key, n in compute_rollup().items() if n})
+
+    def test_migration_backfills_existing_srs(self):
+        from importlib import import_module
+        from types import SimpleNamespace
+        from django.apps import apps
+        from .actions import close_service_request
+        from .models import SRDailyStat
+        from .rollups import compute_rollup
+
+        close_service_request(self.make_sr(), self.agent)
+        self.make_sr()
+        SRDailyStat.objects.all().delete()
+
+        migration = import_module("apps.service_request.migrations.0004_sr_daily_stat")
+        migration.seed_daily_stats(apps, SimpleNamespace(connection=connection))
+        stored = {(row.day, row.metric, row.dimension): row.count for row in SRDailyStat.objects.all()}
+        self.assertEqual(stored, dict(compute_rollup()))
+
+
+class SRNumberAllocatorTests(TestCase):
+
+    def test_workers_never_hand_out_the_same_number(self):
+        # Two allocators stand in for two worker processes
+        first, second = SRNumberAllocator(block_size=5), SRNumberAllocator(block_size=5)
+        numbers = []
+        for _ in range(12):
+            with self.captureOnCommitCallbacks(execute=True):
+                numbers += first.allocate() + second.allocate()
+        numbers += first.allocate(7) + second.allocate(3)
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+    def test_block_from_rolled_back_transaction_is_not_reused(self):
+        allocator = SRNumberAllocator(block_size=5)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                allocator.allocate()
+                raise RuntimeError
+
+        # The counter rolled back, so another worker now owns those numbers
+        other = SRNumberAllocator(block_size=5)
+        taken = other.allocate(5)
+        self.assertNotIn(allocator.allocate()[0], taken)
+
+
+class MasterDataCacheTests(SRTestMixin, TestCase):
+
+    MASTER_TABLES = ("sr_nature", "sr_type", "service_request_srstatus", "service_request_srtatdays")
+
+    def assertNoMasterQueries(self, queries):
+        for query in queries:
+            for table in self.MASTER_TABLES:
+                self.assertNotIn(f'FROM "{table}"', query["sql"])
+
+    def test_create_and_comment_do_not_query_master_tables(self):
+        master_data.warm()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("create_sr_submit"), {
+                "category": "unparented",
+                "sr_nature": self.nature.id,
+                "sr_type": self.sr_type.id,
+                "subject": "Card blocked",
+                "description": "My debit card was blocked without notice.",
+                "email": "customer@example.com",
+                "phone": "+919999999999",
+            })
+            sr = ServiceRequest.objects.get()
+            self.client.post(reverse("add_sr_comment", args=[sr.id]), {"comment": "Looking into it"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNoMasterQueries(ctx.captured_queries)
+        sr.refresh_from_db()
+        self.assertEqual(sr.status_id, self.wip_status.id)
+
+    def test_saving_master_row_invalidates_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nature.name = "Grievance"
+            self.nature.save()
+        self.assertEqual(master_data.get_nature(self.nature.id).name, "Grievance")
+
+
+class BulkCreateTests(SRTestMixin, TestCase):
+
+    def test_bulk_create_keeps_numbers_and_counters_in_step(self):
+        self.make_sr()
+        cleaned, errors = clean_sr_data({
+            "category": "unparented",
+            "sr_nature": "complaint",
+            "sr_type": str(self.sr_type.id),
+            "subject": "Card blocked",
+            "description": "My debit card was blocked without notice.",
+            "email": "customer@example.com",
+            "phone": "+919999999999",
+        })
+        self.assertEqual(errors, {})
+        self.assertEqual(cleaned["sr_nature"], self.nature)
+
+        cleaned.update(status=self.open_status, created_by=self.agent)
+        created = bulk_create_service_requests(
+            [ServiceRequest(**cleaned) for _ in range(5)], batch_size=2
+        )
+
+        self.assertTrue(all(sr.pk for sr in created))
+        self.assertEqual(ServiceRequest.objects.values("sr_number").distinct().count(), 6)
+        totals = counters.read_counters()
+        self.assertEqual(totals[counters.TOTAL_KEY], 6)
+        self.assertEqual(totals[counters.status_key(SRStatus.STATUS_OPEN)], 6)
+        self.assertEqual(
+            search_service_requests(ServiceRequest.objects.all(), "blocked").count(), 6
+        )
+
+    def test_invalid_rows_are_rejected_with_form_messages(self):
+        _, errors = clean_sr_data({"category": "parented", "sr_nature": "missing"})
+        self.assertEqual(errors["account_number"], "Account number is required for Parented SR")
+        self.assertEqual(errors["sr_nature"], "Please select a valid SR nature")
+        self.assertEqual(errors["sr_type"], "Please select SR type")
+
+
+class ImportSRsTests(SRTestMixin, TestCase):
+
+    def test_import_resumes_from_checkpoint_and_writes_rejects(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source, rejects, checkpoint = (
+            os.path.join(directory.name, name) for name in ("srs.jsonl", "rejects.jsonl", "checkpoint.json")
+        )
+        row = {
+            "category": "unparented", "sr_nature": "complaint", "sr_type": "card_issue",
+            "description": "My debit card was blocked without notice.",
+            "email": "customer@example.com", "phone": "+919999999999",
+        }
+
+        def write(subjects):
+            with open(source, "a") as fh:
+                for subject in subjects:
+                    fh.write(json.dumps(dict(row, subject=subject)) + "\n")
+
+        def run(**options):
+            call_command(
+                "import_srs", source, chunk_size=2, rejects=rejects, checkpoint=checkpoint,
+                created_by="agent", stdout=StringIO(), **options
+            )
+
+        write(["First import", "Bad", "Second import"])
+        run()
+        self.assertEqual(ServiceRequest.objects.count(), 2)
+        with open(checkpoint) as fh:
+            self.assertEqual(json.load(fh)["row"], 3)
+
+        # Rows already imported are skipped, rejects are appended to
+        write(["Third import", "No"])
+        run(resume=True)
+        self.assertEqual(
+            sorted(ServiceRequest.objects.values_list("subject", flat=True)),
+            ["First import", "Second import", "Third import"],
+        )
+        self.assertEqual(counters.read_counters()[counters.TOTAL_KEY], 3)
+        with open(rejects) as fh:
+            rejected = [json.loads(line) for line in fh]
+        self.assertEqual([r["row_number"] for r in rejected], [2, 5])
+        self.assertEqual(rejected[0]["errors"], {"subject": "Subject must be at least 5 characters"})
+
+
+class ExportSRTests(SRTestMixin, TestCase):
+
+    def test_export_applies_list_filters(self):
+        self.make_sr(subject="Open one")
+        self.make_sr(subject="Closed one", status=self.closed_status)
+
+        response = self.client.get(reverse("export_sr"), {"format": "jsonl", "status": "CLOSED"})
+
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["subject"] for row in rows], ["Closed one"])
+
+    def test_csv_export_starts_with_header(self):
+        self.make_sr()
+        response = self.client.get(reverse("export_sr"))
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("sr_number,category"))
+        self.assertEqual(len(lines), 2)
+
+    def test_export_is_staff_only(self):
+        customer = User.objects.create_user("customer", password="secret")
+        self.client.force_login(customer)
+        response = self.client.get(reverse("export_sr"))
+        self.assertRedirects(response, reverse("list_sr"), fetch_redirect_response=False)
+
+
+class SRApiTests(SRTestMixin, TestCase):
+
+    def test_unauthenticated_requests_get_401(self):
+        self.client.logout()
+        response = self.client.get(reverse("api_sr_list"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_uses_form_validation(self):
+        response = self.client.post(
+            reverse("api_sr_list"),
+            {"category": "unparented", "sr_nature": "complaint", "sr_type": "card_issue",
+             "subject": "Card", "description": "My debit card was blocked without notice.",
+             "email": "customer@example.com", "phone": "+919999999999"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errors"], {"subject": "Subject must be at least 5 characters"})
+
+    def test_detail_answers_304_until_a_comment_is_added(self):
+        sr = self.make_sr()
+        url = reverse("api_sr_detail", args=[sr.id])
+        etag = self.client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Only updated_at is read for a 304 (other queries are session/auth)
+        sr_queries = [q["sql"] for q in ctx.captured_queries if "service_request" in q["sql"]]
+        self.assertEqual(len(sr_queries), 1)
+
+        self.client.post(
+            reverse("api_sr_comment", args=[sr.id]), {"comment": "Looking into it"},
+            content_type="application/json",
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], SRStatus.STATUS_WIP)
+        self.assertEqual(len(response.json()["comments"]), 1)
+
+    def test_list_answers_304_for_unchanged_results(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sr = self.make_sr()
+        url = reverse("api_sr_list")
+        response = self.client.get(url, {"status": "open"})
+        self.assertEqual(len(response.json()["results"]), 1)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"status": "open"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Counters and watermark only, never the SR table
+        self.assertFalse([q for q in ctx.captured_queries if ServiceRequest._meta.db_table in q["sql"]])
+
+        # Edits that leave every count alone still move the validator
+        with self.captureOnCommitCallbacks(execute=True):
+            sr.subject = "Card still blocked"
+            sr.save()
+        response = self.client.get(url, {"status": "open"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["subject"], "Card still blocked")
+
+    def test_token_callers_skip_csrf_and_session_callers_do_not(self):
+        from django.test import Client
+        from apps.users import tokens
+
+        key = tokens.issue(self.agent, "crm")
+        client = Client(enforce_csrf_checks=True)
+        sr = self.make_sr()
+        url = reverse("api_sr_comment", args=[sr.id])
+
+        response = client.post(
+            url, {"comment": "From the CRM"}, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Token {key}",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["user"], "agent")
+
+        response = client.get(reverse("api_sr_detail", args=[sr.id]), HTTP_AUTHORIZATION="Token wrong")
+        self.assertEqual(response.status_code, 401)
+
+        client.force_login(self.agent)
+        response = client.post(url, {"comment": "No CSRF token"}, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+
+class SeedSRsTests(SRTestMixin, TestCase):
+
+    def test_seeds_history_with_numbers_counters_and_comments(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import SRComment
+
+        call_command("seed_srs", srs=300, agents=3, days=30, chunk_size=100, stdout=StringIO())
+
+        srs = ServiceRequest.objects.all()
+        self.assertEqual(srs.count(), 300)
+        self.assertEqual(srs.values("sr_number").distinct().count(), 300)
+        self.assertLess(srs.order_by("created_at").first().created_at, timezone.now() - timedelta(days=7))
+        self.assertFalse(SRComment.objects.filter(service_request__status__code=SRStatus.STATUS_OPEN).exists())
+        self.assertEqual(counters.read_counters()["total"], 300)
+
+
+class SLATests(SRTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from .models import SRTATDays
+        SRTATDays.objects.create(sr_nature="complaint", sr_type="card_issue", tat_days=3)
+        master_data.invalidate()
+
+    def test_due_at_set_from_tat_on_create(self):
+        sr = self.make_sr()
+        self.assertIsNotNone(sr.tat_id)
+        self.assertAlmostEqual((sr.due_at - sr.created_at).total_seconds(), 3 * 86400, delta=5)
+
+    def test_scan_marks_each_breach_once_and_only_looks_past_the_watermark(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import sla
+        from .models import SRComment
+
+        overdue, closed = self.make_sr(), self.make_sr(status=self.closed_status)
+        ServiceRequest.objects.filter(id__in=[overdue.id, closed.id]).update(
+            due_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(sla.scan_breaches()[2], 1)
+        self.assertEqual(sla.scan_breaches()[2], 0)
+        self.assertEqual(SRComment.objects.filter(service_request=overdue, is_internal=True).count(), 1)
+        # The bulk-created comment is counted and searchable like any other
+        overdue.refresh_from_db()
+        self.assertEqual(overdue.comment_count, 1)
+        self.assertEqual(
+            list(search_service_requests(ServiceRequest.objects.all(), "breached").values_list("id", flat=True)),
+            [overdue.id],
+        )
+
+        # Deadlines before the watermark are only seen by a full scan
+        late = self.make_sr()
+        ServiceRequest.objects.filter(id=late.id).update(due_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(sla.scan_breaches()[2], 0)
+        self.assertEqual(sla.scan_breaches(full=True)[2], 1)
+
+
+class WorkQueueTests(SRTestMixin, TestCase):
+
+    def test_claims_earliest_due_once_then_reports_empty(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        later, sooner = self.make_sr(), self.make_sr()
+        ServiceRequest.objects.filter(id=later.id).update(due_at=timezone.now() + timedelta(days=2))
+        ServiceRequest.objects.filter(id=sooner.id).update(due_at=timezone.now() + timedelta(days=1))
+        self.make_sr(assigned_to=self.agent)
+
+        url = reverse("api_sr_claim")
+        first = self.client.post(url, {}, content_type="application/json")
+        second = self.client.post(url, {"order": "age"}, content_type="application/json")
+        self.assertEqual([first.json()["id"], second.json()["id"]], [sooner.id, later.id])
+        self.assertEqual(second.json()["assigned_to"], "agent")
+        self.assertEqual(self.client.post(url).status_code, 204)
+
+
+    def test_queue_page_counts_unassigned_up_to_a_cap(self):
+        from . import work_queue
+
+        self.make_sr(), self.make_sr(), self.make_sr(assigned_to=self.agent)
+        response = self.client.get(reverse("work_queue"))
+        self.assertEqual((response.context["unassigned_count"], response.context["more_unassigned"]), (2, False))
+        self.assertEqual(work_queue.unassigned_count(cap=1), (1, True))
+        self.assertEqual(work_queue.unassigned_count(cap=2), (2, False))
+
+
+class AssignmentTests(SRTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from .models import AgentLoad
+        self.busy = User.objects.create_user("busy", is_staff=True)
+        self.idle = User.objects.create_user("idle", is_staff=True)
+        self.customer = User.objects.create_user("customer")
+        self.load = lambda user: AgentLoad.objects.get(user=user).open_count
+        for _ in range(2):
+            self.make_sr(assigned_to=self.busy)
+
+    def test_new_sr_goes_to_least_loaded_agent_and_load_follows(self):
+        from . import assignment
+
+        with transaction.atomic():
+            sr = self.make_sr(assigned_to_id=assignment.assignee_for(self.customer, self.sr_type.id))
+        self.assertIn(sr.assigned_to, [self.agent, self.idle])
+        self.assertEqual(self.load(sr.assigned_to), 1)
+
+        self.client.post(reverse("close_sr", args=[sr.id]))
+        self.assertEqual(self.load(sr.assigned_to), 0)
+        self.assertEqual(assignment.reconcile(), {})
+
+    def test_reassign_from_spreads_an_agents_work(self):
+        from . import assignment
+
+        moved = assignment.reassign_from([self.busy.id])
+        self.assertEqual(sum(moved.values()), 2)
+        self.assertEqual(self.load(self.busy), 0)
+        self.assertEqual((self.load(self.agent), self.load(self.idle)), (1, 1))
+        self.assertEqual(assignment.reconcile(), {})
+
+    def test_reactivated_agent_accepts_new_srs_again(self):
+        from .models import AgentLoad
+
+        self.idle.is_active = False
+        self.idle.save()
+        self.assertFalse(AgentLoad.objects.get(user=self.idle).accepting)
+
+        self.idle.is_active = True
+        self.idle.save()
+        self.assertTrue(AgentLoad.objects.get(user=self.idle).accepting)
+
+    def test_saving_an_agent_keeps_them_out_of_rotation(self):
+        from . import assignment
+        from .models import AgentLoad
+
+        assignment.reassign_from([self.busy.id])
+        self.busy.first_name = "Busy"
+        self.busy.save()
+        self.assertFalse(AgentLoad.objects.get(user=self.busy).accepting)
+
+
+class CommentTimelineTests(SRTestMixin, TestCase):
+
+    def test_newest_page_then_older_pages_by_keyset(self):
+        from django.utils import timezone
+        from .models import SRComment
+        from .timeline import PAGE_SIZE
+
+        sr = self.make_sr()
+        for n in range(PAGE_SIZE + 5):
+            SRComment.objects.create(service_request=sr, user=self.agent, comment=f"c{n}")
+        # Same timestamp everywhere: the id breaks the tie
+        SRComment.objects.filter(service_request=sr).update(created_at=timezone.now())
+        sr.refresh_from_db()
+        self.assertEqual(sr.comment_count, PAGE_SIZE + 5)
+
+        response = self.client.get(reverse("view_sr", args=[sr.id]))
+        newest = [c.comment for c in response.context["comments"]]
+        self.assertEqual(newest, [f"c{n}" for n in range(5, PAGE_SIZE + 5)])
+        self.assertTrue(response.context["has_older"])
+
+        older = self.client.get(
+            reverse("sr_comment_page", args=[sr.id]),
+            {"before": response.context["comments"][0].id},
+        )
+        self.assertEqual([c.comment for c in older.context["comments"]], [f"c{n}" for n in range(5)])
+        self.assertFalse(older.context["has_older"])
+
+        SRComment.objects.filter(comment="c0").delete()
+        sr.refresh_from_db()
+        self.assertEqual(sr.comment_count, PAGE_SIZE + 4)
+
+    def test_internal_comments_are_staff_only(self):
+        from .models import SRComment
+        from .timeline import PAGE_SIZE
+
+        customer = User.objects.create_user("customer")
+        sr = self.make_sr(created_by=customer)
+        for n in range(PAGE_SIZE + 2):
+            SRComment.objects.create(
+                service_request=sr, user=self.agent, comment=f"c{n}", is_internal=n % 2 == 1
+            )
+        public = [f"c{n}" for n in range(0, PAGE_SIZE + 2, 2)]
+        url = reverse("view_sr", args=[sr.id])
+
+        # Staff see internal comments; the timeline fragment is cached per is_staff
+        self.assertContains(self.client.get(url), "c21</p>")
+
+        self.client.force_login(customer)
+        response = self.client.get(url)
+        self.assertNotContains(response, "c21</p>")
+        newest = [c.comment for c in response.context["comments"]]
+        self.assertEqual(newest, public)
+        self.assertFalse(response.context["has_older"])
+
+        older = self.client.get(
+            reverse("sr_comment_page", args=[sr.id]),
+            {"before": SRComment.objects.get(comment="c4").id},
+        )
+        self.assertEqual([c.comment for c in older.context["comments"]], ["c0", "c2"])
+
+
+class QueryPlanTests(SRTestMixin, TestCase):
+    """
+    EXPLAIN the list and dashboard queries and fail on a sequential scan of
+    the large tables. On PostgreSQL seq scans are disabled for the check, as
+    the planner would rightly prefer them on the tiny test tables.
+    """
+    LARGE_TABLES = (ServiceRequest._meta.db_table, "sr_daily_stat")
+
+    def assertIndexed(self, queryset):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        for table in self.LARGE_TABLES:
+            if connection.vendor == "postgresql":
+                self.assertNotIn(f"Seq Scan on {table}", plan)
+            else:
+                self.assertNotRegex(plan, rf"\bSCAN {table}\b(?! USING)")
+        return plan
+
+    def test_list_and_dashboard_queries_use_indexes(self):
+        from .filters import filter_service_requests
+        from .rollups import _trend_range, _trend_rows
+        from .sla import pending_statuses
+        from .views import _list_rows
+
+        srs, _, _ = filter_service_requests(ServiceRequest.objects.all(), {
+            "status": "open", "date_from": "2026-01-01", "date_to": "2026-01-31",
+        })
+        plan = self.assertIndexed(_list_rows(srs)[:15])
+        # The date range is part of the index condition, not a filter on top
+        self.assertRegex(plan, r"Index Cond: .*created_at >=|created_at>\?")
+        # Rows the list's stats aggregate reads
+        self.assertIndexed(srs.order_by().values("id"))
+
+        by_category, _, _ = filter_service_requests(ServiceRequest.objects.all(), {"category": "parented"})
+        self.assertIndexed(_list_rows(by_category)[:15])
+
+        self.assertIndexed(ServiceRequest.objects.filter(
+            assigned_to=self.agent, status_id__in=pending_statuses()
+        ))
+        self.assertIndexed(_trend_rows(*_trend_range(30)))
+
+    def test_search_reads_candidates_from_indexes(self):
+        from .search import search_service_requests
+
+        self.make_sr(description="card blocked at the ATM")
+        # Text and sr_number prefix candidates both come from an index, so
+        # the SR table is only reached by primary key
+        self.assertIndexed(search_service_requests(ServiceRequest.objects.all(), "card blocked")[:15])
+        self.assertIndexed(search_service_requests(ServiceRequest.objects.all(), "SR-2026")[:15])
+
+    def test_date_range_is_half_open_in_local_time(self):
+        from datetime import datetime
+        from django.utils import timezone
+        from .filters import filter_service_requests
+
+        inside, after = self.make_sr(), self.make_sr()
+        ServiceRequest.objects.filter(id=inside.id).update(
+            created_at=timezone.make_aware(datetime(2026, 1, 31, 23, 59))
+        )
+        ServiceRequest.objects.filter(id=after.id).update(
+            created_at=timezone.make_aware(datetime(2026, 2, 1, 0, 0))
+        )
+        srs, _, _ = filter_service_requests(
+            ServiceRequest.objects.all(), {"date_from": "2026-01-31", "date_to": "2026-01-31"}
+        )
+        self.assertEqual(list(srs.values_list("id", flat=True)), [inside.id])
+
+
+@skipUnless(connection.vendor == "postgresql", "SR partitioning is PostgreSQL only")
+class PartitioningTests(SRTestMixin, TestCase):
+
+    def test_convert_keeps_rows_and_date_bounded_queries_prune(self):
+        import re
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import partitioning
+        from .filters import filter_service_requests
+        from .views import _list_rows
+
+        if partitioning.is_partitioned():
+            self.skipTest("Converted by migration 0011 (SR_PARTITIONING on)")
+        old = self.make_sr()
+        old_at = timezone.now() - timedelta(days=62)
+        ServiceRequest.objects.filter(id=old.id).update(created_at=old_at)
+
+        self.assertEqual(partitioning.convert(months_ahead=1), 1)
+        self.assertIsNone(partitioning.convert())
+        new = self.make_sr()
+        self.assertGreater(new.id, old.id)
+        self.assertEqual(ServiceRequest.objects.count(), 2)
+
+        def scanned(queryset):
+            return set(re.findall(rf"on ({partitioning.TABLE}_\w+)", queryset.explain()))
+
+        this_month = partitioning.month_start(timezone.localdate())
+        srs, _, _ = filter_service_requests(ServiceRequest.objects.all(), {
+            "date_from": this_month.isoformat(), "date_to": timezone.localdate().isoformat(),
+        })
+        self.assertEqual(scanned(_list_rows(srs)[:15]), {partitioning.partition_name(this_month)})
+
+        # Rollup backfill / trend source: SRs created since a day
+        recent = scanned(ServiceRequest.objects.filter(created_at__gte=timezone.now() - timedelta(days=7)))
+        old_month = partitioning.month_start(timezone.localdate(old_at))
+        self.assertNotIn(partitioning.partition_name(old_month), recent)
+
+    def test_key_table_keeps_foreign_keys_and_global_sr_number_uniqueness(self):
+        from datetime import timedelta
+        from django.db import IntegrityError
+        from django.utils import timezone
+        from . import partitioning
+        from .actions import add_comment
+        from .models import SRComment
+        from .search import PG_TABLE
+
+        sr = self.make_sr()
+        add_comment(sr, self.agent, "Before the conversion")
+        partitioning.convert(months_ahead=1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conrelid::regclass::text FROM pg_constraint "
+                "WHERE confrelid = to_regclass(%s) ORDER BY 1",
+                [partitioning.KEY_TABLE],
+            )
+            self.assertEqual(
+                [row[0] for row in cursor.fetchall()], [SRComment._meta.db_table, PG_TABLE]
+            )
+
+        # sr_number stays unique across partitions
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.make_sr(sr_number=sr.sr_number, created_at=timezone.now() - timedelta(days=62))
+
+        def search_rows():
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT count(*) FROM {PG_TABLE} WHERE sr_id = %s", [sr.id])
+                return cursor.fetchone()[0]
+
+        # Moving to another partition is a delete and an insert: the key,
+        # the comment and the search row all stay
+        ServiceRequest.objects.filter(id=sr.id).update(created_at=timezone.now() - timedelta(days=62))
+        connection.check_constraints()
+        self.assertEqual((SRComment.objects.filter(service_request=sr).count(), search_rows()), (1, 1))
+
+        sr.delete()
+        connection.check_constraints()
+        self.assertEqual(search_rows(), 0)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {partitioning.KEY_TABLE}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class PartitioningDDLTests(TestCase):
+    """
+    The DDL rewrites convert() relies on, checked on every backend.
+    """
+
+    def test_unique_indexes_gain_the_partition_key(self):
+        from .partitioning import TABLE, _unique_with_key
+
+        self.assertEqual(
+            _unique_with_key(f"CREATE UNIQUE INDEX sr_number_key ON public.{TABLE} USING btree (sr_number)"),
+            f"CREATE UNIQUE INDEX sr_number_key ON public.{TABLE} USING btree (sr_number, created_at)",
+        )
+
+    def test_incoming_foreign_keys_move_to_the_key_table(self):
+        from .partitioning import KEY_TABLE, TABLE, _repoint
+
+        self.assertEqual(
+            _repoint(f"FOREIGN KEY (sr_id) REFERENCES {TABLE}(id) ON DELETE CASCADE"),
+            f"FOREIGN KEY (sr_id) REFERENCES {KEY_TABLE}(id) ON DELETE CASCADE",
+        )
+        self.assertEqual(
+            _repoint(f"FOREIGN KEY (number) REFERENCES {TABLE}(sr_number) DEFERRABLE INITIALLY DEFERRED"),
+            f"FOREIGN KEY (number) REFERENCES {KEY_TABLE}(sr_number) DEFERRABLE INITIALLY DEFERRED",
+        )
+        self.assertIsNone(_repoint(f"FOREIGN KEY (sr_id, day) REFERENCES {TABLE}(id, created_at)"))
+
+
+class ArchiveTests(SRTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        import tempfile
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_settings = override_settings(SR_ARCHIVE_DIR=directory.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+    def test_closed_srs_move_to_archive_and_stay_viewable(self):
+        from django.utils import timezone
+        from . import archive
+        from .actions import add_comment, close_service_request
+
+        old = self.make_sr()
+        add_comment(old, self.agent, "Refund issued")
+        close_service_request(old, self.agent)
+        still_open = self.make_sr()
+
+        self.assertEqual(archive.archive(before=timezone.now(), chunk_size=1), 1)
+        self.assertFalse(ServiceRequest.objects.filter(id=old.id).exists())
+        self.assertTrue(ServiceRequest.objects.filter(id=still_open.id).exists())
+
+        response = self.client.get(reverse("view_sr", args=[old.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["archived"])
+        self.assertEqual(response.context["sr"].sr_number, old.sr_number)
+        self.assertEqual([c.comment for c in response.context["comments"]], ["Refund issued"])
+        self.assertContains(response, "Refund issued")
+
+        by_number = self.client.get(reverse("view_sr_by_number", args=[old.sr_number]))
+        self.assertEqual(by_number.context["sr"].id, old.id)
+        self.assertRedirects(
+            self.client.get(reverse("view_sr_by_number", args=[still_open.sr_number])),
+            reverse("view_sr", args=[still_open.id]),
+        )
+
+    def test_archiving_leaves_the_dashboard_counters_alone(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .actions import add_comment, close_service_request
+
+        old = self.make_sr(category="unparented")
+        add_comment(old, self.agent, "Refund issued")
+        close_service_request(old, self.agent)
+        self.make_sr()
+        before = counters.read_counters()
+
+        call_command("archive_srs", days=0, stdout=StringIO())
+        self.assertFalse(ServiceRequest.objects.filter(id=old.id).exists())
+        # Only the archived counter moves
+        before[counters.ARCHIVED_KEY] = before.get(counters.ARCHIVED_KEY, 0) + 1
+        self.assertEqual(counters.read_counters(), before)
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(
+            list(search_service_requests(ServiceRequest.objects.all(), "refund").values_list("id", flat=True)),
+            [],
+        )
+
+    @override_settings(SR_LIST_PAGINATION="keyset")
+    def test_keyset_list_stats_count_live_srs_only(self):
+        from django.utils import timezone
+        from . import archive
+        from .actions import close_service_request
+
+        close_service_request(self.make_sr(), self.agent)
+        self.make_sr(status=self.closed_status)
+        self.make_sr()
+        archive.archive(before=timezone.now())
+
+        response = self.client.get(reverse("list_sr"))
+        self.assertEqual(response.context["stats"], {"total": 2, "open": 1, "wip": 0, "closed": 1})
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_rollup_backfill_keeps_archived_srs(self):
+        from django.utils import timezone
+        from . import archive, rollups
+        from .actions import close_service_request
+        from .models import SRDailyStat
+
+        def stored():
+            return {(row.day, row.metric, row.dimension): row.count for row in SRDailyStat.objects.all() if row.count}
+
+        close_service_request(self.make_sr(), self.agent)
+        self.make_sr()
+        before = stored()
+
+        archive.archive(before=timezone.now())
+        rollups.backfill()
+        self.assertEqual(stored(), before)
+        rollups.backfill(timezone.localdate())
+        self.assertEqual(stored(), before)
+
+    def test_api_detail_serves_archived_srs(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from django.utils import timezone
+        from . import archive
+        from .actions import add_comment, close_service_request
+
+        old = self.make_sr()
+        add_comment(old, self.agent, "Refund issued")
+        close_service_request(old, self.agent)
+        archive.archive(before=timezone.now())
+        url = reverse("api_sr_detail", args=[old.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["sr_number"], data["status"], data["archived"]), (old.sr_number, "closed", True))
+        self.assertEqual(data["created_by"], self.agent.username)
+        self.assertEqual([c["comment"] for c in data["comments"]], ["Refund issued"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(reverse("api_sr_detail", args=[old.id + 1000])).status_code, 404)
+
+        async_client = AsyncClient()
+        async_client.force_login(self.agent)
+
+        async def fetch():
+            return await async_client.get(url)
+
+        with async_views():
+            async_response = async_to_sync(fetch)()
+        self.assertEqual(async_response.json(), data)
+        self.assertEqual(async_response["ETag"], response["ETag"])
+
+
+class FragmentCacheTests(SRTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import caches
+        caches["fragments"].clear()
+
+    def test_unchanged_sr_renders_from_cache_until_commented(self):
+        from .actions import add_comment
+        from .models import SRComment
+
+        sr = self.make_sr()
+        add_comment(sr, self.agent, "First look")
+        url = reverse("view_sr", args=[sr.id])
+        comment_table = SRComment._meta.db_table
+
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "First look")
+        self.assertFalse([q for q in queries.captured_queries if comment_table in q["sql"]])
+
+        add_comment(sr, self.agent, "Second look")
+        self.assertContains(self.client.get(url), "Second look")
+
+    def test_master_data_rename_refreshes_cached_fragments(self):
+        sr = self.make_sr()
+        self.assertContains(self.client.get(reverse("view_sr", args=[sr.id])), "Card Issue")
+        self.assertContains(self.client.get(reverse("list_sr")), "Card Issue")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sr_type.name = "Debit Card"
+            self.sr_type.save()
+        self.assertContains(self.client.get(reverse("view_sr", args=[sr.id])), "Debit Card")
+        self.assertContains(self.client.get(reverse("list_sr")), "Debit Card")
+
+    def test_fragments_follow_the_snapshot_when_another_worker_changes_master_data(self):
+        from django.utils import timezone
+        from .models import SRType, SRWatermark
+
+        sr = self.make_sr()
+        url = reverse("view_sr", args=[sr.id])
+        self.assertContains(self.client.get(url), "Card Issue")
+        rendered_with = master_data.version()
+
+        # Renamed by another worker: the watermark moves, this worker's
+        # (process-local) cache and snapshot do not
+        SRType.objects.filter(id=self.sr_type.id).update(name="Debit Card")
+        SRWatermark.objects.update_or_create(
+            name="sr_master_data", defaults={"position": timezone.now()}
+        )
+        self.assertEqual(master_data.version(), rendered_with)
+
+        # Once the snapshot is reloaded the fragments are keyed anew
+        with override_settings(SR_MASTER_CACHE_MAX_AGE=0):
+            self.assertContains(self.client.get(url), "Debit Card")
+        self.assertNotEqual(master_data.version(), rendered_with)
+
+
+class DashboardCacheTests(SRTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_single_flight_with_stale_copy_and_invalidation_on_write(self):
+        from django.core.cache import cache
+        from . import dashboard_cache
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_sr()
+        self.assertEqual(dashboard_cache.dashboard_data(7)["counters"]["total"], 1)
+        with self.assertNumQueries(0):
+            dashboard_cache.dashboard_data(7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_sr()
+        # Another request is refreshing: the stale copy is served meanwhile
+        cache.add(dashboard_cache._lock_key(7), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard_cache.dashboard_data(7)["counters"]["total"], 1)
+
+        cache.delete(dashboard_cache._lock_key(7))
+        self.assertEqual(dashboard_cache.dashboard_data(7)["counters"]["total"], 2)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=60000)
+class RequestProfilingTests(SRTestMixin, TestCase):
+
+    def test_records_view_histogram_and_logs_slow_request(self):
+        from grievance_management import profiling
+
+        profiling.snapshot(reset=True)
+        # Every request counts as slow only here, where the log is captured
+        with override_settings(PROFILING_SLOW_MS=0):
+            with self.assertLogs("grievance_management.profiling", "WARNING") as logs:
+                self.client.get(reverse("list_sr"))
+
+        self.assertIn("list_sr", logs.output[0])
+        stats = self.client.get(reverse("ops_profile")).json()["views"]["list_sr"]
+        self.assertEqual(stats["count"], 1)
+        self.assertGreater(stats["avg_queries"], 0)
+
+    async def test_async_chain_is_not_adapted_and_counts_queries(self):
+        from asgiref.sync import sync_to_async
+        from django.core.handlers.asgi import ASGIHandler
+        from django.test import AsyncClient
+        from grievance_management import profiling
+
+        # No middleware forces the ASGI chain onto a worker thread (Django
+        # logs each adaptation under DEBUG)
+        with override_settings(DEBUG=True), self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler().load_middleware(is_async=True)
+
+        profiling.snapshot(reset=True)
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.agent)
+        response = await client.get(reverse("list_sr"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(profiling.snapshot()["views"]["list_sr"]["avg_queries"], 0)
+
+    def test_histograms_are_staff_only(self):
+        self.agent.is_staff = False
+        self.agent.save()
+        self.assertEqual(self.client.get(reverse("ops_profile")).status_code, 403)
+
+
+@contextmanager
+def async_views():
+    """
+    Route the read paths to their async twins, as ASYNC_VIEWS=True does at
+    URLconf import.
+    """
+    import importlib
+    import sys
+    from django.conf import settings
+    from django.urls import clear_url_caches
+
+    def reload_urls():
+        for name in ("apps.users.urls", "apps.service_request.urls", settings.ROOT_URLCONF):
+            importlib.reload(sys.modules[name])
+        clear_url_caches()
+
+    try:
+        with override_settings(ASYNC_VIEWS=True):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+class AsyncViewTests(SRTestMixin, TestCase):
+    """
+    Each async twin answers with what its sync view renders.
+    """
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import caches
+        from django.test import AsyncClient
+        from .actions import add_comment
+
+        caches["fragments"].clear()
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.agent)
+        self.sr = self.make_sr()
+        add_comment(self.sr, self.agent, "Looking into it")
+        self.make_sr(subject="Closed one", status=self.closed_status)
+
+    def get_both(self, url, data=None):
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+
+        async def fetch():
+            return await self.async_client.get(url, data)
+
+        sync_response = self.client.get(url, data)
+        with async_views():
+            async_response = async_to_sync(fetch)()
+            # resolver_match resolves lazily, so check it under the async URLconf
+            self.assertTrue(iscoroutinefunction(async_response.resolver_match.func))
+        self.assertFalse(iscoroutinefunction(sync_response.resolver_match.func))
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        return sync_response, async_response
+
+    def assertSameHTML(self, url, data=None):
+        def page(response):
+            return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b"", response.content)
+
+        sync_response, async_response = self.get_both(url, data)
+        self.assertEqual(page(async_response), page(sync_response))
+
+    def test_list_sr(self):
+        self.assertSameHTML(reverse("list_sr"))
+        self.assertSameHTML(reverse("list_sr"), {"status": SRStatus.STATUS_CLOSED})
+
+    def test_view_sr(self):
+        self.assertSameHTML(reverse("view_sr", args=[self.sr.id]))
+
+    def test_dashboard(self):
+        self.assertSameHTML(reverse("dashboard"))
+
+    def test_api_list_and_detail(self):
+        for url in (reverse("api_sr_list"), reverse("api_sr_detail", args=[self.sr.id])):
+            sync_response, async_response = self.get_both(url)
+            self.assertEqual(async_response.json(), sync_response.json())
+            self.assertEqual(async_response["ETag"], sync_response["ETag"])
+
+    def test_export_streams_through_an_async_iterator(self):
+        from asgiref.sync import async_to_sync
+
+        async def read(response):
+            return b"".join([chunk async for chunk in response])
+
+        sync_response, async_response = self.get_both(reverse("export_sr"), {"format": "jsonl"})
+        self.assertTrue(async_response.is_async)
+        self.assertEqual(async_to_sync(read)(async_response), b"".join(sync_response.streaming_content))
+
+
+class PooledBackendTests(SRTestMixin, TestCase):
+    """
+    The pooled backend's bookkeeping, against a mocked ConnectionPool so it
+    runs without a PostgreSQL server.
+    """
+
+    def setUp(self):
+        super().setUp()
+        from unittest import mock
+        from grievance_management.db.pooled_postgresql import base
+
+        self.base = base
+        # A fresh mock pool per ConnectionPool(...), and module state restored after
+        for patcher in (
+            mock.patch.object(base, "ConnectionPool", side_effect=lambda **kwargs: mock.MagicMock()),
+            mock.patch.dict(base._pools, clear=True),
+            mock.patch.object(base, "_inherited_pools", []),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pool_class = base.ConnectionPool
+
+    def wrapper(self, **settings):
+        values = {
+            "ENGINE": "grievance_management.db.pooled_postgresql", "NAME": "grievance",
+            "USER": "app", "PASSWORD": "", "HOST": "db", "PORT": "", "TIME_ZONE": None,
+            "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True, "AUTOCOMMIT": True,
+            "ATOMIC_REQUESTS": False, "OPTIONS": {"pool": {"max_size": 4}}, "TEST": {},
+        }
+        values.update(settings)
+        return self.base.DatabaseWrapper(values, alias="pooled")
+
+    def test_pool_is_built_once_per_database_and_resets_connections(self):
+        from django.core.exceptions import ImproperlyConfigured
+
+        wrapper = self.wrapper()
+        pool = wrapper.pool
+        self.assertIs(self.wrapper().pool, pool)
+
+        kwargs = self.pool_class.call_args.kwargs
+        self.assertEqual(kwargs["max_size"], 4)
+        self.assertIs(kwargs["reset"], self.base._reset_connection)
+        self.assertIs(kwargs["check"], self.pool_class.check_connection)
+        self.assertEqual(kwargs["kwargs"]["dbname"], "grievance")
+        self.assertNotIn("pool", kwargs["kwargs"])
+
+        # A new NAME (the test database) replaces the pool
+        self.assertIsNot(self.wrapper(NAME="test_grievance").pool, pool)
+        pool.close.assert_called_once_with()
+
+        self.base.close_pool("pooled")
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(CONN_MAX_AGE=60).pool
+
+    def test_returned_connections_are_discarded_and_go_back_to_the_pool(self):
+        from unittest import mock
+
+        raw = mock.Mock(autocommit=False)
+        self.base._reset_connection(raw)
+        self.assertTrue(raw.autocommit)
+        raw.execute.assert_called_once_with("DISCARD ALL")
+
+        wrapper = self.wrapper()
+        pool = wrapper.pool
+        pool.closed = False
+        wrapper.connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        self.assertIs(wrapper.connection, pool.getconn.return_value)
+        wrapper._close()
+        pool.putconn.assert_called_once_with(pool.getconn.return_value)
+
+    def test_forked_child_forgets_but_never_closes_parent_pools(self):
+        pool = self.wrapper().pool
+        self.base._forget_pools_after_fork()
+        self.assertIsNone(self.base.get_pool("pooled"))
+        self.assertIn(pool, self.base._inherited_pools)
+        pool.close.assert_not_called()
+
+    def test_pool_stats_and_metrics_endpoint(self):
+        from unittest import mock
+
+        wrapper = self.wrapper()
+        wrapper.pool.get_stats.return_value = {"pool_size": 5, "pool_available": 2, "requests_num": 9}
+        stats = wrapper.pool_stats()
+        self.assertEqual((stats["pool_in_use"], stats["requests_num"]), (3, 9))
+
+        with mock.patch.object(connection, "pool_stats", create=True, return_value=stats):
+            metrics = self.client.get(reverse("ops_db_pool")).json()
+        self.assertEqual(metrics["default"], {"pooled": True, **stats})
+
+        self.agent.is_staff = False
+        self.agent.save()
+        self.assertEqual(self.client.get(reverse("ops_db_pool")).status_code, 403)
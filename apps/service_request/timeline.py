@@ -0,0 +1,74 @@
+"""
+Comment timeline for the SR detail page.
+
+The page shows the newest ``PAGE_SIZE`` comments and loads older ones on
+demand, a page at a time, keyed on ``(created_at, id)`` of the oldest
+comment shown so far. Each page is one query over the
+``sr_comment_timeline_idx`` index with the authors joined in, so the cost
+of a page does not grow with the number of comments on the SR. The total
+comes from ``ServiceRequest.comment_count`` instead of a COUNT.
+
+Internal comments are staff only: pass ``include_internal=False`` for
+anyone else, on the first page and on every older page.
+"""
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .models import SRComment
+
+
+PAGE_SIZE = 20
+
+
+def page_queryset(sr_id, before=None, size=PAGE_SIZE, using="default", include_internal=True):
+    """
+    Up to ``size + 1`` comments of the SR, newest first, older than the
+    ``before`` comment when given. The extra row tells whether more remain.
+    """
+    comments = (
+        SRComment.objects.using(using)
+        .filter(service_request_id=sr_id)
+        .select_related("user")
+        .order_by("-created_at", "-id")
+    )
+    if not include_internal:
+        comments = comments.filter(is_internal=False)
+    if before is not None:
+        comments = comments.filter(
+            Q(created_at__lt=before.created_at) | Q(created_at=before.created_at, id__lt=before.id)
+        )
+    return comments[:size + 1]
+
+
+def split_page(rows, size=PAGE_SIZE):
+    """
+    (comments oldest first, whether older comments remain) from the rows
+    of ``page_queryset``.
+    """
+    return list(reversed(rows[:size])), len(rows) > size
+
+
+def comment_page(sr_id, before=None, size=PAGE_SIZE, using="default", include_internal=True):
+    return split_page(list(page_queryset(sr_id, before, size, using, include_internal)), size)
+
+
+class LazyPage:
+    """
+    A page of comments loaded on first access, so a timeline served from
+    the fragment cache never runs the query.
+    """
+
+    def __init__(self, load):
+        self._load = load
+
+    @cached_property
+    def _page(self):
+        return self._load()
+
+    @property
+    def comments(self):
+        return self._page[0]
+
+    @property
+    def has_older(self):
+        return self._page[1]
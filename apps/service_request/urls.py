@@ -1,13 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+
+
+def _view(sync_view, async_view):
+    # Read paths have async twins for ASGI workers (settings.ASYNC_VIEWS)
+    return async_view if settings.ASYNC_VIEWS else sync_view
 
 
 urlpatterns = [
     path("create/", views.create_sr_form, name="create_sr_form"),
     path("create/submit/", views.create_sr_submit, name="create_sr_submit"),
-    path("view/<int:sr_id>/", views.view_sr, name="view_sr"),
-    path("list_sr/", views.list_sr, name="list_sr"),
+    path("view/<int:sr_id>/", _view(views.view_sr, views.aview_sr), name="view_sr"),
+    path("view/number/<str:sr_number>/", views.view_sr_by_number, name="view_sr_by_number"),
+    path("list_sr/", _view(views.list_sr, views.alist_sr), name="list_sr"),
+    path("list_sr/export/", _view(views.export_sr, views.aexport_sr), name="export_sr"),
     path("view/<int:sr_id>/comment/", views.add_sr_comment, name="add_sr_comment"),
+    path("view/<int:sr_id>/comments/", views.sr_comment_page, name="sr_comment_page"),
     path("view/<int:sr_id>/close/", views.close_sr, name="close_sr"),
+    path("queue/", views.work_queue_view, name="work_queue"),
+    path("queue/claim/", views.claim_next_sr, name="claim_next_sr"),
+
+    # JSON API
+    path("api/srs/", _view(api.api_sr_list, api.aapi_sr_list), name="api_sr_list"),
+    path("api/srs/claim/", api.api_sr_claim, name="api_sr_claim"),
+    path("api/srs/<int:sr_id>/", _view(api.api_sr_detail, api.aapi_sr_detail), name="api_sr_detail"),
+    path("api/srs/<int:sr_id>/comments/", api.api_sr_comment, name="api_sr_comment"),
+    path("api/srs/<int:sr_id>/close/", api.api_sr_close, name="api_sr_close"),
 
 ]
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Validation rules for new Service Requests.
+
+Shared by the create form (create_sr_submit) and the bulk importer so both
+accept exactly the same input.
+"""
+from . import master_data
+
+
+FIELDS = (
+    "category", "account_number", "sr_nature", "sr_type", "subject",
+    "description", "email", "phone", "address",
+)
+
+
+def _resolve(value, by_id, by_code):
+    return by_id(value) or by_code(value)
+
+
+def clean_sr_data(data):
+    """
+    Validate raw SR input (a QueryDict or plain dict).
+
+    Returns ``(cleaned, errors)``. ``cleaned`` holds the stripped values with
+    ``sr_nature`` / ``sr_type`` resolved to model instances (by id or code)
+    from the master data cache; ``errors`` maps field name to message.
+    """
+    values = {field: str(data.get(field) or "").strip() for field in FIELDS}
+    errors = {}
+
+    category = values["category"]
+    if not category or category not in ("parented", "unparented"):
+        errors["category"] = "Please select a valid SR category"
+
+    if category == "parented" and not values["account_number"]:
+        errors["account_number"] = "Account number is required for Parented SR"
+
+    sr_nature = sr_type = None
+    if not values["sr_nature"]:
+        errors["sr_nature"] = "Please select SR nature"
+    else:
+        sr_nature = _resolve(values["sr_nature"], master_data.get_nature, master_data.get_nature_by_code)
+        if sr_nature is None:
+            errors["sr_nature"] = "Please select a valid SR nature"
+
+    if not values["sr_type"]:
+        errors["sr_type"] = "Please select SR type"
+    else:
+        sr_type = _resolve(values["sr_type"], master_data.get_type, master_data.get_type_by_code)
+        if sr_type is None:
+            errors["sr_type"] = "Please select a valid SR type"
+
+    if not values["subject"] or len(values["subject"]) < 5:
+        errors["subject"] = "Subject must be at least 5 characters"
+
+    if not values["description"] or len(values["description"]) < 20:
+        errors["description"] = "Description must be at least 20 characters"
+
+    if not values["email"]:
+        errors["email"] = "Email is required"
+
+    if not values["phone"]:
+        errors["phone"] = "Phone number is required"
+
+    cleaned = dict(values)
+    cleaned["account_number"] = values["account_number"] if category == "parented" else None
+    cleaned["sr_nature"] = sr_nature
+    cleaned["sr_type"] = sr_type
+    return cleaned, errors
@@ -4,17 +4,21 @@ from django.contrib import messages
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Q, Count
 from django.utils import timezone
-from datetime import datetime, timedelta
 from .models import ServiceRequest, SRComment, SRStatus
 from django.conf import settings
-from django.db import transaction
-from django.contrib.auth.decorators import login_required
+from django.db import connections, transaction
 from django.views.decorators.http import require_POST
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib import messages
-from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from apps.users.decorators import alogin_required
 
-from .models import ServiceRequest, SRNature, SRType, SRStatus
+from . import master_data
+from .actions import SRActionError, add_comment, close_service_request
+from .pagination import keyset_paginate, akeyset_paginate, approximate_count
+from .export import EXPORT_FORMATS, astream
+from .filters import VALID_SORTS, filter_service_requests
+from .validation import clean_sr_data
+from . import archive, assignment, counters, sla, timeline, work_queue
 
 
 
@@ -27,46 +31,12 @@ def create_sr_submit(request):
 
     context = {
         "form_data": request.POST,
-        "sr_natures": SRNature.objects.filter(is_active=True),
-        "sr_types": SRType.objects.filter(is_active=True),
+        "sr_natures": master_data.active_natures(),
+        "sr_types": master_data.active_types(),
     }
 
-    category = request.POST.get("category", "").strip()
-    account_number = request.POST.get("account_number", "").strip()
-    sr_nature_id = request.POST.get("sr_nature", "").strip()
-    sr_type_id = request.POST.get("sr_type", "").strip()
-    subject = request.POST.get("subject", "").strip()
-    description = request.POST.get("description", "").strip()
-    email = request.POST.get("email", "").strip()
-    phone = request.POST.get("phone", "").strip()
-    address = request.POST.get("address", "").strip()
-
-    errors = {}
-
-    # --- validation logic ---
-    if not category or category not in ("parented", "unparented"):
-        errors["category"] = "Please select a valid SR category"
-
-    if category == "parented" and not account_number:
-        errors["account_number"] = "Account number is required for Parented SR"
-
-    if not sr_nature_id:
-        errors["sr_nature"] = "Please select SR nature"
-
-    if not sr_type_id:
-        errors["sr_type"] = "Please select SR type"
-
-    if not subject or len(subject) < 5:
-        errors["subject"] = "Subject must be at least 5 characters"
-
-    if not description or len(description) < 20:
-        errors["description"] = "Description must be at least 20 characters"
-
-    if not email:
-        errors["email"] = "Email is required"
-
-    if not phone:
-        errors["phone"] = "Phone number is required"
+    # --- validation logic (shared with the bulk importer) ---
+    cleaned, errors = clean_sr_data(request.POST)
 
     if errors:
         context["errors"] = errors
@@ -75,22 +45,24 @@ def create_sr_submit(request):
     try:
         with transaction.atomic():
 
-            sr_nature = get_object_or_404(SRNature, id=sr_nature_id, is_active=True)
-            sr_type = get_object_or_404(SRType, id=sr_type_id, is_active=True)
-            open_status = get_object_or_404(SRStatus, id="1", is_active=True)
+            # Master rows come from the process-local cache, not the DB
+            open_status = master_data.get_status(SRStatus.STATUS_OPEN)
+            if not open_status:
+                raise Http404("SR master data not found")
 
             sr = ServiceRequest.objects.create(
-                category=category,
-                account_number=account_number if category == "parented" else None,
-                sr_nature=sr_nature,
-                sr_type=sr_type,
-                subject=subject,
-                description=description,
-                email=email,
-                phone=phone,
-                address=address,
+                category=cleaned["category"],
+                account_number=cleaned["account_number"],
+                sr_nature=cleaned["sr_nature"],
+                sr_type=cleaned["sr_type"],
+                subject=cleaned["subject"],
+                description=cleaned["description"],
+                email=cleaned["email"],
+                phone=cleaned["phone"],
+                address=cleaned["address"],
                 created_by=request.user,
-                assigned_to=request.user if request.user.is_staff else None,
+                # Agents keep what they create; the rest goes to the least-loaded agent
+                assigned_to_id=assignment.assignee_for(request.user, cleaned["sr_type"].id),
                 status= open_status,
             )
 
@@ -114,109 +86,300 @@ def create_sr_form(request):
     Display Create Service Request form (GET)
     """
     return render(request, "service_request/create_sr.html", {
-        "sr_natures": SRNature.objects.filter(is_active=True),
-        "sr_types": SRType.objects.filter(is_active=True),
+        "sr_natures": master_data.active_natures(),
+        "sr_types": master_data.active_types(),
     })
 
 
 
+def _list_stats():
+    # All four stats in a single conditional-aggregate query
+    stats = {'total': Count('id')}
+    for key in (SRStatus.STATUS_OPEN, SRStatus.STATUS_WIP, SRStatus.STATUS_CLOSED):
+        # status_id from the cached master data, so no join to the status table
+        status = master_data.get_status(key)
+        stats[key] = Count('id', filter=Q(status_id=status.id) if status else Q(status__code=key))
+    return stats
+
+
+def _estimated_stats(srs):
+    # Keyset pages must not pay for an aggregate over the whole filtered set:
+    # the unfiltered list reads the maintained counters, a filtered one the
+    # planner's row estimates
+    keys = (SRStatus.STATUS_OPEN, SRStatus.STATUS_WIP, SRStatus.STATUS_CLOSED)
+    if not srs.query.where:
+        values = counters.read_counters()
+        stats = {'total': values.get(counters.TOTAL_KEY, 0)}
+        for key in keys:
+            stats[key] = values.get(counters.status_key(key), 0)
+        # The counters include archived SRs (all closed), the list does not
+        archived = values.get(counters.ARCHIVED_KEY, 0)
+        stats['total'] -= archived
+        stats[SRStatus.STATUS_CLOSED] -= archived
+        return stats
+
+    if connections[srs.db].vendor != 'postgresql':
+        # No planner estimates; one aggregate beats four exact counts
+        return srs.order_by().aggregate(**_list_stats())
+
+    stats = {'total': approximate_count(srs)}
+    for key in keys:
+        status = master_data.get_status(key)
+        stats[key] = approximate_count(srs.filter(status_id=status.id)) if status else 0
+    return stats
+
+
+def _list_rows(srs):
+    # Rows only render the lookups below, never the large text columns
+    return srs.select_related(
+        'sr_type', 'sr_nature', 'status', 'created_by'
+    ).defer('description', 'address')
+
+
+def _list_context(request, page_obj, stats, filters, pagination_mode, total_estimate):
+    # Current filters as a query string, for building next/prev links
+    filter_query = request.GET.copy()
+    for key in ('page', 'cursor'):
+        filter_query.pop(key, None)
+
+    return {
+        'service_requests': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'pagination_mode': pagination_mode,
+        'total_estimate': total_estimate,
+        'filter_query': filter_query.urlencode(),
+        'stats': stats,
+        'search_query': filters['search'],
+        'filters': filters,
+        # Row fragments show nature / type / status names
+        'master_version': master_data.version(),
+    }
+
+
 @login_required
 def list_sr(request):
-    srs = ServiceRequest.objects.all()
-    search_query = request.GET.get('search', '').strip()
-    if search_query:
-        srs = srs.filter(
-            Q(sr_number__icontains=search_query) |
-            Q(subject__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
+    srs, filters, warnings = filter_service_requests(
+        ServiceRequest.objects.all(), request.GET
+    )
+    for warning in warnings:
+        messages.warning(request, warning)
 
-    category = request.GET.get('category', '').strip()
-    if category:
-        srs = srs.filter(category=category)
+    items_per_page = getattr(settings, 'ITEMS_PER_PAGE', 15)
+    pagination_mode = getattr(settings, 'SR_LIST_PAGINATION', 'offset')
+
+    if pagination_mode == 'keyset':
+        stats = _estimated_stats(srs)
+        srs = _list_rows(srs)
+        # Seek on (sort key, id) so deep pages cost the same as the first one
+        if filters['sort'] not in VALID_SORTS:
+            filters['sort'] = '-created_at'
+        page_obj = keyset_paginate(
+            srs, filters['sort'], request.GET.get('cursor'), items_per_page
+        )
+        total_estimate = stats['total']
+    else:
+        stats = srs.order_by().aggregate(**_list_stats())
+        srs = _list_rows(srs)
+        paginator = Paginator(srs, items_per_page)
+        # The total is already known from the stats query
+        paginator.count = stats['total']
+        page_number = request.GET.get('page', 1)
 
-    # FIX: Use status__code instead of status
-    status = request.GET.get('status', '').strip()
-    if status:
-        srs = srs.filter(status__code=status.upper())
+        try:
+            page_obj = paginator.get_page(page_number)
+        except (EmptyPage, PageNotAnInteger):
+            page_obj = paginator.get_page(1)
+        total_estimate = None
 
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
+    context = _list_context(
+        request, page_obj, stats, filters, pagination_mode, total_estimate
+    )
+    return render(request, 'service_request/list_sr.html', context)
 
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            srs = srs.filter(created_at__date__gte=date_from_obj.date())
-        except ValueError:
-            messages.warning(request, 'Invalid start date format')
 
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-            srs = srs.filter(created_at__date__lte=date_to_obj.date())
-        except ValueError:
-            messages.warning(request, 'Invalid end date format')
-
-    sort_by = request.GET.get('sort', '-created_at')
-    valid_sorts = [
-        'sr_number', '-sr_number',
-        'created_at', '-created_at',
-        'status', '-status',
-    ]
-    if sort_by in valid_sorts:
-        srs = srs.order_by(sort_by)
-
-    # FIX: Use status__code for filtering
-    stats = {
-        'total': srs.count(),
-        'open': srs.filter(status__code='OPEN').count(),
-        'wip': srs.filter(status__code='WIP').count(),
-        'closed': srs.filter(status__code='CLOSED').count(),
-    }
+@alogin_required
+async def alist_sr(request):
+    """
+    list_sr for ASGI workers: queries go through the async ORM.
+    """
+    # Search backend detection may introspect the DB, so build the queryset in a thread
+    srs, filters, warnings = await sync_to_async(filter_service_requests)(
+        ServiceRequest.objects.all(), request.GET
+    )
+    for warning in warnings:
+        messages.warning(request, warning)
 
+    await master_data.aload()
     items_per_page = getattr(settings, 'ITEMS_PER_PAGE', 15)
-    paginator = Paginator(srs, items_per_page)
-    page_number = request.GET.get('page', 1)
-    
-    try:
-        page_obj = paginator.get_page(page_number)
-    except (EmptyPage, PageNotAnInteger):
-        page_obj = paginator.get_page(1)
+    pagination_mode = getattr(settings, 'SR_LIST_PAGINATION', 'offset')
+
+    if pagination_mode == 'keyset':
+        stats = await sync_to_async(_estimated_stats)(srs)
+        srs = _list_rows(srs)
+        if filters['sort'] not in VALID_SORTS:
+            filters['sort'] = '-created_at'
+        page_obj = await akeyset_paginate(
+            srs, filters['sort'], request.GET.get('cursor'), items_per_page
+        )
+        total_estimate = stats['total']
+    else:
+        stats = await srs.order_by().aaggregate(**_list_stats())
+        srs = _list_rows(srs)
+        paginator = Paginator(srs, items_per_page)
+        # The total is already known from the stats query
+        paginator.count = stats['total']
+        page_obj = paginator.get_page(request.GET.get('page', 1))
+        page_obj.object_list = [sr async for sr in page_obj.object_list]
+        total_estimate = None
+
+    context = _list_context(
+        request, page_obj, stats, filters, pagination_mode, total_estimate
+    )
+    # Templates may still touch lazy relations (request.user.profile)
+    return await sync_to_async(render)(request, 'service_request/list_sr.html', context)
 
-    context = {
-        'service_requests': page_obj,
-        'page_obj': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
-        'stats': stats,
-        'search_query': search_query,
-        'filters': {
-            'category': category,
-            'status': status,
-            'date_from': date_from,
-            'date_to': date_to,
-            'sort': sort_by,
-        }
-    }
 
-    return render(request, 'service_request/list_sr.html', context)
+@login_required
+def export_sr(request):
+    """
+    Stream the SR list, with the list_sr filters applied, as CSV or JSONL (agents only)
+    """
+    return _export_response(request)
+
+
+@alogin_required
+async def aexport_sr(request):
+    """
+    export_sr for ASGI workers: the rows stream through an async iterator,
+    which the ASGI handler sends as it goes instead of collecting them.
+    """
+    # Search backend detection may introspect the DB, so set up in a thread
+    return await sync_to_async(_export_response)(request, astream)
+
+
+def _export_response(request, wrap=None):
+    if not request.user.is_staff:
+        messages.error(request, "You don't have permission to export service requests.")
+        return redirect('list_sr')
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        messages.error(request, 'Invalid export format')
+        return redirect('list_sr')
+
+    srs, _, _ = filter_service_requests(ServiceRequest.objects.all(), request.GET)
+    content_type, stream = EXPORT_FORMATS[export_format]
+    content = stream(srs)
+
+    response = StreamingHttpResponse(wrap(content) if wrap else content, content_type=content_type)
+    filename = f"service_requests_{timezone.localtime():%Y%m%d_%H%M%S}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _detail_queryset():
+    # Everything view_sr.html shows, in one query
+    return ServiceRequest.objects.select_related(
+        "sr_nature", "sr_type", "status", "created_by", "assigned_to", "closed_by"
+    )
+
 
 @login_required
 def view_sr(request, sr_id):
     """
     View detailed information of a specific Service Request
     """
-    sr = get_object_or_404(ServiceRequest, id=sr_id)
+    sr = _detail_queryset().filter(id=sr_id).first()
+    if sr is None:
+        # Old closed SRs are served from the cold archive
+        return _render_archived(request, archive.load(sr_id=sr_id))
 
-    comments = sr.comments.all().order_by("created_at")
+    context = {
+        "sr": sr,
+        "master_version": master_data.version(),
+        # Newest page only, loaded only if the timeline fragment is not
+        # cached; older pages come from sr_comment_page
+        "comment_page": timeline.LazyPage(
+            lambda: timeline.comment_page(sr.id, include_internal=request.user.is_staff)
+        ),
+    }
+
+    return render(request, "service_request/view_sr.html", context)
+
+
+@alogin_required
+async def aview_sr(request, sr_id):
+    """
+    view_sr for ASGI workers.
+    """
+    try:
+        sr = await _detail_queryset().aget(id=sr_id)
+    except ServiceRequest.DoesNotExist:
+        archived = await sync_to_async(archive.load)(sr_id=sr_id)
+        return await sync_to_async(_render_archived)(request, archived)
 
+    await master_data.aload()
     context = {
         "sr": sr,
-        "comments": comments,
+        "master_version": master_data.version(),
+        # Loaded (if the fragment cache misses) in render's thread
+        "comment_page": timeline.LazyPage(
+            lambda: timeline.comment_page(sr.id, include_internal=request.user.is_staff)
+        ),
     }
 
+    return await sync_to_async(render)(request, "service_request/view_sr.html", context)
+
+
+def _render_archived(request, archived):
+    if archived is None:
+        raise Http404("No ServiceRequest matches the given query.")
+    sr, comments = archived
+    if not request.user.is_staff:
+        comments = [comment for comment in comments if not comment.is_internal]
+    context = {
+        "sr": sr,
+        "master_version": master_data.version(),
+        "comment_page": timeline.LazyPage(lambda: (comments, False)),
+        "archived": True,
+    }
     return render(request, "service_request/view_sr.html", context)
 
 
+@login_required
+def view_sr_by_number(request, sr_number):
+    """
+    Look up a Service Request by its number, live or archived
+    """
+    sr_id = ServiceRequest.objects.filter(sr_number=sr_number).values_list("id", flat=True).first()
+    if sr_id is not None:
+        return redirect("view_sr", sr_id=sr_id)
+    return _render_archived(request, archive.load(sr_number=sr_number))
+
+
+@login_required
+def sr_comment_page(request, sr_id):
+    """
+    HTML fragment with the page of comments before ?before=<comment id>,
+    for the "older comments" link on view_sr
+    """
+    before = None
+    if request.GET.get("before", "").isdigit():
+        before = get_object_or_404(
+            SRComment.objects.only("id", "created_at"),
+            id=int(request.GET["before"]), service_request_id=sr_id,
+        )
+    comments, has_older = timeline.comment_page(sr_id, before, include_internal=request.user.is_staff)
+
+    context = {
+        "sr_id": sr_id,
+        "comments": comments,
+        "has_older": has_older,
+    }
+
+    return render(request, "service_request/_comment_page.html", context)
+
 
 @login_required
 def update_sr_status(request, sr_id):
@@ -286,31 +449,12 @@ def add_sr_comment(request, sr_id):
 
     sr = get_object_or_404(ServiceRequest, id=sr_id)
 
-    # Block commenting on CLOSED SR
-    if sr.status and sr.status_id == "3":
-        messages.error(request, "This Service Request is already closed.")
-        return redirect("view_sr", sr_id=sr.id)
-
-    # Get & validate comment
-    comment_text = request.POST.get("comment", "").strip()
-    if not comment_text:
-        messages.error(request, "Comment cannot be empty.")
+    try:
+        add_comment(sr, request.user, request.POST.get("comment", ""))
+    except SRActionError as e:
+        messages.error(request, str(e))
         return redirect("view_sr", sr_id=sr.id)
 
-    # Create comment
-    SRComment.objects.create(
-        service_request=sr,
-        user=request.user,
-        comment=comment_text,
-    )
-
-    # Auto status change: open → wip
-    if sr.status and sr.status.code == "open":
-        wip_status = SRStatus.objects.filter(code="wip").first()
-        if wip_status:
-            sr.status = wip_status
-            sr.save(update_fields=["status", "updated_at"])
-
     messages.success(request, "Comment added successfully.")
     return redirect("view_sr", sr_id=sr.id)
 
@@ -326,19 +470,65 @@ def close_sr(request, sr_id):
     
     sr = get_object_or_404(ServiceRequest, id=sr_id)
     
-    # Check if SR is already closed
-    if sr.status and sr.status.code == "closed":
-        messages.warning(request, "This Service Request is already closed.")
+    try:
+        close_service_request(sr, request.user)
+    except SRActionError as e:
+        messages.warning(request, str(e))
         return redirect('view_sr', sr_id=sr_id)
-    
-    # Get closed status
-    closed_status = get_object_or_404(SRStatus, code="closed", is_active=True)
-    
-    # Update SR status
-    sr.status = closed_status
-    sr.closed_by = request.user
-    sr.closed_at = timezone.now()
-    sr.save(update_fields=["status", "closed_by", "closed_at", "updated_at"])
-    
+
     messages.success(request, f"Service Request {sr.sr_number} has been closed successfully.")
-    return redirect('view_sr', sr_id=sr_id)
\ No newline at end of file
+    return redirect('view_sr', sr_id=sr_id)
+
+@login_required
+def work_queue_view(request):
+    """
+    An agent's open work plus the head of the unassigned queue (agents only)
+    """
+    if not request.user.is_staff:
+        messages.error(request, "You don't have permission to view the work queue.")
+        return redirect('list_sr')
+
+    order = request.GET.get('order', work_queue.DEFAULT_ORDER)
+    if order not in work_queue.QUEUE_ORDERS:
+        order = work_queue.DEFAULT_ORDER
+
+    my_srs = _list_rows(
+        ServiceRequest.objects.filter(
+            assigned_to=request.user,
+            status_id__in=sla.pending_statuses(),
+        )
+    ).order_by(*work_queue.QUEUE_ORDERS['due'])
+
+    unassigned_count, more_unassigned = work_queue.unassigned_count()
+    context = {
+        "my_srs": my_srs[:100],
+        "next_srs": _list_rows(work_queue.unassigned()).order_by(*work_queue.QUEUE_ORDERS[order])[:10],
+        "unassigned_count": unassigned_count,
+        "more_unassigned": more_unassigned,
+        "order": order,
+        "orders": list(work_queue.QUEUE_ORDERS),
+    }
+    return render(request, "service_request/work_queue.html", context)
+
+
+@login_required
+@require_POST
+def claim_next_sr(request):
+    """
+    Assign the next unassigned open SR to the current agent (agents only)
+    """
+    if not request.user.is_staff:
+        messages.error(request, "You don't have permission to claim service requests.")
+        return redirect('list_sr')
+
+    order = request.POST.get('order', work_queue.DEFAULT_ORDER)
+    if order not in work_queue.QUEUE_ORDERS:
+        order = work_queue.DEFAULT_ORDER
+
+    sr = work_queue.claim_next(request.user, order)
+    if sr is None:
+        messages.info(request, "The queue is empty, no SR to claim.")
+        return redirect('work_queue')
+
+    messages.success(request, f"Service Request {sr.sr_number} assigned to you.")
+    return redirect('view_sr', sr_id=sr.id)
@@ -0,0 +1,93 @@
+"""
+Agents' work queue: claim the next unassigned open SR.
+
+On PostgreSQL the next row is locked with ``SELECT ... FOR UPDATE SKIP
+LOCKED``, so concurrent claims each get a different SR without waiting on
+each other's locks. Backends without SKIP LOCKED (SQLite) claim with a
+conditional ``UPDATE ... WHERE assigned_to IS NULL`` and move on to the
+next candidate when another agent got there first. Either way an SR is
+never handed to two agents.
+
+The queue reads are served by partial indexes over unassigned SRs only
+(see ServiceRequest.Meta.indexes).
+"""
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import assignment, counters, master_data
+from .models import ServiceRequest, SRStatus
+
+
+QUEUE_ORDERS = {
+    # Earliest deadline first; SRs without a TAT after those with one
+    "due": (F("due_at").asc(nulls_last=True), "created_at", "id"),
+    # Oldest first
+    "age": ("created_at", "id"),
+}
+DEFAULT_ORDER = "due"
+
+# Candidates tried per round by the conditional-update fallback
+FALLBACK_CANDIDATES = 10
+
+# The queue page counts unassigned SRs up to this many ("1000+")
+COUNT_CAP = 1000
+
+
+def unassigned(using="default"):
+    open_status = master_data.get_status(SRStatus.STATUS_OPEN)
+    if open_status is None:
+        return ServiceRequest.objects.using(using).none()
+    return ServiceRequest.objects.using(using).filter(
+        status_id=open_status.id, assigned_to__isnull=True
+    )
+
+
+def unassigned_count(cap=COUNT_CAP, using="default"):
+    """
+    (number of unassigned SRs, capped at ``cap``; whether there are more).
+    Counting a ``cap + 1`` slice keeps the scan bounded however long the
+    queue gets.
+    """
+    count = unassigned(using)[:cap + 1].count()
+    return min(count, cap), count > cap
+
+
+def claim_next(user, order=DEFAULT_ORDER, using="default"):
+    """
+    Assign the next eligible SR to ``user`` and return it, or None when the
+    queue is empty.
+    """
+    if connections[using].features.has_select_for_update_skip_locked:
+        return _claim_skip_locked(user, order, using)
+    return _claim_conditional(user, order, using)
+
+
+def _claim_skip_locked(user, order, using):
+    with transaction.atomic(using=using):
+        sr = (
+            unassigned(using).order_by(*QUEUE_ORDERS[order])
+            .select_for_update(skip_locked=True, of=("self",))
+            .first()
+        )
+        if sr is None:
+            return None
+        sr.assigned_to = user
+        sr.save(update_fields=["assigned_to", "updated_at"])
+    return sr
+
+
+def _claim_conditional(user, order, using):
+    while True:
+        candidates = list(
+            unassigned(using).order_by(*QUEUE_ORDERS[order]).values_list("id", flat=True)[:FALLBACK_CANDIDATES]
+        )
+        if not candidates:
+            return None
+        for sr_id in candidates:
+            claimed = unassigned(using).filter(id=sr_id).update(assigned_to=user, updated_at=timezone.now())
+            if claimed:
+                # The UPDATE skipped the signals that keep agent loads
+                assignment.apply_deltas({user.id: 1}, using=using)
+                counters.mark_list_changed(using=using)
+                return ServiceRequest.objects.using(using).get(id=sr_id)
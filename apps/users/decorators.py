@@ -0,0 +1,45 @@
+from functools import wraps
+from urllib.parse import urlparse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import resolve_url
+
+
+async def auser(request):
+    """
+    request.user for async views.
+
+    The first access to request.user loads the session user from the DB, so
+    it is done in a worker thread; get_user() caches the result on the
+    request, so request.user is free to use afterwards.
+    """
+    return await sync_to_async(get_user)(request)
+
+
+def alogin_required(view_func=None, login_url=None):
+    """
+    login_required for async views (Django 4.2's decorator only wraps sync views).
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user = await auser(request)
+            if user.is_authenticated:
+                return await view(request, *args, **kwargs)
+
+            path = request.build_absolute_uri()
+            resolved_login_url = resolve_url(login_url or settings.LOGIN_URL)
+            login_scheme, login_netloc = urlparse(resolved_login_url)[:2]
+            current_scheme, current_netloc = urlparse(path)[:2]
+            if ((not login_scheme or login_scheme == current_scheme)
+                    and (not login_netloc or login_netloc == current_netloc)):
+                path = request.get_full_path()
+            return redirect_to_login(path, resolved_login_url)
+        return wrapper
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
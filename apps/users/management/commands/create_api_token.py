@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from apps.users import tokens
+
+
+class Command(BaseCommand):
+    help = "Issue an API token for a user (the key is printed once and not stored)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--name", default="", help="What the token is for")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User not found: {options['username']}")
+
+        key = tokens.issue(user, options["name"])
+        self.stdout.write(self.style.SUCCESS(f"API token for {user.username}: {key}"))
+        self.stdout.write("Send it as 'Authorization: Token <key>'; it cannot be shown again.")
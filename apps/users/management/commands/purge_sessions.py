@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in small chunks (clearsessions does one big DELETE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--sleep", type=float, default=0.1,
+            help="Seconds to pause between chunks, to leave room for live traffic"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        now = timezone.now()
+        deleted = 0
+
+        while True:
+            keys = list(
+                Session.objects
+                .filter(expire_date__lt=now)
+                .values_list("session_key", flat=True)[:chunk_size]
+            )
+            if not keys:
+                break
+
+            # Each chunk is its own short autocommit DELETE
+            deleted += Session.objects.filter(session_key__in=keys, expire_date__lt=now).delete()[0]
+            self.stdout.write(f"Deleted {deleted} expired sessions")
+
+            if len(keys) < chunk_size:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Session purge done. Sessions deleted: {deleted}")
+        )
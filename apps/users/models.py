@@ -40,3 +40,31 @@ class UserProfile(models.Model):
     @property
     def is_user(self):
         return self.role == self.ROLE_USER
+
+
+class APIToken(models.Model):
+    """
+    Key for calling the SR API without a session, sent as
+    ``Authorization: Token <key>``. Only a SHA-256 digest of the key is
+    stored; the key itself is shown once, when it is issued.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="api_tokens"
+    )
+
+    name = models.CharField(max_length=100, blank=True)
+
+    key_digest = models.CharField(max_length=64, unique=True)
+
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.name or self.pk}"
+
+    class Meta:
+        db_table = "api_token"
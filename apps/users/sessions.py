@@ -0,0 +1,99 @@
+"""
+Low-write sessions with a sliding expiry.
+
+The default setup (db sessions plus SESSION_SAVE_EVERY_REQUEST) UPDATEs
+``django_session`` on every page view just to push the expiry forward. Here
+the session is written only when its data changed, or when the stored expiry
+has fallen more than SESSION_REFRESH_INTERVAL seconds behind where a save now
+would put it. An agent active within the last SESSION_COOKIE_AGE therefore
+stays logged in (give or take the interval), with one write per interval
+instead of one per request.
+
+Reads go through the SESSION_CACHE_ALIAS cache (a per-process cache by
+default) and fall back to the database. Cached copies live at most
+SESSION_LOCAL_CACHE_TTL seconds, which bounds how long another worker can
+keep serving a session that was changed or logged out elsewhere.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils import timezone
+
+
+KEY_PREFIX = "apps.users.sessions"
+
+
+class SessionStore(CachedDBStore):
+    """
+    cached_db store that also caches the row's expire_date, so it can tell
+    when the sliding expiry needs a write.
+    """
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # Expiry stored in the session's DB row, once loaded or saved
+        self.stored_expire_date = None
+
+    def _cache_timeout(self, expire_date):
+        ttl = getattr(settings, "SESSION_LOCAL_CACHE_TTL", 30)
+        remaining = int((expire_date - timezone.now()).total_seconds())
+        return max(1, min(ttl, remaining))
+
+    def load(self):
+        try:
+            cached = self._cache.get(self.cache_key)
+        except Exception:
+            # Invalid cache key on some backends, see cached_db
+            cached = None
+
+        if cached is not None:
+            data, expire_date = cached
+            if expire_date > timezone.now():
+                self.stored_expire_date = expire_date
+                return data
+
+        s = self._get_session_from_db()
+        if not s:
+            return {}
+        data = self.decode(s.session_data)
+        self.stored_expire_date = s.expire_date
+        self._cache.set(self.cache_key, (data, s.expire_date), self._cache_timeout(s.expire_date))
+        return data
+
+    def save(self, must_create=False):
+        # The DB write itself, without cached_db's cache update
+        super(CachedDBStore, self).save(must_create)
+        self.stored_expire_date = self.get_expiry_date()
+        self._cache.set(
+            self.cache_key,
+            (self._session, self.stored_expire_date),
+            self._cache_timeout(self.stored_expire_date),
+        )
+
+    def needs_refresh(self):
+        """
+        True once the stored expiry lags the sliding one by more than
+        SESSION_REFRESH_INTERVAL seconds.
+        """
+        if self.stored_expire_date is None:
+            return False
+        interval = timedelta(seconds=getattr(settings, "SESSION_REFRESH_INTERVAL", 300))
+        return self.get_expiry_date() - self.stored_expire_date > interval
+
+
+class SlidingSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware that refreshes an unchanged session only when its
+    expiry needs to slide (use with SESSION_SAVE_EVERY_REQUEST = False).
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, "session", None)
+        if (session is not None and session.accessed and not session.modified
+                and getattr(session, "needs_refresh", None) and session.needs_refresh()):
+            session.modified = True
+        return super().process_response(request, response)
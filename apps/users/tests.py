@@ -1,3 +1,52 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.users.models import UserProfile
+
+
+class SlidingSessionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user("agent", password="secret", is_staff=True)
+        UserProfile.objects.create(user=cls.agent, phone="9999999999")
+
+    def setUp(self):
+        caches["sessions"].clear()
+        self.client.force_login(self.agent)
+
+    def session_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("dashboard"))
+        return [q["sql"] for q in ctx.captured_queries if 'UPDATE "django_session"' in q["sql"]]
+
+    def test_unchanged_session_is_not_written(self):
+        self.assertEqual(self.session_writes(), [])
+
+    def test_session_is_refreshed_once_expiry_lags(self):
+        Session.objects.update(expire_date=timezone.now() + timedelta(minutes=100))
+        caches["sessions"].clear()
+        old_expiry = Session.objects.get().expire_date
+
+        with override_settings(SESSION_REFRESH_INTERVAL=300):
+            self.assertEqual(len(self.session_writes()), 1)
+            self.assertGreater(Session.objects.get().expire_date, old_expiry)
+            self.assertEqual(self.session_writes(), [])
+
+    def test_purge_deletes_only_expired_sessions(self):
+        Session.objects.create(
+            session_key="expired", session_data="", expire_date=timezone.now() - timedelta(days=1)
+        )
+        call_command("purge_sessions", chunk_size=1, sleep=0, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)),
+                         [self.client.session.session_key])
@@ -0,0 +1,55 @@
+"""
+API token authentication.
+
+Integrations call the SR API with ``Authorization: Token <key>`` instead of
+a session, so they need neither a login nor a CSRF token. Keys are random
+and only their SHA-256 digest is stored (see APIToken); issue one with
+``manage.py create_api_token <username>``.
+"""
+import hashlib
+import secrets
+
+from apps.users.models import APIToken
+
+
+KEYWORDS = ("token", "bearer")
+
+
+def digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue(user, name=""):
+    """
+    Create a token for ``user`` and return its key.
+    """
+    key = secrets.token_urlsafe(32)
+    APIToken.objects.create(user=user, name=name, key_digest=digest(key))
+    return key
+
+
+def _header_key(request):
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    if keyword.lower() not in KEYWORDS:
+        return None
+    return key.strip()
+
+
+def has_token(request):
+    return _header_key(request) is not None
+
+
+def token_user(request):
+    """
+    The active user owning the request's token, or None when the token is
+    unknown, revoked or belongs to an inactive user.
+    """
+    key = _header_key(request)
+    if not key:
+        return None
+    token = (
+        APIToken.objects.select_related("user")
+        .filter(key_digest=digest(key), is_active=True, user__is_active=True)
+        .first()
+    )
+    return token.user if token else None
@@ -2,14 +2,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, login
 from django.contrib import messages
-from django.utils import timezone
-from django.db.models import Count
-from datetime import timedelta
 from django.views.decorators.csrf import csrf_protect
 from grievance_management.forms import UserCreateForm
-from apps.service_request.models import ServiceRequest, SRComment, SRStatus
+from apps.service_request.models import SRStatus
+from apps.service_request.counters import TOTAL_KEY, status_key, category_key
+from apps.service_request.dashboard_cache import dashboard_data, adashboard_data
+from apps.service_request.rollups import TREND_RANGES
 from django.contrib.auth import authenticate
 from apps.users.models import UserProfile
+from apps.users.decorators import alogin_required
+from asgiref.sync import sync_to_async
 
 
 @csrf_protect
@@ -29,15 +31,22 @@ def login_view(request):
 
     return render(request, "users/login.html")
 
-@login_required(login_url="login")
-def dashboard_view(request):
+def _trend_days(request):
+    try:
+        trend_days = int(request.GET.get("range", 7))
+    except ValueError:
+        trend_days = 7
+    if trend_days not in TREND_RANGES:
+        trend_days = 7
+    return trend_days
+
 
-    # ---- BASIC COUNTS ----
-    total_sr = ServiceRequest.objects.count()
+def _dashboard_context(sr_counters, bar_data, trend_days):
+    total_sr = sr_counters.get(TOTAL_KEY, 0)
 
-    open_sr = ServiceRequest.objects.filter(status__id="1").count()
-    wip_sr = ServiceRequest.objects.filter(status__id="2").count()
-    closed_sr = ServiceRequest.objects.filter(status__id="3").count()
+    open_sr = sr_counters.get(status_key(SRStatus.STATUS_OPEN), 0)
+    wip_sr = sr_counters.get(status_key(SRStatus.STATUS_WIP), 0)
+    closed_sr = sr_counters.get(status_key(SRStatus.STATUS_CLOSED), 0)
 
     # ---- PIE CHART PERCENTAGES ----
     def pct(part, total):
@@ -48,48 +57,19 @@ def dashboard_view(request):
     closed_pct = pct(closed_sr, total_sr)
 
     # ---- PARENTED VS UNPARENTED ----
-    parented_sr = ServiceRequest.objects.filter(category='parented').count()
-    unparented_sr = ServiceRequest.objects.filter(category='unparented').count()
+    parented_sr = sr_counters.get(category_key('parented'), 0)
+    unparented_sr = sr_counters.get(category_key('unparented'), 0)
     
     parented_pct = pct(parented_sr, total_sr)
     unparented_pct = pct(unparented_sr, total_sr)
 
-    # ---- LAST 7 DAYS SR CREATION ----
-    today = timezone.now().date()
-    start_date = today - timedelta(days=6)
-
-    sr_by_day = (
-        ServiceRequest.objects
-        .filter(created_at__date__gte=start_date)
-        .extra(select={"day": "DATE(created_at)"})
-        .values("day")
-        .annotate(count=Count("id"))
-    )
-
-    sr_day_map = {str(x["day"]): x["count"] for x in sr_by_day}
+    max_count = max((item["count"] for item in bar_data), default=0)
 
-    bar_data = []
-    max_count = 0
-    
-    # First pass: collect data and find max
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        count = sr_day_map.get(str(day), 0)
-        max_count = max(max_count, count)
-        bar_data.append({
-            "label": day.strftime("%a"),
-            "count": count
-        })
-    
-    # Second pass: calculate heights as percentage of max
-    if max_count > 0:
-        for item in bar_data:
-            item["height"] = int((item["count"] / max_count) * 100)
-    else:
-        for item in bar_data:
-            item["height"] = 0
+    # Heights as percentage of max
+    for item in bar_data:
+        item["height"] = int((item["count"] / max_count) * 100) if max_count else 0
 
-    context = {
+    return {
         "total_sr": total_sr,
         "open_sr": open_sr,
         "wip_sr": wip_sr,
@@ -99,15 +79,40 @@ def dashboard_view(request):
         "closed_pct": closed_pct,
         "bar_data": bar_data,
         "max_count": max_count,
+        "trend_days": trend_days,
+        "trend_ranges": sorted(TREND_RANGES),
         "parented_sr": parented_sr,
         "unparented_sr": unparented_sr,
         "parented_pct": parented_pct,
         "unparented_pct": unparented_pct,
     }
 
+
+@login_required(login_url="login")
+def dashboard_view(request):
+
+    trend_days = _trend_days(request)
+
+    # ---- COUNTS AND TREND (maintained counters + daily rollup, cached
+    # with single-flight refresh, see dashboard_cache.py) ----
+    data = dashboard_data(trend_days)
+
+    context = _dashboard_context(data["counters"], data["trend"], trend_days)
     return render(request, "home.html", context)
 
 
+@alogin_required(login_url="login")
+async def adashboard_view(request):
+    """
+    dashboard_view for ASGI workers: counters and trend via the async ORM.
+    """
+    trend_days = _trend_days(request)
+    data = await adashboard_data(trend_days)
+
+    context = _dashboard_context(data["counters"], data["trend"], trend_days)
+    return await sync_to_async(render)(request, "home.html", context)
+
+
 @login_required
 def logout_view(request):
     """
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'grievance_management.settings')
 
 application = get_asgi_application()
+
+# Load SR master data (natures, types, statuses, TATs) before the first request
+from apps.service_request.master_data import warm  # noqa: E402
+
+warm()
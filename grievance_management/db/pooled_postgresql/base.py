@@ -0,0 +1,181 @@
+"""
+PostgreSQL backend that takes connections from a psycopg_pool.ConnectionPool.
+
+Django 4.2 opens a new connection per request (or keeps one per thread with
+CONN_MAX_AGE). With this backend ``connect()`` checks a connection out of a
+per-process pool and ``close()`` hands it back, so a burst of requests reuses
+a bounded set of server connections instead of opening new ones.
+
+Configure it through ``DATABASES[alias]["OPTIONS"]["pool"]``, which is
+passed to ConnectionPool (min_size, max_size, timeout, max_idle, ...).
+
+- With CONN_HEALTH_CHECKS, the pool checks each connection on checkout and
+  replaces dead ones.
+- On return, an open transaction is rolled back and the session is reset
+  with DISCARD ALL, so no settings, temp tables or advisory locks leak into
+  the next request.
+"""
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError as e:
+    raise ImproperlyConfigured(f"Error loading psycopg_pool module: {e}")
+
+
+# alias -> (database name, pool)
+_pools = {}
+_pools_lock = threading.Lock()
+# Pools inherited from the parent in a forked child. They are kept
+# referenced, never closed: closing would end the parent's server sessions
+# over the shared sockets
+_inherited_pools = []
+
+
+def _forget_pools_after_fork():
+    _inherited_pools.extend(pool for _, pool in _pools.values())
+    _pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
+
+
+def _reset_connection(connection):
+    # Called by the pool when a connection comes back, outside a transaction
+    connection.autocommit = True
+    connection.execute("DISCARD ALL")
+
+
+def get_pool(alias):
+    entry = _pools.get(alias)
+    return entry[1] if entry else None
+
+
+def close_pool(alias):
+    with _pools_lock:
+        entry = _pools.pop(alias, None)
+    if entry:
+        entry[1].close()
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would block DROP DATABASE
+        close_pool(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connection_pool = None
+
+    def get_connection_params(self):
+        options = self.settings_dict["OPTIONS"]
+        pool_options = options.pop("pool", None)
+        try:
+            return super().get_connection_params()
+        finally:
+            if pool_options is not None:
+                options["pool"] = pool_options
+
+    @property
+    def pool(self):
+        """
+        This process's pool for the alias, or None for the maintenance
+        connection Django opens without a database name.
+        """
+        name = self.settings_dict["NAME"]
+        if self.alias == NO_DB_ALIAS or not name:
+            return None
+
+        entry = _pools.get(self.alias)
+        if entry is not None and entry[0] == name:
+            return entry[1]
+
+        with _pools_lock:
+            entry = _pools.get(self.alias)
+            if entry is not None and entry[0] != name:
+                # NAME changed (the test runner switching to the test
+                # database): the old pool points at the wrong database
+                entry[1].close()
+                entry = None
+            if entry is None:
+                if self.settings_dict["CONN_MAX_AGE"]:
+                    raise ImproperlyConfigured(
+                        "Pooled connections are returned after each request; "
+                        "set CONN_MAX_AGE to 0 for this database."
+                    )
+                pool_options = dict(self.settings_dict["OPTIONS"].get("pool") or {})
+                connect_kwargs = self.get_connection_params()
+                # Django switches autocommit itself once it has the connection
+                connect_kwargs["autocommit"] = True
+                check = (
+                    ConnectionPool.check_connection
+                    if self.settings_dict["CONN_HEALTH_CHECKS"] else None
+                )
+                pool = ConnectionPool(
+                    kwargs=connect_kwargs,
+                    check=check,
+                    reset=_reset_connection,
+                    name=self.alias,
+                    open=False,
+                    **pool_options,
+                )
+                pool.open()
+                entry = _pools[self.alias] = (name, pool)
+        return entry[1]
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self._connection_pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.getconn()
+        # Same isolation handling as the stock backend's get_new_connection()
+        options = self.settings_dict["OPTIONS"]
+        if "isolation_level" in options:
+            try:
+                self.isolation_level = IsolationLevel(options["isolation_level"])
+            except ValueError:
+                raise ImproperlyConfigured(
+                    f"Invalid transaction isolation level {options['isolation_level']} "
+                    f"specified. Use one of the psycopg.IsolationLevel values."
+                )
+            connection.isolation_level = self.isolation_level
+        else:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        return connection
+
+    def _close(self):
+        # Return the connection to the pool it came from, unless that pool
+        # has been closed since
+        pool, self._connection_pool = self._connection_pool, None
+        if self.connection is None or pool is None or pool.closed:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def pool_stats(self):
+        """
+        Pool counters for the metrics endpoint (see grievance_management/ops.py).
+        """
+        pool = get_pool(self.alias)
+        if pool is None:
+            return None
+        stats = pool.get_stats()
+        stats["pool_in_use"] = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+        return stats
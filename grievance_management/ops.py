@@ -0,0 +1,45 @@
+"""
+Operational endpoints for staff (metrics, not part of the portal UI).
+"""
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.db import connections
+from django.http import JsonResponse
+from grievance_management import profiling
+
+
+def _staff_only(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_staff:
+            return JsonResponse({"error": "Staff only"}, status=403)
+        return view(request, *args, **kwargs)
+    return login_required(wrapper)
+
+
+@_staff_only
+def db_pool_metrics(request):
+    """
+    Connection pool counters per database alias.
+
+    pool_in_use / pool_size against max_size shows headroom,
+    requests_wait_ms / requests_num the average wait for a connection, and
+    requests_errors the checkouts that timed out.
+    """
+    metrics = {}
+    for alias in connections:
+        connection = connections[alias]
+        stats = connection.pool_stats() if hasattr(connection, "pool_stats") else None
+        metrics[alias] = {"pooled": stats is not None, **(stats or {})}
+    return JsonResponse(metrics)
+
+
+@_staff_only
+def profile_histograms(request):
+    """
+    Per-view latency histograms from the profiling middleware.
+
+    Only this worker's samples; ?reset=1 clears them after reading.
+    """
+    return JsonResponse(profiling.snapshot(reset=request.GET.get("reset") == "1"))
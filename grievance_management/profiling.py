@@ -0,0 +1,203 @@
+"""
+Per-request latency and query profiling.
+
+RequestProfilingMiddleware times every request and, through
+``connection.execute_wrapper``, counts its queries and the time spent in
+them. Requests slower than PROFILING_SLOW_MS are logged together with the
+SQL statements they ran more than once (the usual sign of an N+1).
+PROFILING_SAMPLE_RATE of requests are added to per-view latency histograms,
+which staff can read from ``ops/profile/``.
+
+Histograms are kept per worker process. The middleware is sync and async
+capable, so under ASGI the async views keep running on the event loop;
+their queries run on the request's thread-sensitive sync thread, where
+the recorder is installed for them.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts queries, their total time and their SQL.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self, top=3):
+        return [(sql, n) for sql, n in self.statements.most_common(top) if n > 1]
+
+
+class ViewHistogram:
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, wall_ms, queries, db_ms):
+        self.count += 1
+        self.total_ms += wall_ms
+        self.max_ms = max(self.max_ms, wall_ms)
+        self.queries += queries
+        self.db_ms += db_ms
+        self.buckets[bisect_left(BUCKETS_MS, wall_ms)] += 1
+
+    def percentile(self, pct):
+        """
+        Upper bound of the bucket holding the pct-th percentile.
+        """
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + [self.max_ms], self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 2),
+            "avg_queries": round(self.queries / self.count, 2) if self.count else 0,
+            "avg_db_ms": round(self.db_ms / self.count, 2) if self.count else 0,
+            "buckets": {
+                f"le_{bound}": n for bound, n in zip(BUCKETS_MS + ["inf"], self.buckets)
+            },
+        }
+
+
+_lock = threading.Lock()
+_histograms = {}
+_started_at = time.time()
+
+
+def record(view_name, wall_ms, queries, db_ms):
+    with _lock:
+        histogram = _histograms.get(view_name)
+        if histogram is None:
+            histogram = _histograms[view_name] = ViewHistogram()
+        histogram.add(wall_ms, queries, db_ms)
+
+
+def snapshot(reset=False):
+    """
+    This worker's histograms as a dict, optionally starting a new window.
+    """
+    global _histograms, _started_at
+    with _lock:
+        data = {
+            "pid": os.getpid(),
+            "since": _started_at,
+            "sample_rate": getattr(settings, "PROFILING_SAMPLE_RATE", 0.1),
+            "views": {name: h.as_dict() for name, h in sorted(_histograms.items())},
+        }
+        if reset:
+            _histograms, _started_at = {}, time.time()
+    return data
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match.route
+
+
+def _add_recorder(recorder):
+    connections["default"].execute_wrappers.append(recorder)
+
+
+def _remove_recorder(recorder):
+    connections["default"].execute_wrappers.remove(recorder)
+
+
+class RequestProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connections["default"].execute_wrapper(recorder):
+            response = self.get_response(request)
+        self._finish(request, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        # The async ORM and sync views run on the request's thread-sensitive
+        # sync thread: install the recorder on that thread's connection
+        await sync_to_async(_add_recorder)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_recorder)(recorder)
+        self._finish(request, recorder, started)
+        return response
+
+    def _finish(self, request, recorder, started):
+        wall_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+        view_name = _view_name(request)
+
+        if random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", 0.1):
+            record(view_name, wall_ms, recorder.count, db_ms)
+
+        if wall_ms >= getattr(settings, "PROFILING_SLOW_MS", 1000):
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms in DB%s",
+                request.method, request.path, view_name, wall_ms, recorder.count, db_ms,
+                "".join(
+                    f"\n  {n}x {sql[:300]}" for sql, n in recorder.duplicates()
+                ),
+            )
@@ -49,8 +49,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'grievance_management.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.users.sessions.SlidingSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -104,12 +105,70 @@ DATABASES = {
         'PASSWORD': os.getenv("DB_PASSWORD", ""),
         'HOST': os.getenv("DB_HOST", ""),
         'PORT': os.getenv("DB_PORT", ""),
+        # Seconds to keep a per-thread connection open between requests
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        # Check a reused connection is still alive before handing it out
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pooled PostgreSQL connections (grievance_management/db/pooled_postgresql).
+# Size the pool so workers * DB_POOL_MAX_SIZE stays below max_connections.
+if os.getenv("DB_POOL") == "True":
+    DATABASES['default'].update({
+        'ENGINE': 'grievance_management.db.pooled_postgresql',
+        # Connections go back to the pool after each request
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+                'max_size': int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                # Seconds a request waits for a free connection before failing
+                'timeout': float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                # Seconds before an idle connection above min_size is closed
+                'max_idle': float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            },
+        },
+    })
+
+
 
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Rendered SR detail sections and list rows ({% cache ... using="fragments" %},
+# keyed on the SR's updated_at and the master data version, kept an hour at
+# most): "locmem" keeps them per process, "file" shares them between the
+# workers of a host through FRAGMENT_CACHE_DIR
+FRAGMENT_CACHE_BACKEND = os.getenv("FRAGMENT_CACHE_BACKEND", "locmem")
+FRAGMENT_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("FRAGMENT_CACHE_DIR", str(BASE_DIR / "cache" / "fragments")),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Per-process copies of session rows (apps/users/sessions.py)
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'fragments': FRAGMENT_CACHE_BACKENDS[FRAGMENT_CACHE_BACKEND],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -142,12 +201,59 @@ USE_I18N = True
 USE_TZ = True
 
 SESSION_COOKIE_AGE = 7200  # 2 hours in seconds (2 * 60 * 60)
-SESSION_SAVE_EVERY_REQUEST = True  # Refresh session on every request
+# Sliding expiry without a write per request, see apps/users/sessions.py
+SESSION_ENGINE = 'apps.users.sessions'
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = int(os.getenv("SESSION_REFRESH_INTERVAL", 300))  # max expiry drift before a write
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_LOCAL_CACHE_TTL = int(os.getenv("SESSION_LOCAL_CACHE_TTL", 30))  # seconds a worker trusts its cached copy
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Session expires when browser closes
 SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
 SESSION_COOKIE_HTTPONLY = True  # Prevent JavaScript access to session cookie
 SESSION_COOKIE_SAMESITE = 'Lax'
 
+# Service request list
+ITEMS_PER_PAGE = 15
+# "offset" = numbered pages (COUNT + OFFSET), "keyset" = cursor based next/prev
+SR_LIST_PAGINATION = os.getenv("SR_LIST_PAGINATION", "offset")
+
+# SR numbers reserved per worker in one DB round trip
+SR_NUMBER_BLOCK_SIZE = int(os.getenv("SR_NUMBER_BLOCK_SIZE", 50))
+
+# PostgreSQL only: partition the SR table by month of created_at
+# (partitioning.py); partitions are created SR_PARTITION_MONTHS_AHEAD ahead
+# by `manage.py partition_srs`
+SR_PARTITIONING = os.getenv("SR_PARTITIONING") == "True"
+SR_PARTITION_MONTHS_AHEAD = int(os.getenv("SR_PARTITION_MONTHS_AHEAD", 3))
+
+# Cold archive (archive.py): `manage.py archive_srs` moves SRs closed more
+# than SR_ARCHIVE_AFTER_DAYS ago into compressed segment files under
+# SR_ARCHIVE_DIR, starting a new segment past SR_ARCHIVE_SEGMENT_BYTES
+SR_ARCHIVE_DIR = os.getenv("SR_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+SR_ARCHIVE_AFTER_DAYS = int(os.getenv("SR_ARCHIVE_AFTER_DAYS", 365))
+SR_ARCHIVE_SEGMENT_BYTES = int(os.getenv("SR_ARCHIVE_SEGMENT_BYTES", 64 * 1024 * 1024))
+
+# Route SRs created by non-staff users to the least-loaded agent (assignment.py)
+SR_AUTO_ASSIGN = os.getenv("SR_AUTO_ASSIGN", "True") == "True"
+
+# Serve the read paths (SR list/detail, dashboard, JSON API) with async
+# views; turn on for ASGI workers (uvicorn), leave off under WSGI
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS") == "True"
+
+# Seconds the dashboard's counters / trend are served from the cache before
+# one request refreshes them (SR writes refresh them sooner)
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 30))
+
+# Max seconds a worker serves its cached SR master data without reloading
+SR_MASTER_CACHE_MAX_AGE = int(os.getenv("SR_MASTER_CACHE_MAX_AGE", 300))
+
+# Request profiling (grievance_management/profiling.py): requests slower than
+# PROFILING_SLOW_MS are logged, PROFILING_SAMPLE_RATE of them feed the
+# per-view histograms at /ops/profile/
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "True") == "True"
+PROFILING_SLOW_MS = int(os.getenv("PROFILING_SLOW_MS", 1000))
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.1))
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -16,8 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path , include
+from grievance_management import ops
 
 urlpatterns = [
+     path("ops/db-pool/", ops.db_pool_metrics, name="ops_db_pool"),
+     path("ops/profile/", ops.profile_histograms, name="ops_profile"),
      path("", include("apps.users.urls")),
      path("", include("apps.service_request.urls")),
 ]
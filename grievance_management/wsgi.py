@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'grievance_management.settings')
 
 application = get_wsgi_application()
+
+# Load SR master data (natures, types, statuses, TATs) before the first request
+from apps.service_request.master_data import warm  # noqa: E402
+
+warm()